@@ -1,42 +1,117 @@
 import os
 import json
 import datetime
-from openai import OpenAI
+from contextlib import nullcontext
+from collections import OrderedDict
+from openai_client import create_client
+from memory_store import create_memory_store
+from persistence import WriteBehindPersister
+from memory_index import MemoryIndex
+from pattern_matcher import PatternMatcher
+from summarizer import BackgroundSummarizer, extractive_summary
+from stream_renderer import stream_chat
+from context_window import ContextWindow, count_tokens
+
+# Keyword rules for intelligent_learning; "learning_rules" in ai_config.json overrides them per label
+DEFAULT_LEARNING_RULES = {
+    "preference": ["i prefer", "i like", "i love", "i hate", "i don't like"],
+    "goal": ["i want to", "my goal", "i plan to", "i hope to", "i'm trying to"],
+    "project": ["working on", "building", "creating", "developing", "finished", "completed"],
+    "project_keyword": ["chatgpt", "ai", "bot", "app", "website", "script", "program", "project"]
+}
 
 class AdvancedPersonalAI:
-    def __init__(self):
-        """Initialize your Advanced Personal AI"""
-        
-        # Load configuration
-        self.config = self.load_config()
+    model = "gpt-4o-mini"
+    
+    def __init__(self, data_dir=".", client=None, config=None, summary_executor=None, persister=None,
+                 upstream_limiter=None, usage_hook=None):
+        """Initialize your Advanced Personal AI
         
-        # Get API key
-        self.api_key = os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            print("🔑 Enter your OpenAI API key:")
-            self.api_key = input("API Key: ").strip()
+        A server hosting many assistants passes a shared client, config,
+        summary_executor and persister instead of having each one load its own.
+        Background summary calls hold a slot of upstream_limiter and report
+        their tokens to usage_hook(model, prompt_tokens, completion_tokens).
+        """
         
-        self.client = OpenAI(api_key=self.api_key)
+        # Load configuration
+        self.config = config if config is not None else self.load_config()
+        
+        if client is None:
+            # Get API key
+            self.api_key = os.getenv("OPENAI_API_KEY")
+            if not self.api_key:
+                print("🔑 Enter your OpenAI API key:")
+                self.api_key = input("API Key: ").strip()
+            
+            # OPENAI_BASE_URL can point at an OpenAI-compatible server such as mock_openai_server.py
+            client = create_client(api_key=self.api_key)
+        self.client = client
+        self.upstream_limiter = upstream_limiter
+        self.usage_hook = usage_hook
         
         # AI Identity
         self.ai_name = self.config["ai_config"]["name"]
         self.owner_name = self.config["owner_profile"]["name"].split()[0]  # First name
         
+        # Memory and learning are append-only journals compacted into their JSON
+        # files, or SQLite databases ("memory_backend": "sqlite") that keep every memory.
+        # Journal writes happen behind the response path, at most every save_interval_seconds
+        features = self.config.get("advanced_features", {})
+        backend = features.get("memory_backend", "journal")
+        compact_every = features.get("journal_compact_every", 1000)
+        self.memory_limit = None if backend == "sqlite" else 50
+        self._owns_persister = persister is None
+        self.persister = persister or WriteBehindPersister(features.get("save_interval_seconds", 2.0))
+        
         # Memory system
-        self.memory_file = "advanced_memory.json"
-        self.memory = self.load_memory()
+        self.memory_file = os.path.join(data_dir, "advanced_memory.json")
+        self.memory_store = create_memory_store(self.memory_file, self.default_memory(), backend, compact_every,
+                                                self.persister)
         
         # Learning system
-        self.learning_file = "ai_learning.json"
-        self.learned_patterns = self.load_learning()
-        
-        # Conversation history
-        self.conversation_history = []
-        
-    def load_config(self):
+        self.learning_file = os.path.join(data_dir, "ai_learning.json")
+        self.learning_store = create_memory_store(self.learning_file, self.default_learning(), backend, compact_every,
+                                                  self.persister)
+        
+        # Retrieval: memories relevant to the current message, up to a token budget,
+        # instead of always the most recent ones
+        self.memory_retrieval = features.get("memory_retrieval", True)
+        self.memory_token_budget = features.get("memory_token_budget", 300)
+        self.memory_retrieval_k = features.get("memory_retrieval_k", 8)
+        self.memory_index_limit = features.get("memory_index_limit", 1000)
+        
+        # Evicted turns are summarized in the background by a cheap model, or
+        # locally when "summary_model" is null or the call fails
+        self.summary_model = features.get("summary_model", "gpt-4o-mini")
+        self.summarizer = BackgroundSummarizer(self.summarize_turns, features.get("summary_workers", 1),
+                                               executor=summary_executor)
+        self.memory_index = MemoryIndex()
+        self._indexed = {}  # category -> index keys, oldest first
+        self._list_key = 0  # Key of the last indexed list item
+        self.index_memory()
+        
+        # All learning keywords are found in one pass over each message
+        self.learning_matcher = PatternMatcher({**DEFAULT_LEARNING_RULES, **self.config.get("learning_rules", {})})
+        
+        # Conversation history, trimmed to a token budget; evicted turns wait here to be summarized
+        self.conversation_history = ContextWindow()
+        self.evicted_history = []
+        self.last_reply_stats = None
+        
+        # Prompt cache: the static part and its token count depend only on
+        # config; the recent-memory part is rebuilt when memory_version changes
+        self.static_prompt = self.build_static_prompt()
+        self.static_prompt_tokens = count_tokens(self.static_prompt)
+        self.memory_version = 0
+        self._prompt_version = None
+        self._system_prompt = None
+        self._system_prompt_tokens = 0
+        
+    @staticmethod
+    def load_config(path="ai_config.json"):
         """Load AI configuration"""
         try:
-            with open("ai_config.json", 'r') as f:
+            with open(path, 'r') as f:
                 return json.load(f)
         except:
             # Default config if file not found
@@ -47,15 +122,8 @@ class AdvancedPersonalAI:
                 "advanced_features": {}
             }
     
-    def load_memory(self):
-        """Load enhanced memory system"""
-        try:
-            if os.path.exists(self.memory_file):
-                with open(self.memory_file, 'r') as f:
-                    return json.load(f)
-        except:
-            pass
-        
+    def default_memory(self):
+        """Empty enhanced memory system"""
         return {
             "personal_facts": [],
             "preferences": {},
@@ -69,15 +137,8 @@ class AdvancedPersonalAI:
             "favorite_topics": []
         }
     
-    def load_learning(self):
-        """Load AI learning patterns"""
-        try:
-            if os.path.exists(self.learning_file):
-                with open(self.learning_file, 'r') as f:
-                    return json.load(f)
-        except:
-            pass
-        
+    def default_learning(self):
+        """Empty AI learning patterns"""
         return {
             "communication_patterns": [],
             "frequent_topics": {},
@@ -85,29 +146,102 @@ class AdvancedPersonalAI:
             "interaction_style": {}
         }
     
-    def save_data(self):
-        """Save all data files"""
-        try:
-            with open(self.memory_file, 'w') as f:
-                json.dump(self.memory, f, indent=2)
-            with open(self.learning_file, 'w') as f:
-                json.dump(self.learned_patterns, f, indent=2)
-        except Exception as e:
-            print(f"Warning: Could not save data: {e}")
+    def close(self):
+        """Finish pending summaries, then compact or close the memory stores"""
+        self.store_summaries(self.summarizer.close())
+        self.memory_store.close()
+        self.learning_store.close()
+        if self._owns_persister:
+            self.persister.close()
+    
+    def index_memory(self):
+        """Index the most recent memories of each category for retrieval
+        
+        At most memory_index_limit per category, so a large SQLite store is
+        not read into memory whole.
+        """
+        self.memory_index.clear()
+        self._indexed = {}
+        for category in self.default_memory():
+            if self.memory_store.is_keyed(category):
+                for key, value in self.memory_store.recent_items(category, self.memory_index_limit):
+                    self.index_memory_item(category, key, value)
+            else:
+                for item in self.memory_store.recent(category, self.memory_index_limit):
+                    self.index_memory_item(category, None, item)
+    
+    def index_memory_item(self, category, key, item):
+        """Add one memory to the retrieval index; list items have no key
+        
+        Each category keeps as many entries as the store keeps (up to
+        memory_index_limit), dropping the oldest, so memories the journal has
+        evicted are not retrieved.
+        """
+        text = self.memory_text(item)
+        if category == "project_progress":
+            text = f"{key}: {text}"
+        limit = self.memory_index_limit
+        if key is None:
+            self._list_key += 1
+            key = self._list_key
+            if self.memory_limit is not None:
+                limit = min(limit, self.memory_limit)
+        
+        keys = self._indexed.setdefault(category, OrderedDict())
+        keys[key] = None
+        keys.move_to_end(key)
+        self.memory_index.add((category, key), category, text)
+        while len(keys) > limit:
+            oldest, _ = keys.popitem(last=False)
+            self.memory_index.remove((category, oldest))
     
-    def create_dynamic_system_prompt(self):
-        """Create a dynamic system prompt based on current memory and learning"""
+    @staticmethod
+    def memory_text(item):
+        """The human-readable text of a stored memory"""
+        if isinstance(item, dict):
+            for field in ("content", "statement", "details"):
+                if field in item:
+                    return AdvancedPersonalAI.memory_text(item[field])
+            return json.dumps(item)
+        return str(item)
+    
+    def create_dynamic_system_prompt(self, user_input=None):
+        """Return the system prompt
+        
+        The cached static part comes first. With retrieval on, the memories
+        related to user_input are appended on every turn; otherwise (or when
+        nothing is related) the recent-memory prompt, rebuilt only when memory
+        has changed, is used.
+        """
+        memory_prompt = None
+        if self.memory_retrieval and user_input:
+            memory_prompt = self.build_relevant_memory_prompt(user_input, fallback=False)
+        
+        if memory_prompt:
+            # Only the retrieved snippets are new this turn
+            self.conversation_history.reserved_tokens = self.static_prompt_tokens + count_tokens(memory_prompt)
+            return self.static_prompt + memory_prompt
+        
+        if self._prompt_version != self.memory_version:
+            memory_prompt = self.build_memory_prompt()
+            self._system_prompt = self.static_prompt + memory_prompt
+            self._system_prompt_tokens = self.static_prompt_tokens + count_tokens(memory_prompt)
+            self._prompt_version = self.memory_version
+        self.conversation_history.reserved_tokens = self._system_prompt_tokens
+        return self._system_prompt
+    
+    def build_static_prompt(self):
+        """Create the config-only part of the system prompt
+        
+        It is placed first and never changes between turns, so the provider's
+        prompt-prefix caching can reuse it.
+        """
         
         # Base personality from config
         personality = self.config["ai_config"]["personality"]
         owner_profile = self.config["owner_profile"]
         
-        # Recent memories
-        recent_facts = self.memory["personal_facts"][-5:] if self.memory["personal_facts"] else []
-        recent_goals = self.memory["goals"][-3:] if self.memory["goals"] else []
-        current_projects = self.memory["project_progress"]
-        
-        prompt = f"""You are {self.ai_name}, {self.owner_name}'s advanced personal AI assistant.
+        return f"""You are {self.ai_name}, {self.owner_name}'s advanced personal AI assistant.
 
 CORE IDENTITY:
 - You are {personality.get('traits', ['intelligent', 'helpful'])} 
@@ -120,6 +254,28 @@ ABOUT {self.owner_name.upper()}:
 - Current projects: {', '.join(owner_profile.get('current_projects', []))}
 - Goals: {', '.join(owner_profile.get('goals', []))}
 
+BEHAVIOR GUIDELINES:
+- Always be personal and reference {self.owner_name}'s specific interests
+- Proactively offer help with coding and AI projects
+- Remember and build upon previous conversations
+- Suggest next steps and improvements for projects
+- Be encouraging about {self.owner_name}'s learning journey
+- Adapt your responses based on {self.owner_name}'s preferences
+
+CURRENT CONVERSATION CONTEXT:
+This is a continuation of your ongoing relationship with {self.owner_name}. 
+Reference shared history and be genuinely helpful as their personal AI assistant.
+"""
+    
+    def build_memory_prompt(self):
+        """Create the memory part of the system prompt from recent memories"""
+        
+        # Recent memories
+        recent_facts = self.memory_store.recent("personal_facts", 5)
+        recent_goals = self.memory_store.recent("goals", 3)
+        current_projects = self.memory_store.items("project_progress")
+        
+        prompt = """
 RECENT PERSONAL MEMORY:
 """
         
@@ -144,109 +300,132 @@ RECENT PERSONAL MEMORY:
             for project, status in current_projects.items():
                 prompt += f"- {project}: {status}\n"
         
-        prompt += f"""
-BEHAVIOR GUIDELINES:
-- Always be personal and reference {self.owner_name}'s specific interests
-- Proactively offer help with coding and AI projects
-- Remember and build upon previous conversations
-- Suggest next steps and improvements for projects
-- Be encouraging about {self.owner_name}'s learning journey
-- Adapt your responses based on {self.owner_name}'s preferences
-
-CURRENT CONVERSATION CONTEXT:
-This is a continuation of your ongoing relationship with {self.owner_name}. 
-Reference shared history and be genuinely helpful as their personal AI assistant."""
-
         return prompt
     
+    def build_relevant_memory_prompt(self, user_input, fallback=True):
+        """Create the memory part of the system prompt from the memories most related to user_input
+        
+        When nothing is related, returns the recent-memory prompt, or "" without fallback.
+        """
+        prompt = ""
+        used_tokens = 0
+        for score, category, text in self.memory_index.search(user_input, k=self.memory_retrieval_k):
+            line = f"- ({category.replace('_', ' ')}) {text}\n"
+            line_tokens = count_tokens(line)
+            if used_tokens + line_tokens > self.memory_token_budget:
+                break
+            prompt += line
+            used_tokens += line_tokens
+        
+        if not prompt:
+            # Nothing related: fall back to the most recent memories
+            return self.build_memory_prompt() if fallback else ""
+        
+        return """
+RELEVANT PERSONAL MEMORY:
+""" + prompt
+    
     def intelligent_learning(self, user_input, ai_response):
         """Advanced learning from conversations"""
         user_lower = user_input.lower()
+        matches = self.learning_matcher.first_matches(user_input)
         
         # Learn preferences
-        preference_indicators = ["i prefer", "i like", "i love", "i hate", "i don't like"]
-        for indicator in preference_indicators:
-            if indicator in user_lower:
-                self.add_to_memory("preferences", {
-                    "statement": user_input,
-                    "preference_type": indicator,
-                    "extracted": user_input[user_input.lower().find(indicator):].strip()
-                })
+        for indicator, start in matches.get("preference", {}).items():
+            self.add_to_memory("preferences", {
+                "statement": user_input,
+                "preference_type": indicator,
+                "extracted": user_input[start:].strip()
+            })
         
         # Learn goals and aspirations
-        goal_indicators = ["i want to", "my goal", "i plan to", "i hope to", "i'm trying to"]
-        for indicator in goal_indicators:
-            if indicator in user_lower:
-                self.add_to_memory("goals", {
-                    "statement": user_input,
-                    "goal_type": indicator,
-                    "date_mentioned": datetime.datetime.now().isoformat()
-                })
+        for indicator in matches.get("goal", {}):
+            self.add_to_memory("goals", {
+                "statement": user_input,
+                "goal_type": indicator,
+                "date_mentioned": datetime.datetime.now().isoformat()
+            })
         
         # Track project progress
-        project_indicators = ["working on", "building", "creating", "developing", "finished", "completed"]
-        for indicator in project_indicators:
-            if indicator in user_lower:
-                project_name = self.extract_project_name(user_input)
-                if project_name:
-                    self.memory["project_progress"][project_name] = {
-                        "status": indicator,
-                        "last_update": datetime.datetime.now().isoformat(),
-                        "details": user_input
-                    }
+        for indicator in matches.get("project", {}):
+            project_name = self.extract_project_name(user_input, matches)
+            if project_name:
+                progress = {
+                    "status": indicator,
+                    "last_update": datetime.datetime.now().isoformat(),
+                    "details": user_input
+                }
+                self.memory_store.set("project_progress", project_name, progress)
+                self.index_memory_item("project_progress", project_name, progress)
+                self.memory_version += 1
         
         # Learn conversation patterns
-        self.learned_patterns["frequent_topics"][user_lower[:20]] = self.learned_patterns["frequent_topics"].get(user_lower[:20], 0) + 1
-        
-        self.save_data()
+        self.learning_store.incr("frequent_topics", user_lower[:20])
     
-    def extract_project_name(self, text):
+    def extract_project_name(self, text, matches=None):
         """Extract project name from text (basic implementation)"""
-        text_lower = text.lower()
-        
-        # Common project keywords
-        project_keywords = ["chatgpt", "ai", "bot", "app", "website", "script", "program", "project"]
+        if matches is None:
+            matches = self.learning_matcher.first_matches(text)
         
-        for keyword in project_keywords:
-            if keyword in text_lower:
-                # Simple extraction - can be improved
-                return keyword.capitalize() + " Project"
+        # Keywords come back in rule order, so earlier rules win
+        keywords = list(matches.get("project_keyword", {}))
+        if keywords:
+            # Simple extraction - can be improved
+            return keywords[0].capitalize() + " Project"
         
         return None
     
     def add_to_memory(self, category, item):
         """Add item to memory with timestamp"""
-        if category not in self.memory:
-            self.memory[category] = []
-        
-        memory_item = {
-            "timestamp": datetime.datetime.now().isoformat(),
-            "content": item
-        }
-        
-        self.memory[category].append(memory_item)
-        
-        # Keep memory manageable
-        if len(self.memory[category]) > 50:
-            self.memory[category] = self.memory[category][-50:]
+        timestamp = datetime.datetime.now().isoformat()
+        
+        if self.memory_store.is_keyed(category):
+            # Keyed categories such as preferences
+            self.memory_store.set(category, timestamp, item)
+            self.index_memory_item(category, timestamp, item)
+        else:
+            # Keep the JSON journal manageable; SQLite keeps everything
+            self.memory_store.append(category, {"timestamp": timestamp, "content": item}, limit=self.memory_limit)
+            self.index_memory_item(category, None, item)
+        self.memory_version += 1
     
     def get_response(self, user_input):
-        """Get intelligent response with learning"""
+        """Stream an intelligent response to the terminal, with learning, and return it"""
         try:
+            return self.generate_response(user_input)
+        except Exception as e:
+            error = f"❌ Error: {str(e)}"
+            print(error)
+            return error
+    
+    def generate_response(self, user_input, out=None):
+        """Stream a response with learning to out (the terminal by default) and return it
+        
+        Errors are raised, after the unanswered message is dropped from the history.
+        """
+        user_message = {"role": "user", "content": user_input}
+        try:
+            # Pick up summaries the background worker has finished
+            self.store_summaries(self.summarizer.drain())
+            
             # Create dynamic system prompt
-            system_prompt = self.create_dynamic_system_prompt()
+            system_prompt = self.create_dynamic_system_prompt(user_input)
             
-            # Add user message
-            user_message = {"role": "user", "content": user_input}
+            # Add user message, dropping old turns that no longer fit the token budget
+            self.conversation_history.append(user_message)
+            self.evicted_history.extend(self.conversation_history.trim())
             
             # Create messages
             messages = [
                 {"role": "system", "content": system_prompt}
-            ] + self.conversation_history + [user_message]
+            ] + self.conversation_history.messages
             
-            # API call with enhanced parameters
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            # API call with enhanced parameters, printing the reply as it arrives (Ctrl-C stops it)
+            result = stream_chat(
+                self.client,
+                out=out,
+                show_stats=out is None,
+                model=self.model,
                 messages=messages,
                 max_tokens=1500,
                 temperature=0.9,  # Higher creativity for personality
@@ -254,42 +433,70 @@ Reference shared history and be genuinely helpful as their personal AI assistant
                 frequency_penalty=0.1,  # Reduce repetition
                 top_p=0.95
             )
+            self.last_reply_stats = result
             
-            ai_response = response.choices[0].message.content
+            ai_response = result.text
+            if not ai_response:
+                # Stopped before any text arrived
+                self.conversation_history.discard_last(user_message)
+                return ai_response
             
-            # Update conversation history
-            self.conversation_history.append(user_message)
+            # Update conversation history with only what was actually produced
             self.conversation_history.append({"role": "assistant", "content": ai_response})
             
             # Intelligent learning
             self.intelligent_learning(user_input, ai_response)
             
-            # Keep conversation manageable
-            if len(self.conversation_history) > 24:
-                # Summarize old conversations before removing
+            # Keep conversation within the token budget, summarizing what falls out
+            self.evicted_history.extend(self.conversation_history.trim())
+            if len(self.evicted_history) >= 10:
                 self.summarize_old_conversation()
-                self.conversation_history = self.conversation_history[-20:]
             
             return ai_response
             
-        except Exception as e:
-            return f"❌ Error: {str(e)}"
+        except Exception:
+            # Don't keep a question that never got an answer
+            self.conversation_history.discard_last(user_message)
+            raise
     
     def summarize_old_conversation(self):
-        """Summarize old conversations for memory"""
-        if len(self.conversation_history) > 10:
-            old_conv = self.conversation_history[:10]
-            summary = f"Previous conversation on {datetime.datetime.now().date()}: "
-            summary += f"Discussed {len(old_conv)//2} topics including "
-            
-            # Extract key topics (simple implementation)
-            topics = []
-            for msg in old_conv:
-                if msg["role"] == "user":
-                    words = msg["content"].lower().split()
-                    topics.extend([w for w in words if len(w) > 5])
-            
-            summary += ", ".join(list(set(topics))[:5])
+        """Hand evicted conversation turns to the background summarizer"""
+        if self.evicted_history:
+            self.summarizer.submit(self.evicted_history)
+            self.evicted_history = []
+    
+    def summarize_turns(self, messages):
+        """Summarize conversation turns for memory (runs on the summarizer's worker thread)"""
+        summary = None
+        if self.summary_model:
+            transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in messages)
+            try:
+                with self.upstream_limiter or nullcontext():
+                    response = self.client.chat.completions.create(
+                        model=self.summary_model,
+                        messages=[
+                            {"role": "system",
+                             "content": f"Summarize this conversation in 2-3 sentences. "
+                                        f"Keep facts, decisions and open questions about {self.owner_name}."},
+                            {"role": "user", "content": transcript}
+                        ],
+                        max_tokens=150,
+                        temperature=0.3
+                    )
+                if self.usage_hook and response.usage:
+                    self.usage_hook(self.summary_model, response.usage.prompt_tokens,
+                                    response.usage.completion_tokens)
+                summary = response.choices[0].message.content
+            except Exception:
+                pass  # Offline or rate limited: summarize locally instead
+        
+        if not summary:
+            summary = extractive_summary(messages)
+        return f"Previous conversation on {datetime.datetime.now().date()}: {summary}"
+    
+    def store_summaries(self, summaries):
+        """Save finished summaries into memory (on the caller's thread)"""
+        for summary in summaries:
             self.add_to_memory("conversation_summaries", summary)
     
     def show_advanced_memory(self):
@@ -306,14 +513,14 @@ Reference shared history and be genuinely helpful as their personal AI assistant
         ]
         
         for title, category in categories:
-            if category in self.memory and self.memory[category]:
+            if self.memory_store.count(category):
                 print(f"\n📝 {title}:")
                 
-                if isinstance(self.memory[category], dict):
-                    for key, value in list(self.memory[category].items())[-3:]:
+                if self.memory_store.is_keyed(category):
+                    for key, value in self.memory_store.recent_items(category, 3):
                         print(f"  • {key}: {value}")
                 else:
-                    for item in self.memory[category][-3:]:
+                    for item in self.memory_store.recent(category, 3):
                         if isinstance(item, dict):
                             content = item.get("content", item)
                             if isinstance(content, dict):
@@ -324,11 +531,10 @@ Reference shared history and be genuinely helpful as their personal AI assistant
                             print(f"  • {str(item)[:80]}")
         
         # Show learning patterns
-        if self.learned_patterns["frequent_topics"]:
+        top_topics = self.learning_store.top("frequent_topics", 5)
+        if top_topics:
             print(f"\n🎯 Most Discussed Topics:")
-            sorted_topics = sorted(self.learned_patterns["frequent_topics"].items(), 
-                                 key=lambda x: x[1], reverse=True)
-            for topic, count in sorted_topics[:5]:
+            for topic, count in top_topics:
                 print(f"  • {topic.capitalize()}: {count} times")
         
         print()
@@ -339,9 +545,9 @@ Reference shared history and be genuinely helpful as their personal AI assistant
         print("=" * 70)
         print(f"Hello {self.owner_name}! I'm your advanced personal AI assistant.")
         print("I learn from our conversations and adapt to your preferences.")
-        print(f"\nMemory: {len(self.memory.get('personal_facts', []))} facts, "
-              f"{len(self.memory.get('goals', []))} goals, "
-              f"{len(self.memory.get('project_progress', {}))} projects tracked")
+        print(f"\nMemory: {self.memory_store.count('personal_facts')} facts, "
+              f"{self.memory_store.count('goals')} goals, "
+              f"{self.memory_store.count('project_progress')} projects tracked")
         print("\nCommands:")
         print("  • 'memory' - View my detailed memory about you")
         print("  • 'clear' - Clear current conversation (keep memory)")
@@ -363,24 +569,25 @@ Reference shared history and be genuinely helpful as their personal AI assistant
                     continue
                 
                 elif user_input.lower() == 'clear':
-                    self.conversation_history = []
+                    self.conversation_history.clear()
                     print(f"\n🤖 {self.ai_name}: Conversation cleared! I still remember everything about you though.")
                     continue
                 
                 elif user_input.lower() == 'reset':
                     confirm = input("Are you sure you want to reset all memory? (yes/no): ")
                     if confirm.lower() == 'yes':
-                        self.memory = self.load_memory().__class__()  # Reset to empty
-                        self.learned_patterns = self.load_learning().__class__()  # Reset to empty
+                        self.memory_store.reset()
+                        self.learning_store.reset()
+                        self.index_memory()
+                        self.memory_version += 1
                         print(f"\n🤖 {self.ai_name}: Memory reset! Starting fresh.")
                     continue
                 
                 if not user_input:
                     continue
                 
-                print(f"\n🤖 {self.ai_name}: ", end="")
-                response = self.get_response(user_input)
-                print(response)
+                print(f"\n🤖 {self.ai_name}: ", end="", flush=True)
+                self.get_response(user_input)
                 
             except KeyboardInterrupt:
                 print(f"\n\n🤖 {self.ai_name}: Until next time, {self.owner_name}! 👋")
@@ -392,7 +599,10 @@ def main():
     """Main function"""
     try:
         ai = AdvancedPersonalAI()
-        ai.chat()
+        try:
+            ai.chat()
+        finally:
+            ai.close()
     except Exception as e:
         print(f"Error starting Advanced Personal AI: {e}")
 
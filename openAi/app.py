@@ -1,11 +1,26 @@
-from flask import Flask, request, jsonify, render_template, session
+from flask import Flask, request, jsonify, render_template, session, Response, stream_with_context, g
 from flask_cors import CORS
 import os
 import json
+import atexit
+import hashlib
 import datetime
+import time
+import openai
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai_client import create_client
 import uuid
+from conversation_store import create_conversation_store
+from context_window import ContextWindow, count_tokens, DEFAULT_PROMPT_BUDGET
+from response_cache import create_response_cache
+from singleflight import SingleFlight
+from rate_limit import RateLimited, TokenBucketLimiter, ConcurrencyLimiter, check_limits
+from advanced_personal_ai import AdvancedPersonalAI
+from personal_ai_service import PersonalAIService
+from metrics import Registry
+from usage_ledger import BudgetExceeded, create_usage_ledger
+from model_router import ModelRouter
+from upstream import ResilientUpstream, UpstreamUnavailable, parse_fallbacks
 
 # Load environment variables
 load_dotenv()
@@ -21,7 +36,8 @@ try:
     api_key = os.getenv('OPENAI_API_KEY')
     if not api_key or api_key == 'your_openai_api_key_here':
         raise ValueError("OpenAI API key not properly configured")
-    client = OpenAI(api_key=api_key)
+    # Pooled client; OPENAI_BASE_URL can point at an OpenAI-compatible server such as mock_openai_server.py
+    client = create_client(api_key=api_key)
 except Exception as e:
     print(f"Error initializing OpenAI client: {e}")
     client = None
@@ -31,8 +47,188 @@ DEFAULT_MODEL = os.getenv('DEFAULT_MODEL', 'gpt-4o-mini')
 MAX_TOKENS = int(os.getenv('MAX_TOKENS', 1500))
 TEMPERATURE = float(os.getenv('TEMPERATURE', 0.7))
 
-# In-memory storage for conversations (use database in production)
-conversations = {}
+# Models offered through /api/models
+AVAILABLE_MODELS = [
+    {"id": "gpt-4o-mini", "name": "GPT-4o Mini (Recommended)"},
+    {"id": "gpt-4o", "name": "GPT-4o"},
+    {"id": "gpt-3.5-turbo", "name": "GPT-3.5 Turbo"},
+    {"id": "gpt-4", "name": "GPT-4"},
+    {"id": "gpt-4-turbo", "name": "GPT-4 Turbo"}
+]
+
+# Off by default. When enabled, simple requests go to a fast model and hard ones (code, long
+# messages, reasoning requests) to a stronger one; a "model" field in the request wins.
+# The fast model defaults to DEFAULT_MODEL, so with the defaults routing only ever upgrades
+# requests; to save cost, point ROUTER_FAST_MODEL at a cheaper model than DEFAULT_MODEL
+model_router = ModelRouter(
+    fast_model=os.getenv('ROUTER_FAST_MODEL', DEFAULT_MODEL),
+    strong_model=os.getenv('ROUTER_STRONG_MODEL', 'gpt-4o'),
+    enabled=os.getenv('MODEL_ROUTING', 'false').lower() == 'true',
+    max_simple_tokens=int(os.getenv('ROUTER_MAX_SIMPLE_TOKENS', 300)),
+    max_simple_history=int(os.getenv('ROUTER_MAX_SIMPLE_HISTORY', 12))
+)
+
+# Conversation storage (bounded in-process LRU by default, Redis when CONVERSATION_STORE=redis)
+conversations = create_conversation_store()
+
+# Cache of answers to first-turn questions, shared by all conversations
+response_cache = create_response_cache()
+
+# Identical concurrent requests share one upstream call; by default only for
+# first-turn messages, since continuing conversations rarely match exactly
+COALESCE_REQUESTS = os.getenv('COALESCE_REQUESTS', 'true').lower() == 'true'
+COALESCE_WITH_HISTORY = os.getenv('COALESCE_WITH_HISTORY', 'false').lower() == 'true'
+upstream_calls = SingleFlight()
+
+# Per-client and per-conversation message rates (0 disables a limit), and a cap
+# on concurrent upstream calls with a bounded wait for a free slot
+ip_limiter = TokenBucketLimiter(
+    rate_per_minute=float(os.getenv('RATE_LIMIT_IP_PER_MINUTE', 30)),
+    burst=int(os.getenv('RATE_LIMIT_IP_BURST', 10))
+)
+conversation_limiter = TokenBucketLimiter(
+    rate_per_minute=float(os.getenv('RATE_LIMIT_CONVERSATION_PER_MINUTE', 10)),
+    burst=int(os.getenv('RATE_LIMIT_CONVERSATION_BURST', 5))
+)
+upstream_limiter = ConcurrencyLimiter(
+    max_concurrent=int(os.getenv('UPSTREAM_MAX_CONCURRENCY', 32)),
+    queue_timeout=float(os.getenv('UPSTREAM_QUEUE_TIMEOUT', 10))
+)
+
+# Slow calls get a hedged second attempt at the recent p95 (or HEDGE_DELAY
+# seconds), and failing models or endpoints are skipped by a circuit breaker in
+# favour of UPSTREAM_FALLBACKS ("model" or "model@base_url", comma separated)
+upstream = ResilientUpstream(
+    fallbacks=parse_fallbacks(os.getenv('UPSTREAM_FALLBACKS', ''), api_key=os.getenv('OPENAI_API_KEY')),
+    hedge=os.getenv('HEDGE_REQUESTS', 'true').lower() == 'true',
+    hedge_delay=float(os.getenv('HEDGE_DELAY')) if os.getenv('HEDGE_DELAY') else None,
+    hedge_min_delay=float(os.getenv('HEDGE_MIN_DELAY', 0.5)),
+    hedge_max_ratio=float(os.getenv('HEDGE_MAX_RATIO', 0.05)),
+    deadline=float(os.getenv('UPSTREAM_DEADLINE', 60)),
+    failure_threshold=int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5)),
+    reset_timeout=float(os.getenv('BREAKER_RESET_SECONDS', 30)),
+    max_workers=2 * (int(os.getenv('UPSTREAM_MAX_CONCURRENCY', 32)) or 32),  # 0 means no cap, not no threads
+    limiter=upstream_limiter,
+    on_error=lambda e: UPSTREAM_ATTEMPT_ERRORS.inc(type=error_type(e))
+)
+TRUST_PROXY_HEADERS = os.getenv('TRUST_PROXY_HEADERS', 'false').lower() == 'true'
+
+def client_ip():
+    """Address of the caller, from X-Forwarded-For when running behind a trusted proxy"""
+    if TRUST_PROXY_HEADERS and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr
+
+# Token and cost ledger with optional budgets; ADMIN_TOKEN enables /api/admin/usage
+usage_ledger = create_usage_ledger()
+atexit.register(usage_ledger.close)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+# Metrics served at /metrics (METRICS_TOKEN protects the endpoint when set)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+metrics = Registry()
+REQUEST_SECONDS = metrics.histogram(
+    'tara_request_duration_seconds', 'Time to answer a non-streaming request', ['route'])
+REQUEST_UPSTREAM_SECONDS = metrics.histogram(
+    'tara_request_upstream_seconds', 'Part of a request spent waiting on the model', ['route'])
+REQUEST_LOCAL_SECONDS = metrics.histogram(
+    'tara_request_local_seconds', 'Part of a request spent in the app itself', ['route'])
+RESPONSES = metrics.counter('tara_responses_total', 'Responses sent, by route and status code', ['route', 'status'])
+TIME_TO_FIRST_TOKEN = metrics.histogram(
+    'tara_time_to_first_token_seconds', 'Time from a streamed request to its first text', ['model'])
+STREAM_SECONDS = metrics.histogram('tara_stream_duration_seconds', 'Time to stream a full reply', ['model'])
+PROMPT_TOKENS = metrics.counter('tara_prompt_tokens_total', 'Prompt tokens sent upstream', ['model'])
+COMPLETION_TOKENS = metrics.counter('tara_completion_tokens_total', 'Completion tokens received', ['model'])
+UPSTREAM_ERRORS = metrics.counter(
+    'tara_upstream_errors_total', 'Requests that failed upstream, by type (quota, auth, timeout, ...)', ['type'])
+UPSTREAM_ATTEMPT_ERRORS = metrics.counter(
+    'tara_upstream_attempt_errors_total', 'Failed upstream attempts, including ones a hedge or fallback recovered',
+    ['type'])
+ROUTED = metrics.counter('tara_routed_requests_total', 'Requests by route and chosen model', ['route', 'model'])
+ROUTE_UPSTREAM_SECONDS = metrics.histogram(
+    'tara_route_upstream_seconds', 'Upstream time of a reply by route', ['route'])
+COALESCED = metrics.counter('tara_coalesced_requests_total', 'Requests answered by an identical call in flight')
+metrics.gauge('tara_active_conversations', 'Conversations in the conversation store', lambda: len(conversations))
+metrics.gauge('tara_response_cache_lookups_total', 'Response cache lookups by result',
+              lambda: {(result,): response_cache.stats()[key]
+                       for result, key in (("hit", "hits"), ("similar_hit", "similar_hits"), ("miss", "misses"))},
+              labels=['result'], kind='counter')
+metrics.gauge('tara_response_cache_hit_ratio', 'Share of response cache lookups answered from the cache',
+              lambda: response_cache.stats()['hit_rate'])
+metrics.gauge('tara_upstream_active', 'Upstream calls holding a concurrency slot',
+              lambda: upstream_limiter.stats()['active'])
+metrics.gauge('tara_upstream_waiting', 'Requests waiting for an upstream slot',
+              lambda: upstream_limiter.stats()['waiting'])
+metrics.gauge('tara_upstream_rejected_total', 'Requests refused after waiting for an upstream slot',
+              lambda: upstream_limiter.stats()['rejected'], kind='counter')
+metrics.gauge('tara_hedged_requests_total', 'Hedged second attempts by outcome',
+              lambda: {("sent",): upstream.hedges_sent, ("won",): upstream.hedges_won,
+                        ("skipped",): upstream.hedges_skipped},
+              labels=['outcome'], kind='counter')
+metrics.gauge('tara_fallback_requests_total', 'Requests answered by a fallback target',
+              lambda: upstream.fallbacks_used, kind='counter')
+metrics.gauge('tara_circuit_open', 'Whether a target\'s circuit breaker is open (0.5 while half open)',
+              lambda: {(name,): {"closed": 0, "half_open": 0.5, "open": 1}[target["state"]]
+                       for name, target in upstream.stats()["targets"].items()},
+              labels=['target'])
+metrics.gauge('tara_cost_usd_total', 'Estimated upstream cost in USD',
+              lambda: {(model,): usage.cost for model, usage in list(usage_ledger.by_model.items())},
+              labels=['model'], kind='counter')
+
+def error_type(error):
+    """Classify an upstream failure for error counters"""
+    if isinstance(error, (openai.APITimeoutError, TimeoutError)):
+        return "timeout"
+    if isinstance(error, UpstreamUnavailable):
+        return "unavailable"  # Every target failed or had its circuit open
+    if isinstance(error, openai.APIConnectionError):
+        return "connection"
+    if isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError)):
+        return "auth"
+    if isinstance(error, openai.RateLimitError):
+        # OpenAI reports an exhausted balance as a 429 too
+        return "quota" if "insufficient_quota" in str(error) else "rate_limit"
+    if isinstance(error, openai.BadRequestError):
+        return "bad_request"
+    if isinstance(error, openai.APIStatusError):
+        return "server"
+    return "other"
+
+def record_usage(model, prompt_tokens, completion_tokens, conversation_id=None, ip=None):
+    """Add a call's token usage to the per-model counters and the usage ledger"""
+    if prompt_tokens:
+        PROMPT_TOKENS.inc(prompt_tokens, model=model)
+    if completion_tokens:
+        COMPLETION_TOKENS.inc(completion_tokens, model=model)
+    usage_ledger.record(model, prompt_tokens, completion_tokens, conversation_id, ip)
+
+# Personal assistants with memory per user (off by default, since they write
+# memory files for every user); PERSONAL_AI_TOKEN protects the endpoints
+PERSONAL_AI_ENABLED = os.getenv('PERSONAL_AI_ENABLED', 'false').lower() == 'true'
+PERSONAL_AI_TOKEN = os.getenv('PERSONAL_AI_TOKEN')
+personal_ai = None
+if PERSONAL_AI_ENABLED and client is not None:
+    personal_ai = PersonalAIService(
+        root_dir=os.getenv('PERSONAL_AI_DIR', 'personal_ai_data'),
+        client=client,
+        config=AdvancedPersonalAI.load_config(os.getenv(
+            'PERSONAL_AI_CONFIG',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai_config.json')
+        )),
+        max_active=int(os.getenv('PERSONAL_AI_MAX_ACTIVE', 256)),
+        idle_seconds=float(os.getenv('PERSONAL_AI_IDLE_SECONDS', 900)),
+        upstream_limiter=upstream_limiter,
+        usage_hook=record_usage
+    )
+    # Save memory that is still loaded when the server stops
+    atexit.register(personal_ai.close)
+    metrics.gauge('tara_personal_assistants_loaded', 'Personal assistants held in memory',
+                  lambda: personal_ai.stats()['active'])
+
+def request_key(model, messages):
+    """Key identifying an upstream request by model and full message list"""
+    payload = json.dumps([model, messages], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
 
 class WebChatGPT:
     def __init__(self):
@@ -41,7 +237,29 @@ class WebChatGPT:
         self.developer = "Aman Verma"
         self.version = "1.0"
         
+        # Prompt cache, invalidated whenever the config version changes
+        self.config_version = 0
+        self._prompt_version = None
+        self._system_prompt = None
+        
+    def update_config(self, **settings):
+        """Update identity settings and invalidate the cached system prompt"""
+        for key, value in settings.items():
+            setattr(self, key, value)
+        self.config_version += 1
+        
+        # Cached answers were written under the old prompt
+        response_cache.clear()
+        
     def create_system_prompt(self):
+        """Return the personalized system prompt, rebuilt only after config changes"""
+        if self._prompt_version != self.config_version:
+            self._system_prompt = self.build_system_prompt()
+            self.system_prompt_tokens = count_tokens(self._system_prompt, DEFAULT_MODEL)
+            self._prompt_version = self.config_version
+        return self._system_prompt
+        
+    def build_system_prompt(self):
         """Create personalized system prompt"""
         return f"""You are {self.ai_name}, a female personal AI assistant developed by {self.developer}.
 
@@ -96,8 +314,33 @@ FEMALE AI BEHAVIORS:
 
 Remember: You are Tara, a female AI assistant who is proud to be {self.owner_name}'s personal creation. Be warm, intelligent, and supportive while providing excellent technical assistance."""
 
-    def get_response(self, message, conversation_id):
-        """Get AI response with conversation memory"""
+    def build_messages(self, message, conversation_id):
+        """Build the API message list for a new user message within the token budget"""
+        system_prompt = self.create_system_prompt()
+        window = ContextWindow.from_dict(
+            conversations.get(conversation_id),
+            token_budget=DEFAULT_PROMPT_BUDGET,
+            reserved_tokens=self.system_prompt_tokens,
+            model=DEFAULT_MODEL
+        )
+        
+        window.append({"role": "user", "content": message})
+        window.trim()
+        
+        messages = [{"role": "system", "content": system_prompt}] + window.messages
+        return window, messages
+    
+    def save_exchange(self, conversation_id, window, ai_response):
+        """Add the assistant reply to the conversation and store it"""
+        window.append({"role": "assistant", "content": ai_response})
+        window.trim()
+        conversations.save(conversation_id, window.to_dict())
+    
+    def get_response(self, message, conversation_id, ip=None, model=None):
+        """Get AI response with conversation memory, within the usage budgets
+        
+        model overrides the model router's choice.
+        """
         try:
             # Check if OpenAI client is available
             if client is None:
@@ -107,55 +350,260 @@ Remember: You are Tara, a female AI assistant who is proud to be {self.owner_nam
                     "response": "Sorry, the AI service is not available. Please check the API configuration."
                 }
             
-            # Get or create conversation history
-            if conversation_id not in conversations:
-                conversations[conversation_id] = []
+            # Create messages for API
+            window, messages = self.build_messages(message, conversation_id)
             
-            conversation = conversations[conversation_id]
+            # The model asked for, or the cheapest one that suits the request
+            route = model_router.choose(message, window.messages[:-1], model)
+            model = route.model
+            ROUTED.inc(route=route.route, model=model)
             
-            # Add user message
-            user_message = {"role": "user", "content": message}
-            conversation.append(user_message)
+            # Answers only depend on the prompt when there is no earlier history
+            cacheable = len(window) == 1
+            cached_response = response_cache.get(message, model) if cacheable else None
+            if cached_response is not None:
+                self.save_exchange(conversation_id, window, cached_response)
+                model_router.observe(route)
+                return {
+                    "success": True,
+                    "response": cached_response,
+                    "model": model,
+                    "route": route.route,
+                    "tokens_used": 0,
+                    "cached": True
+                }
             
-            # Create messages for API
-            messages = [
-                {"role": "system", "content": self.create_system_prompt()}
-            ] + conversation
+            # Refuse before spending anything once a budget is used up
+            usage_ledger.check(conversation_id, ip)
             
-            # Make API call
-            response = client.chat.completions.create(
-                model=DEFAULT_MODEL,
-                messages=messages,
-                max_tokens=MAX_TOKENS,
-                temperature=TEMPERATURE
-            )
+            # Make API call, shared with identical requests already in flight;
+            # hedged when slow and moved down the fallback chain when it fails
+            def discarded(response, answered_model):
+                if getattr(response, 'usage', None):
+                    record_usage(answered_model, response.usage.prompt_tokens, response.usage.completion_tokens,
+                                 conversation_id, ip)
             
-            ai_response = response.choices[0].message.content
+            def call_upstream():
+                # Holds an upstream_limiter slot until every attempt (hedges too) has finished
+                return upstream.call(
+                    client, model,
+                    on_discarded=discarded,
+                    messages=messages,
+                    max_tokens=MAX_TOKENS,
+                    temperature=TEMPERATURE
+                )
             
-            # Add AI response to conversation
-            conversation.append({"role": "assistant", "content": ai_response})
+            upstream_start = time.perf_counter()
+            if COALESCE_REQUESTS and (cacheable or COALESCE_WITH_HISTORY):
+                (response, answered_model), coalesced = upstream_calls.do(request_key(model, messages), call_upstream)
+            else:
+                (response, answered_model), coalesced = call_upstream(), False
+            upstream_seconds = time.perf_counter() - upstream_start
+            g.upstream_time = g.get('upstream_time', 0.0) + upstream_seconds
+            model_router.observe(route, upstream_seconds)
+            ROUTE_UPSTREAM_SECONDS.observe(upstream_seconds, route=route.route)
             
-            # Keep conversation manageable
-            if len(conversation) > 20:
-                conversations[conversation_id] = conversation[-20:]
+            ai_response = response.choices[0].message.content
+            if coalesced:
+                COALESCED.inc()
+            elif getattr(response, 'usage', None):
+                record_usage(answered_model, response.usage.prompt_tokens, response.usage.completion_tokens,
+                             conversation_id, ip)
             
-            return {
+            # Add exchange to conversation; a fallback's answer is not cached as the routed model's
+            self.save_exchange(conversation_id, window, ai_response)
+            if cacheable and answered_model == model:
+                response_cache.set(message, model, ai_response)
+            
+            result = {
                 "success": True,
                 "response": ai_response,
-                "model": DEFAULT_MODEL,
+                "model": answered_model,
+                "route": route.route,
                 "tokens_used": response.usage.total_tokens if hasattr(response, 'usage') else None
             }
+            if coalesced:
+                # Tokens were paid for by the request that made the call
+                result["tokens_used"] = 0
+                result["coalesced"] = True
+            return result
             
+        except (RateLimited, BudgetExceeded):
+            raise
         except Exception as e:
+            UPSTREAM_ERRORS.inc(type=error_type(e))
             return {
                 "success": False,
                 "error": str(e),
                 "response": f"Sorry, I encountered an error: {str(e)}"
             }
 
+    def stream_response(self, message, conversation_id, ip=None, model=None):
+        """Stream AI response as server-sent events, saving the full reply when done"""
+        if client is None:
+            yield sse_event({
+                "success": False,
+                "error": "OpenAI API not properly configured",
+                "done": True
+            })
+            return
+        
+        # Create messages for API
+        window, messages = self.build_messages(message, conversation_id)
+        
+        # The model asked for, or the cheapest one that suits the request
+        route = model_router.choose(message, window.messages[:-1], model)
+        model = route.model
+        ROUTED.inc(route=route.route, model=model)
+        
+        # Answers only depend on the prompt when there is no earlier history
+        cacheable = len(window) == 1
+        cached_response = response_cache.get(message, model) if cacheable else None
+        if cached_response is not None:
+            self.save_exchange(conversation_id, window, cached_response)
+            model_router.observe(route)
+            yield sse_event({"delta": cached_response})
+            yield sse_event({
+                "success": True,
+                "done": True,
+                "conversation_id": conversation_id,
+                "model": model,
+                "route": route.route,
+                "tokens_used": 0,
+                "cached": True,
+                "timestamp": datetime.datetime.now().isoformat()
+            })
+            return
+        
+        try:
+            usage_ledger.check(conversation_id, ip)
+        except BudgetExceeded as e:
+            yield sse_event({
+                "success": False,
+                "error": str(e),
+                "budget_exceeded": True,
+                "done": True
+            })
+            return
+        
+        chunks = []
+        answered_model = model
+        tokens_used = None
+        completed = False
+        started = time.perf_counter()
+        try:
+            # Falls back to the next target if the stream cannot be opened
+            stream, answered_model = upstream.open_stream(
+                client, model,
+                messages=messages,
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+                stream_options={"include_usage": True}
+            )
+            
+            for chunk in stream:
+                # The final usage chunk carries no choices
+                if getattr(chunk, 'usage', None):
+                    tokens_used = chunk.usage.total_tokens
+                    record_usage(answered_model, chunk.usage.prompt_tokens, chunk.usage.completion_tokens,
+                                 conversation_id, ip)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not chunks:
+                        TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started, model=answered_model)
+                    chunks.append(delta)
+                    yield sse_event({"delta": delta})
+            completed = True
+            stream_seconds = time.perf_counter() - started
+            STREAM_SECONDS.observe(stream_seconds, model=answered_model)
+            model_router.observe(route, stream_seconds)
+            ROUTE_UPSTREAM_SECONDS.observe(stream_seconds, route=route.route)
+            
+            yield sse_event({
+                "success": True,
+                "done": True,
+                "conversation_id": conversation_id,
+                "model": answered_model,
+                "route": route.route,
+                "tokens_used": tokens_used,
+                "timestamp": datetime.datetime.now().isoformat()
+            })
+            
+        except Exception as e:
+            UPSTREAM_ERRORS.inc(type=error_type(e))
+            yield sse_event({
+                "success": False,
+                "error": str(e),
+                "done": True
+            })
+            
+        finally:
+            # Runs on completion and on client disconnect, so any text already sent is kept
+            if chunks:
+                self.save_exchange(conversation_id, window, "".join(chunks))
+                if cacheable and completed and answered_model == model:
+                    response_cache.set(message, model, "".join(chunks))
+
+def sse_event(payload):
+    """Format a payload as a server-sent event"""
+    return f"data: {json.dumps(payload)}\n\n"
+
 # Initialize ChatGPT instance
 chatgpt = WebChatGPT()
 
+@app.before_request
+def start_timer():
+    """Start timing the request"""
+    g.request_start = time.perf_counter()
+    g.upstream_time = 0.0
+
+@app.after_request
+def add_server_timing(response):
+    """Report upstream and local processing time in a Server-Timing header and in metrics"""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    RESPONSES.inc(route=route, status=response.status_code)
+    if 'request_start' in g and response.mimetype != 'text/event-stream':
+        total = time.perf_counter() - g.request_start
+        REQUEST_SECONDS.observe(total, route=route)
+        REQUEST_UPSTREAM_SECONDS.observe(g.upstream_time, route=route)
+        REQUEST_LOCAL_SECONDS.observe(total - g.upstream_time, route=route)
+        
+        total_ms = total * 1000
+        upstream_ms = g.upstream_time * 1000
+        response.headers['Server-Timing'] = (
+            f"upstream;dur={upstream_ms:.2f}, app;dur={total_ms - upstream_ms:.2f}, total;dur={total_ms:.2f}"
+        )
+    return response
+
+@app.errorhandler(RateLimited)
+def rate_limited(e):
+    """Refuse with 429 and tell the client when to retry"""
+    response = jsonify({
+        "success": False,
+        "error": str(e),
+        "response": "Sorry, too many requests right now. Please try again in a moment.",
+        "retry_after": int(e.retry_after_header)
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = e.retry_after_header
+    return response
+
+@app.errorhandler(BudgetExceeded)
+def budget_exceeded(e):
+    """Refuse with 429 once a usage budget is spent"""
+    response = jsonify({
+        "success": False,
+        "error": str(e),
+        "response": f"Sorry, {str(e)[0].lower()}{str(e)[1:]}",
+        "budget_exceeded": True
+    })
+    response.status_code = 429
+    if e.retry_after is not None:
+        response.headers['Retry-After'] = str(int(e.retry_after) + 1)
+    return response
+
 @app.route('/')
 def home():
     """Serve the main chat interface"""
@@ -175,15 +623,107 @@ def chat():
             return jsonify({"error": "Message cannot be empty"}), 400
         
         # Get or create conversation ID
-        conversation_id = data.get('conversation_id', str(uuid.uuid4()))
+        conversation_id = data.get('conversation_id') or str(uuid.uuid4())
+        
+        # An explicit model must be one that is offered
+        model = data.get('model')
+        if model and model not in {option["id"] for option in AVAILABLE_MODELS}:
+            return jsonify({"error": f"Unknown model: {model}"}), 400
+        
+        limits = [(ip_limiter, client_ip(), "messages from this address")]
+        if data.get('conversation_id'):
+            limits.append((conversation_limiter, conversation_id, "messages in this conversation"))
+        check_limits(*limits)
+        
+        # Stream tokens as server-sent events when requested
+        if data.get('stream'):
+            # Hold an upstream slot until the stream is closed, even if the client disconnects
+            upstream_limiter.acquire()
+            response = Response(
+                stream_with_context(chatgpt.stream_response(message, conversation_id, client_ip(), model)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+            response.call_on_close(upstream_limiter.release)
+            return response
         
         # Get AI response
-        result = chatgpt.get_response(message, conversation_id)
+        result = chatgpt.get_response(message, conversation_id, ip=client_ip(), model=model)
         result['conversation_id'] = conversation_id
         result['timestamp'] = datetime.datetime.now().isoformat()
         
         return jsonify(result)
         
+    except (RateLimited, BudgetExceeded):
+        raise
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "response": "Sorry, I encountered an error processing your request."
+        }), 500
+
+def personal_ai_request():
+    """Validate a personal assistant request; returns (data, error response)"""
+    if personal_ai is None:
+        return None, (jsonify({"success": False, "error": "Personal assistants are not enabled"}), 404)
+    if PERSONAL_AI_TOKEN and request.headers.get('Authorization') != f"Bearer {PERSONAL_AI_TOKEN}":
+        return None, (jsonify({"success": False, "error": "Unauthorized"}), 401)
+    
+    data = request.get_json(silent=True) or {}
+    if not PersonalAIService.valid_user_id(data.get('user_id')):
+        return None, (jsonify({"success": False, "error": "user_id must be 1-64 letters, digits, '-' or '_'"}), 400)
+    return data, None
+
+@app.route('/api/personal/chat', methods=['POST'])
+def personal_chat():
+    """Chat with a user's own assistant, which remembers them between sessions"""
+    try:
+        data, error = personal_ai_request()
+        if error:
+            return error
+        
+        message = str(data.get('message', '')).strip()
+        if not message:
+            return jsonify({"error": "Message cannot be empty"}), 400
+        
+        user_id = data['user_id']
+        check_limits((ip_limiter, client_ip(), "messages from this address"),
+                     (conversation_limiter, f"user:{user_id}", "messages for this user"))
+        usage_ledger.check(f"user:{user_id}", client_ip())
+        
+        upstream_start = time.perf_counter()
+        try:
+            ai_response, stats = personal_ai.chat(user_id, message)
+        except RateLimited:
+            raise
+        except Exception as e:
+            UPSTREAM_ERRORS.inc(type=error_type(e))
+            return jsonify({
+                "success": False,
+                "error": str(e),
+                "response": f"Sorry, I encountered an error: {str(e)}"
+            })
+        finally:
+            g.upstream_time = g.get('upstream_time', 0.0) + time.perf_counter() - upstream_start
+        
+        if stats:
+            record_usage(AdvancedPersonalAI.model, stats.prompt_tokens, stats.completion_tokens,
+                         f"user:{user_id}", client_ip())
+            if stats.time_to_first_token is not None:
+                TIME_TO_FIRST_TOKEN.observe(stats.time_to_first_token, model=AdvancedPersonalAI.model)
+        
+        return jsonify({
+            "success": True,
+            "response": ai_response,
+            "user_id": user_id,
+            "model": AdvancedPersonalAI.model,
+            "completion_tokens": stats.completion_tokens if stats else None,
+            "timestamp": datetime.datetime.now().isoformat()
+        })
+        
+    except (RateLimited, BudgetExceeded):
+        raise
     except Exception as e:
         return jsonify({
             "success": False,
@@ -191,6 +731,16 @@ def chat():
             "response": "Sorry, I encountered an error processing your request."
         }), 500
 
+@app.route('/api/personal/clear', methods=['POST'])
+def personal_clear():
+    """Clear a user's current conversation; their memory is kept"""
+    data, error = personal_ai_request()
+    if error:
+        return error
+    
+    personal_ai.clear_conversation(data['user_id'])
+    return jsonify({"success": True, "message": "Conversation cleared"})
+
 @app.route('/api/clear', methods=['POST'])
 def clear_conversation():
     """Clear conversation history"""
@@ -198,8 +748,8 @@ def clear_conversation():
         data = request.get_json()
         conversation_id = data.get('conversation_id')
         
-        if conversation_id and conversation_id in conversations:
-            del conversations[conversation_id]
+        if conversation_id:
+            conversations.delete(conversation_id)
         
         return jsonify({"success": True, "message": "Conversation cleared"})
         
@@ -228,6 +778,11 @@ def status():
             "model": DEFAULT_MODEL,
             "api_connected": api_configured,
             "conversations_active": len(conversations),
+            "response_cache": response_cache.stats(),
+            "upstream": upstream_limiter.stats(),
+            "personal_ai": personal_ai.stats() if personal_ai else None,
+            "routing": model_router.stats(),
+            "resilience": upstream.stats(),
             "ai_name": "Tara",
             "developer": "Aman Verma"
         })
@@ -249,17 +804,39 @@ def health_check():
         "version": "1.0"
     })
 
+@app.route('/api/admin/usage', methods=['GET'])
+def admin_usage():
+    """Usage and cost totals, or one conversation's or address's usage"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if request.headers.get('Authorization') != f"Bearer {ADMIN_TOKEN}":
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    if request.args.get('conversation_id'):
+        return jsonify({"conversation_id": request.args['conversation_id'],
+                        **usage_ledger.conversation_usage(request.args['conversation_id'])})
+    if request.args.get('ip'):
+        return jsonify({"ip": request.args['ip'], **usage_ledger.ip_usage(request.args['ip'])})
+    return jsonify(usage_ledger.summary(top=request.args.get('top', 10, type=int)))
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Expose metrics in the Prometheus text format"""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/models', methods=['GET'])
 def get_models():
     """Get available models"""
     return jsonify({
-        "models": [
-            {"id": "gpt-4o-mini", "name": "GPT-4o Mini (Recommended)"},
-            {"id": "gpt-3.5-turbo", "name": "GPT-3.5 Turbo"},
-            {"id": "gpt-4", "name": "GPT-4"},
-            {"id": "gpt-4-turbo", "name": "GPT-4 Turbo"}
-        ],
-        "current": DEFAULT_MODEL
+        "models": AVAILABLE_MODELS,
+        "current": DEFAULT_MODEL,
+        "routing": {
+            "enabled": model_router.enabled,
+            "fast_model": model_router.fast_model,
+            "strong_model": model_router.strong_model
+        }
     })
 
 if __name__ == '__main__':
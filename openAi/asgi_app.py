@@ -0,0 +1,299 @@
+"""
+Tara - Async (ASGI) serving mode
+Serves the chat routes of app.py from an event loop, so idle and streaming
+connections cost no worker process. Chat requests go through the same
+WebChatGPT logic as app.py, on a thread pool: rate limits, budgets and the
+usage ledger, the response cache, coalescing, model routing, hedging and
+fallbacks, and metrics all apply. Upstream calls in flight are capped by
+UPSTREAM_MAX_CONCURRENCY (and ASGI_THREADS). Personal assistant endpoints
+are only served by app.py.
+
+Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+or:
+    gunicorn asgi_app:app -k uvicorn.workers.UvicornWorker
+"""
+
+import os
+import time
+import datetime
+import uuid
+import contextlib
+from anyio import to_thread
+from flask import g
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse, Response
+from starlette.routing import Route
+from starlette.templating import Jinja2Templates
+
+# Reuse the chat logic, shared state and configuration of the Flask app
+from app import (app as flask_app, chatgpt, client, conversations, AVAILABLE_MODELS, DEFAULT_MODEL,
+                 ip_limiter, conversation_limiter, upstream_limiter, TRUST_PROXY_HEADERS, response_cache,
+                 model_router, upstream, usage_ledger, ADMIN_TOKEN, metrics, METRICS_TOKEN, RESPONSES,
+                 REQUEST_SECONDS, REQUEST_UPSTREAM_SECONDS, REQUEST_LOCAL_SECONDS)
+from rate_limit import RateLimited, check_limits
+from usage_ledger import BudgetExceeded
+
+templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates'))
+
+# Threads for blocking upstream calls; each in-flight non-streaming chat or stream holds one
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 100))
+
+def client_ip(request):
+    """Address of the caller, from X-Forwarded-For when running behind a trusted proxy"""
+    forwarded = request.headers.get('x-forwarded-for')
+    if TRUST_PROXY_HEADERS and forwarded:
+        return forwarded.split(',')[0].strip()
+    return request.client.host if request.client else None
+
+def get_response(message, conversation_id, ip, model):
+    """Run WebChatGPT.get_response on a worker thread; returns (result, upstream seconds)"""
+    with flask_app.app_context():
+        g.upstream_time = 0.0
+        result = chatgpt.get_response(message, conversation_id, ip=ip, model=model)
+        return result, g.upstream_time
+
+async def stream_response(message, conversation_id, ip, model):
+    """Stream WebChatGPT.stream_response, releasing the upstream slot when the stream ends"""
+    events = chatgpt.stream_response(message, conversation_id, ip, model)
+    try:
+        async for event in iterate_in_threadpool(events):
+            yield event
+    finally:
+        # Runs on client disconnect too, so the reply so far is saved
+        await run_in_threadpool(events.close)
+        upstream_limiter.release()
+
+async def home(request):
+    """Serve the main chat interface"""
+    return templates.TemplateResponse(request, 'index.html')
+
+async def chat(request):
+    """Handle chat messages"""
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+
+        if not data or 'message' not in data:
+            return JSONResponse({"error": "Message is required"}, status_code=400)
+
+        message = data['message'].strip()
+        if not message:
+            return JSONResponse({"error": "Message cannot be empty"}, status_code=400)
+
+        conversation_id = data.get('conversation_id') or str(uuid.uuid4())
+
+        # An explicit model must be one that is offered
+        model = data.get('model')
+        if model and model not in {option["id"] for option in AVAILABLE_MODELS}:
+            return JSONResponse({"error": f"Unknown model: {model}"}, status_code=400)
+
+        ip = client_ip(request)
+        limits = [(ip_limiter, ip, "messages from this address")]
+        if data.get('conversation_id'):
+            limits.append((conversation_limiter, conversation_id, "messages in this conversation"))
+        check_limits(*limits)
+
+        if data.get('stream'):
+            # Hold an upstream slot until the stream is closed, even if the client disconnects
+            await run_in_threadpool(upstream_limiter.acquire)
+            return StreamingResponse(
+                stream_response(message, conversation_id, ip, model),
+                media_type='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+
+        result, request.state.upstream_time = await run_in_threadpool(
+            get_response, message, conversation_id, ip, model)
+        result['conversation_id'] = conversation_id
+        result['timestamp'] = datetime.datetime.now().isoformat()
+
+        return JSONResponse(result)
+
+    except (RateLimited, BudgetExceeded):
+        raise
+    except Exception as e:
+        return JSONResponse({
+            "success": False,
+            "error": str(e),
+            "response": "Sorry, I encountered an error processing your request."
+        }, status_code=500)
+
+async def rate_limited(request, e):
+    """Refuse with 429 and tell the client when to retry"""
+    return JSONResponse({
+        "success": False,
+        "error": str(e),
+        "response": "Sorry, too many requests right now. Please try again in a moment.",
+        "retry_after": int(e.retry_after_header)
+    }, status_code=429, headers={'Retry-After': e.retry_after_header})
+
+async def budget_exceeded(request, e):
+    """Refuse with 429 once a usage budget is spent"""
+    headers = {'Retry-After': str(int(e.retry_after) + 1)} if e.retry_after is not None else None
+    return JSONResponse({
+        "success": False,
+        "error": str(e),
+        "response": f"Sorry, {str(e)[0].lower()}{str(e)[1:]}",
+        "budget_exceeded": True
+    }, status_code=429, headers=headers)
+
+async def clear_conversation(request):
+    """Clear conversation history"""
+    try:
+        data = await request.json()
+        conversation_id = data.get('conversation_id')
+
+        if conversation_id:
+            conversations.delete(conversation_id)
+
+        return JSONResponse({"success": True, "message": "Conversation cleared"})
+
+    except Exception as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=500)
+
+async def status(request):
+    """Check API status"""
+    if client is None:
+        return JSONResponse({
+            "status": "error",
+            "model": DEFAULT_MODEL,
+            "api_connected": False,
+            "error": "OpenAI API not configured",
+            "conversations_active": len(conversations)
+        }, status_code=500)
+
+    api_key = os.getenv('OPENAI_API_KEY')
+    api_configured = bool(api_key and api_key != 'your_openai_api_key_here' and len(api_key) > 20)
+
+    return JSONResponse({
+        "status": "healthy" if api_configured else "warning",
+        "model": DEFAULT_MODEL,
+        "api_connected": api_configured,
+        "conversations_active": len(conversations),
+        "response_cache": response_cache.stats(),
+        "upstream": upstream_limiter.stats(),
+        "routing": model_router.stats(),
+        "resilience": upstream.stats(),
+        "ai_name": "Tara",
+        "developer": "Aman Verma",
+        "server": "asgi"
+    })
+
+async def health_check(request):
+    """Simple health check for deployment"""
+    return JSONResponse({
+        "status": "healthy",
+        "service": "Tara AI Assistant",
+        "developer": "Aman Verma",
+        "version": "1.0"
+    })
+
+async def admin_usage(request):
+    """Usage and cost totals, or one conversation's or address's usage"""
+    if not ADMIN_TOKEN:
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    if request.headers.get('authorization') != f"Bearer {ADMIN_TOKEN}":
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+
+    params = request.query_params
+    if params.get('conversation_id'):
+        return JSONResponse({"conversation_id": params['conversation_id'],
+                             **usage_ledger.conversation_usage(params['conversation_id'])})
+    if params.get('ip'):
+        return JSONResponse({"ip": params['ip'], **usage_ledger.ip_usage(params['ip'])})
+    try:
+        top = int(params.get('top', 10))
+    except ValueError:
+        top = 10
+    return JSONResponse(usage_ledger.summary(top=top))
+
+async def metrics_endpoint(request):
+    """Expose metrics in the Prometheus text format"""
+    if METRICS_TOKEN and request.headers.get('authorization') != f"Bearer {METRICS_TOKEN}":
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    return Response(metrics.render(), media_type='text/plain; version=0.0.4')
+
+async def get_models(request):
+    """Get available models"""
+    return JSONResponse({
+        "models": AVAILABLE_MODELS,
+        "current": DEFAULT_MODEL,
+        "routing": {
+            "enabled": model_router.enabled,
+            "fast_model": model_router.fast_model,
+            "strong_model": model_router.strong_model
+        }
+    })
+
+routes = [
+    Route('/', home),
+    Route('/api/chat', chat, methods=['POST']),
+    Route('/api/clear', clear_conversation, methods=['POST']),
+    Route('/api/status', status, methods=['GET']),
+    Route('/health', health_check, methods=['GET']),
+    Route('/api/admin/usage', admin_usage, methods=['GET']),
+    Route('/metrics', metrics_endpoint, methods=['GET']),
+    Route('/api/models', get_models, methods=['GET']),
+]
+ROUTE_PATHS = {route.path for route in routes}
+
+class ServerTiming:
+    """ASGI middleware recording the same response metrics and Server-Timing header as app.py"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        route = scope['path'] if scope['path'] in ROUTE_PATHS else 'unmatched'
+        scope.setdefault('state', {})
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                RESPONSES.inc(route=route, status=message['status'])
+                headers = dict(message.get('headers', []))
+                if not headers.get(b'content-type', b'').startswith(b'text/event-stream'):
+                    total = time.perf_counter() - start
+                    upstream_time = scope['state'].get('upstream_time', 0.0)
+                    REQUEST_SECONDS.observe(total, route=route)
+                    REQUEST_UPSTREAM_SECONDS.observe(upstream_time, route=route)
+                    REQUEST_LOCAL_SECONDS.observe(total - upstream_time, route=route)
+                    timing = (f"upstream;dur={upstream_time * 1000:.2f}, "
+                              f"app;dur={(total - upstream_time) * 1000:.2f}, total;dur={total * 1000:.2f}")
+                    message['headers'] = list(message.get('headers', [])) + [(b'server-timing', timing.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    to_thread.current_default_thread_limiter().total_tokens = ASGI_THREADS
+    yield
+
+app = Starlette(
+    routes=routes,
+    middleware=[
+        Middleware(ServerTiming),
+        Middleware(CORSMiddleware, allow_origins=os.getenv('ALLOWED_ORIGINS', '*').split(','),
+                   allow_methods=['*'], allow_headers=['*'])
+    ],
+    exception_handlers={RateLimited: rate_limited, BudgetExceeded: budget_exceeded},
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.getenv('PORT', 5000))
+    print(f"🧠 Tara - Personal AI Assistant by Aman Verma (async mode)")
+    print(f"🌐 Local URL: http://localhost:{port}")
+    uvicorn.run(app, host='0.0.0.0', port=port)
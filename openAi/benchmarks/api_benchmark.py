@@ -0,0 +1,245 @@
+"""
+End-to-end benchmark for the Flask chat API
+
+Runs app.py in-process against an in-process mock upstream and drives a
+mixed /api/chat, /api/clear and /api/status workload from concurrent
+clients. Reports per-route p50/p95/p99 latency, throughput, growth of the
+conversation store and process memory, and splits server time into
+upstream and local time using the Server-Timing header.
+
+Usage:
+    python benchmarks/api_benchmark.py --concurrency 50 --duration 30 --output results.json
+    python benchmarks/api_benchmark.py --compare results.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import threading
+import subprocess
+import statistics
+import urllib.request
+import urllib.error
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from mock_openai_server import MockOpenAIServer, MockConfig
+from load_test import percentile
+
+def rss_bytes():
+    """Current resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        # Peak RSS, in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def parse_server_timing(header):
+    """Parse 'name;dur=1.2, other;dur=3' into {name: milliseconds}"""
+    timings = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.startswith('dur='):
+            timings[name] = float(params[4:])
+    return timings
+
+def request_json(method, url, payload=None, timeout=60):
+    """Send a request and return (status, body, headers)"""
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.read(), response.headers
+    except urllib.error.HTTPError as e:
+        return e.code, e.read(), e.headers
+
+def latency_summary(values):
+    """Summarize a list of milliseconds"""
+    if not values:
+        return None
+    return {
+        "mean": round(statistics.mean(values), 2),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+    }
+
+def start_app_server(port=0):
+    """Serve app.py with a threaded WSGI server in a background thread"""
+    import logging
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', port, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, app_module
+
+def git_commit():
+    """Current commit hash, so results can be compared across commits"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(args):
+    """Drive the mixed workload and collect results"""
+    mock = MockOpenAIServer(port=0, config=MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens
+    )).start()
+
+    # app.py reads its configuration at import time
+    os.environ['OPENAI_BASE_URL'] = mock.base_url
+    os.environ.setdefault('OPENAI_API_KEY', 'sk-benchmark-key-not-used-upstream')
+    # Every benchmark client shares one address; measure the app, not its rate limits
+    for name in ('RATE_LIMIT_IP_PER_MINUTE', 'RATE_LIMIT_CONVERSATION_PER_MINUTE', 'UPSTREAM_MAX_CONCURRENCY'):
+        os.environ.setdefault(name, '0')
+
+    server, app_module = start_app_server()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    rss_before = rss_bytes()
+    conversations_before = len(app_module.conversations)
+
+    latencies = defaultdict(list)       # route -> client-side ms
+    server_times = defaultdict(list)    # "upstream"/"app" -> ms (chat only)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    conversation_ids = []
+    routes = ['chat', 'clear', 'status']
+    weights = [args.chat_weight, args.clear_weight, args.status_weight]
+    deadline = time.perf_counter() + args.duration
+
+    def worker(worker_id):
+        rng = random.Random(worker_id)
+        count = 0
+        while time.perf_counter() < deadline:
+            route = rng.choices(routes, weights)[0]
+            with lock:
+                existing = rng.choice(conversation_ids) if conversation_ids else None
+
+            if route == 'chat':
+                conversation_id = existing if existing and rng.random() < args.follow_up else f"bench-{worker_id}-{count}"
+                method, path = 'POST', '/api/chat'
+                payload = {"message": f"Benchmark question {count} from client {worker_id}",
+                           "conversation_id": conversation_id}
+            elif route == 'clear':
+                method, path, payload = 'POST', '/api/clear', {"conversation_id": existing}
+            else:
+                method, path, payload = 'GET', '/api/status', None
+
+            start = time.perf_counter()
+            status, body, headers = request_json(method, base_url + path, payload)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            with lock:
+                latencies[route].append(elapsed_ms)
+                if status >= 400:
+                    errors[route] += 1
+                if route == 'chat' and status == 200:
+                    conversation_ids.append(payload['conversation_id'])
+                    timing = parse_server_timing(headers.get('Server-Timing'))
+                    for name in ('upstream', 'app'):
+                        if name in timing:
+                            server_times[name].append(timing[name])
+            count += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, range(args.concurrency)))
+    wall_time = time.perf_counter() - started
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(),
+        "config": vars(args),
+        "wall_time_s": round(wall_time, 3),
+        "throughput_rps": round(sum(len(v) for v in latencies.values()) / wall_time, 2),
+        "routes": {
+            route: {
+                "requests": len(values),
+                "errors": errors[route],
+                "throughput_rps": round(len(values) / wall_time, 2),
+                "latency_ms": latency_summary(values),
+            }
+            for route, values in latencies.items()
+        },
+        "server_time_ms": {name: latency_summary(values) for name, values in server_times.items()},
+        "memory": {
+            "conversations_before": conversations_before,
+            "conversations_after": len(app_module.conversations),
+            "rss_growth_mb": round((rss_bytes() - rss_before) / 1024 / 1024, 2),
+        }
+    }
+
+    server.shutdown()
+    mock.stop()
+    return results
+
+def print_results(results, previous=None):
+    """Print a readable report, with deltas against previous results"""
+    def delta(current, before):
+        if before in (None, 0) or current is None:
+            return ""
+        return f" ({(current - before) / before:+.1%})"
+
+    print(f"\n📊 API Benchmark @ {results['commit'] or 'unknown commit'}")
+    print("=" * 60)
+    print(f"Throughput: {results['throughput_rps']} req/s"
+          f"{delta(results['throughput_rps'], previous and previous.get('throughput_rps'))}")
+    for route, stats in results['routes'].items():
+        latency = stats['latency_ms']
+        before = ((previous or {}).get('routes', {}).get(route) or {}).get('latency_ms') or {}
+        print(f"  /api/{route:<7} {stats['requests']:>6} req, {stats['errors']} errors, "
+              f"p50 {latency['p50']} ms{delta(latency['p50'], before.get('p50'))}, "
+              f"p95 {latency['p95']} ms{delta(latency['p95'], before.get('p95'))}, "
+              f"p99 {latency['p99']} ms{delta(latency['p99'], before.get('p99'))}")
+    for name, stats in results['server_time_ms'].items():
+        if stats:
+            print(f"  server {name:<8} p50 {stats['p50']} ms, p95 {stats['p95']} ms, p99 {stats['p99']} ms")
+    memory = results['memory']
+    print(f"  conversations: {memory['conversations_before']} -> {memory['conversations_after']}, "
+          f"RSS growth {memory['rss_growth_mb']} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark for the Flask chat API")
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run")
+    parser.add_argument('--latency', default='lognormal:0.5,0.4', help="Mock upstream latency distribution")
+    parser.add_argument('--tokens-per-second', type=float, default=0.0)
+    parser.add_argument('--response-tokens', type=int, default=0)
+    parser.add_argument('--chat-weight', type=float, default=8)
+    parser.add_argument('--clear-weight', type=float, default=1)
+    parser.add_argument('--status-weight', type=float, default=1)
+    parser.add_argument('--follow-up', type=float, default=0.5, help="Share of chats continuing a conversation")
+    parser.add_argument('--output', help="Write JSON results to this file")
+    parser.add_argument('--compare', help="Previous JSON results to compare against")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    results = run_benchmark(args)
+    print_results(results, previous)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Load benchmark: gunicorn sync workers (app:app) vs the async ASGI server (asgi_app:app)
+
+Both servers are started as subprocesses and pointed at the same upstream
+through OPENAI_BASE_URL, then hammered with concurrent /api/chat requests.
+Without --upstream an in-process mock_openai_server is used, so no network
+access or API key is needed.
+
+Usage:
+    python benchmarks/load_test.py --latency lognormal:0.8,0.4 --concurrency 100 --requests 1000
+    python benchmarks/load_test.py --upstream http://127.0.0.1:8001/v1
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from mock_openai_server import MockOpenAIServer, MockConfig
+
+def free_port():
+    """Find a free local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_server(url, timeout=20):
+    """Wait until the server answers /health"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def post_json(url, payload, timeout=60):
+    """POST a JSON payload and return (status, body)"""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode(),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def run_load(base_url, concurrency, total_requests, payload_fn=None):
+    """Send total_requests chat requests with the given concurrency"""
+    payload_fn = payload_fn or (lambda i: {"message": f"Benchmark question {i}", "conversation_id": f"bench-{i}"})
+    latencies = []
+    errors = 0
+
+    def one_request(i):
+        start = time.perf_counter()
+        status, body = post_json(f"{base_url}/api/chat", payload_fn(i))
+        elapsed = time.perf_counter() - start
+        ok = status == 200 and json.loads(body).get('success')
+        return elapsed, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, ok in pool.map(one_request, range(total_requests)):
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+    wall_time = time.perf_counter() - started
+
+    return summarize(latencies, wall_time, errors)
+
+def summarize(latencies, wall_time, errors=0):
+    """Summarize latencies (seconds) into a result dict in milliseconds"""
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "wall_time_s": round(wall_time, 3),
+        "requests_per_second": round(len(latencies) / wall_time, 2) if wall_time else None,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+            "p50": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            "p95": round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+            "p99": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        }
+    }
+
+def start_server(command, port, env):
+    """Start a server subprocess and wait for it to become healthy"""
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_server(f"http://127.0.0.1:{port}"):
+        process.terminate()
+        raise RuntimeError(f"Server did not start: {' '.join(command)}")
+    return process
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync gunicorn and async ASGI serving")
+    parser.add_argument('--upstream', help="OpenAI-compatible base URL (default: in-process mock server)")
+    parser.add_argument('--latency', default='fixed:0.5', help="Mock upstream latency distribution")
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn sync worker count")
+    parser.add_argument('--output', help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    mock_server = None
+    if not args.upstream:
+        mock_server = MockOpenAIServer(port=0, config=MockConfig(latency=args.latency)).start()
+        args.upstream = mock_server.base_url
+
+    env = dict(os.environ)
+    env['OPENAI_BASE_URL'] = args.upstream
+    env.setdefault('OPENAI_API_KEY', 'sk-benchmark-key-not-used-upstream')
+    env['FLASK_DEBUG'] = 'False'
+    # Every benchmark client shares one address; measure the servers, not their rate limits
+    for name in ('RATE_LIMIT_IP_PER_MINUTE', 'RATE_LIMIT_CONVERSATION_PER_MINUTE', 'UPSTREAM_MAX_CONCURRENCY'):
+        env.setdefault(name, '0')
+
+    setups = {
+        f"gunicorn-sync-{args.workers}w": lambda port: [
+            sys.executable, '-m', 'gunicorn', 'app:app', '-w', str(args.workers),
+            '-b', f'127.0.0.1:{port}'
+        ],
+        "uvicorn-asgi-1w": lambda port: [
+            sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--host', '127.0.0.1',
+            '--port', str(port), '--log-level', 'warning'
+        ],
+    }
+
+    results = {}
+    for name, command in setups.items():
+        port = free_port()
+        process = start_server(command(port), port, env)
+        try:
+            print(f"⏱️  {name}: {args.requests} requests at concurrency {args.concurrency}...")
+            results[name] = run_load(f"http://127.0.0.1:{port}", args.concurrency, args.requests)
+        finally:
+            process.terminate()
+            process.wait()
+
+    if mock_server:
+        mock_server.stop()
+
+    for name, result in results.items():
+        latency = result['latency_ms']
+        print(f"{name:>22}: {result['requests_per_second']} req/s, "
+              f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, errors {result['errors']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: memory recall and prompt size, recency heuristic vs retrieval
+
+Fills a throwaway AdvancedPersonalAI memory with distinct personal facts,
+then asks about each one. Recall is the share of questions whose fact made
+it into the system prompt; prompt size is the memory section in tokens.
+
+Usage:
+    python benchmarks/memory_retrieval.py --facts 200 --budget 300
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+os.chdir(PROJECT_DIR)  # AdvancedPersonalAI reads ai_config.json from the working directory
+os.environ.setdefault('OPENAI_API_KEY', 'sk-benchmark-key-not-used')
+
+from advanced_personal_ai import AdvancedPersonalAI
+from context_window import count_tokens
+
+QUALIFIERS = ["favourite", "oldest", "newest", "first", "least favourite", "dream", "current", "childhood"]
+THINGS = ["laptop", "guitar", "editor", "language", "framework", "database", "book", "movie",
+          "city", "team", "car", "game", "snack", "coffee", "song", "podcast", "teacher", "keyboard",
+          "holiday", "bike", "phone", "font", "restaurant", "museum", "planet"]
+VALUES = ["Aurora", "Basalt", "Cobalt", "Dune", "Ember", "Fjord", "Granite", "Harbor", "Indigo",
+          "Juniper", "Kestrel", "Lumen", "Meridian", "Nimbus", "Onyx", "Prism", "Quartz", "Raven"]
+
+def make_facts(count, rng):
+    """(fact, question) pairs about distinct things"""
+    subjects = [f"{q} {t}" for q in QUALIFIERS for t in THINGS]
+    rng.shuffle(subjects)
+    return [
+        (f"My {subject} is {rng.choice(VALUES)}", f"Do you remember what my {subject} is?")
+        for subject in subjects[:count]
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory recall and prompt size")
+    parser.add_argument('--facts', type=int, default=200)
+    parser.add_argument('--budget', type=int, default=300, help="Retrieval token budget")
+    parser.add_argument('--k', type=int, default=8, help="Memories retrieved per question")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    facts = make_facts(args.facts, random.Random(args.seed))
+    with tempfile.TemporaryDirectory() as data_dir:
+        ai = AdvancedPersonalAI(data_dir=data_dir)
+        ai.memory_token_budget = args.budget
+        ai.memory_retrieval_k = args.k
+        for fact, _ in facts:
+            ai.add_to_memory("personal_facts", fact)
+
+        results = {}
+        for name, build in (("recency", lambda question: ai.build_memory_prompt()),
+                            ("retrieval", ai.build_relevant_memory_prompt)):
+            hits, tokens, timings = 0, [], []
+            for fact, question in facts:
+                start = time.perf_counter()
+                prompt = build(question)
+                timings.append((time.perf_counter() - start) * 1000)
+                hits += fact in prompt
+                tokens.append(count_tokens(prompt))
+            results[name] = (hits / len(facts), statistics.mean(tokens), statistics.median(timings))
+        ai.close()
+
+    print(f"🧠 {len(facts)} facts in memory ({len(ai.memory_index)} indexed), "
+          f"retrieval k={args.k}, budget={args.budget} tokens")
+    print(f"  {'strategy':<10} {'recall':>7} {'prompt tokens':>14} {'build ms':>9}")
+    for name, (recall, tokens, ms) in results.items():
+        print(f"  {name:<10} {recall:>7.1%} {tokens:>14.0f} {ms:>9.3f}")
+
+if __name__ == '__main__':
+    main()
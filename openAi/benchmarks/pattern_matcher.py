@@ -0,0 +1,90 @@
+"""
+Benchmark: learning keyword extraction, substring loops vs one-pass PatternMatcher
+
+Times the original intelligent_learning/extract_project_name approach (one
+`in` search per indicator) against PatternMatcher on a chat-sized message
+and on long pasted inputs, for the default rules and for larger rule sets
+padded with extra keywords. Runs the pure-Python automaton, and the
+pyahocorasick one too when that package is installed.
+
+Usage:
+    python benchmarks/pattern_matcher.py --sizes 200,5000,50000 --extra-rules 0,500
+"""
+
+import os
+import sys
+import random
+import argparse
+import timeit
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import pattern_matcher
+from pattern_matcher import PatternMatcher
+from advanced_personal_ai import DEFAULT_LEARNING_RULES
+
+FILLER = ("the build failed again so i pasted the whole traceback here along with my config "
+          "and the function that calls it because nothing in the logs makes sense to me").split()
+
+def substring_loops(rules, text):
+    """What intelligent_learning did before: one substring search per rule pattern"""
+    text_lower = text.lower()
+    found = {}
+    for label, patterns in rules.items():
+        for pattern in patterns:
+            if pattern in text_lower:
+                found.setdefault(label, []).append(pattern)
+    return found
+
+def make_rules(extra, rng):
+    """The default rules plus extra random keywords"""
+    rules = dict(DEFAULT_LEARNING_RULES)
+    if extra:
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        rules["extra"] = ["".join(rng.choice(letters) for _ in range(rng.randint(5, 10))) for _ in range(extra)]
+    return rules
+
+def make_input(size, rng):
+    words = []
+    while sum(len(w) + 1 for w in words) < size:
+        words.append(rng.choice(FILLER))
+    return " ".join(words) + " i love building my chatgpt app"
+
+def per_call_us(func, text, iterations):
+    return timeit.timeit(lambda: func(text), number=iterations) / iterations * 1_000_000
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure learning keyword extraction cost")
+    parser.add_argument('--sizes', default="200,5000,50000", help="Comma-separated input sizes in characters")
+    parser.add_argument('--extra-rules', default="0,500", help="Comma-separated counts of extra keywords")
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    backends = ["pure python"] + (["pyahocorasick"] if pattern_matcher.ahocorasick is not None else [])
+    extension = pattern_matcher.ahocorasick
+
+    print("🔎 µs per message")
+    print(f"  {'patterns':>8} {'chars':>7} {'substring loops':>16} " + " ".join(f"{name:>14}" for name in backends))
+    for extra in (int(n) for n in args.extra_rules.split(",")):
+        rules = make_rules(extra, rng)
+        matchers = []
+        for backend in backends:
+            pattern_matcher.ahocorasick = extension if backend == "pyahocorasick" else None
+            matchers.append(PatternMatcher(rules))
+        pattern_matcher.ahocorasick = extension
+
+        for size in (int(s) for s in args.sizes.split(",")):
+            text = make_input(size, rng)
+            iterations = max(1, args.iterations * 1000 // max(size, 1000))
+            expected = {label: set(found) for label, found in substring_loops(rules, text).items()}
+            loops = per_call_us(lambda t: substring_loops(rules, t), text, iterations)
+            row = f"  {sum(len(p) for p in rules.values()):>8} {len(text):>7} {loops:>16.1f} "
+            for matcher in matchers:
+                assert {label: set(found) for label, found in matcher.first_matches(text).items()} == expected
+                row += f"{per_call_us(matcher.first_matches, text, iterations):>14.1f} "
+            print(row)
+
+if __name__ == '__main__':
+    main()
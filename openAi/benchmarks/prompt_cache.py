@@ -0,0 +1,93 @@
+"""
+Benchmark: per-request CPU spent building system prompts, with and without the prompt cache
+The AdvancedPersonalAI runs cover both the recent-memory prompt and the
+retrieval prompt (the default in ai_config.json), whose memory part is
+chosen for each message.
+
+Usage:
+    python benchmarks/prompt_cache.py --iterations 100000
+"""
+
+import os
+import sys
+import argparse
+import timeit
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+os.chdir(PROJECT_DIR)  # AdvancedPersonalAI reads ai_config.json from the working directory
+os.environ.setdefault('OPENAI_API_KEY', 'sk-benchmark-key-not-used')
+
+from app import WebChatGPT
+from advanced_personal_ai import AdvancedPersonalAI
+from context_window import count_tokens
+
+def per_call_us(func, iterations):
+    """Average microseconds per call"""
+    return timeit.timeit(func, number=iterations) / iterations * 1_000_000
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure system prompt build cost")
+    parser.add_argument('--iterations', type=int, default=100000)
+    parser.add_argument('--learn-every', type=int, default=10,
+                        help="Record a memory every N turns in the AdvancedPersonalAI run")
+    parser.add_argument('--retrieval-iterations', type=int, default=5000,
+                        help="Turns for the retrieval runs, which search memory on every turn")
+    args = parser.parse_args()
+
+    web = WebChatGPT()
+    uncached = per_call_us(web.build_system_prompt, args.iterations)
+    cached = per_call_us(web.create_system_prompt, args.iterations)
+    print("🌐 WebChatGPT system prompt")
+    print(f"  uncached: {uncached:8.3f} µs/request")
+    print(f"  cached:   {cached:8.3f} µs/request ({uncached / cached:.0f}x faster)")
+
+    # Keep benchmark memories out of the real memory files
+    ai = AdvancedPersonalAI(data_dir=tempfile.mkdtemp())
+    for i in range(50):
+        ai.add_to_memory("personal_facts", f"Benchmark fact number {i}")
+        ai.add_to_memory("goals", f"Benchmark goal number {i}")
+
+    def rebuild():
+        return ai.static_prompt + ai.build_memory_prompt()
+
+    turn = 0
+    def cached_turn():
+        # Simulate memory changing on some turns, as intelligent_learning does
+        nonlocal turn
+        turn += 1
+        if turn % args.learn_every == 0:
+            ai.memory_version += 1
+        return ai.create_dynamic_system_prompt()
+
+    uncached = per_call_us(rebuild, args.iterations)
+    cached = per_call_us(cached_turn, args.iterations)
+    print(f"\n🧠 AdvancedPersonalAI dynamic prompt (memory changes every {args.learn_every} turns)")
+    print(f"  uncached: {uncached:8.3f} µs/turn")
+    print(f"  cached:   {cached:8.3f} µs/turn ({uncached / cached:.0f}x faster)")
+
+    questions = [f"Do you remember benchmark fact number {i}?" for i in range(50)]
+
+    def retrieval_rebuild():
+        # Whole prompt rebuilt and counted every turn
+        nonlocal turn
+        turn += 1
+        prompt = ai.static_prompt + ai.build_relevant_memory_prompt(questions[turn % len(questions)])
+        count_tokens(prompt)
+        return prompt
+
+    def retrieval_turn():
+        nonlocal turn
+        turn += 1
+        return ai.create_dynamic_system_prompt(questions[turn % len(questions)])
+
+    uncached = per_call_us(retrieval_rebuild, args.retrieval_iterations)
+    cached = per_call_us(retrieval_turn, args.retrieval_iterations)
+    print(f"\n🔎 AdvancedPersonalAI retrieval prompt ({len(ai.memory_index)} memories indexed)")
+    print(f"  uncached static part: {uncached:8.3f} µs/turn")
+    print(f"  cached static part:   {cached:8.3f} µs/turn ({uncached / cached:.1f}x faster)")
+    ai.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,9 @@
 import os
 import sys
-from openai import OpenAI
+from openai_client import create_client
 from datetime import datetime
+from context_window import ContextWindow
+from stream_renderer import stream_chat
 
 class ChatGPTClone:
     def __init__(self):
@@ -16,8 +18,10 @@ class ChatGPTClone:
             print("2. Set environment variable: $env:OPENAI_API_KEY='your-api-key'")
             sys.exit(1)
             
-        self.client = OpenAI(api_key=api_key)
-        self.conversation_history = []
+        # OPENAI_BASE_URL can point at an OpenAI-compatible server such as mock_openai_server.py
+        self.client = create_client(api_key=api_key)
+        self.conversation_history = ContextWindow()
+        self.last_reply_stats = None
         self.model = "gpt-3.5-turbo"  # You can change to "gpt-4" if you have access
         
         # System message to set the assistant's behavior
@@ -40,16 +44,19 @@ class ChatGPTClone:
         print()
         
     def get_response(self, user_input):
-        """Get response from OpenAI API"""
+        """Stream a response from OpenAI API to the terminal and return it"""
+        user_message = {"role": "user", "content": user_input}
         try:
-            # Add user message to conversation
-            user_message = {"role": "user", "content": user_input}
+            # Add user message to conversation, dropping old turns that no longer fit
+            self.conversation_history.append(user_message)
+            self.conversation_history.trim()
             
             # Create messages list with system message and conversation history
-            messages = [self.system_message] + self.conversation_history + [user_message]
+            messages = [self.system_message] + self.conversation_history.messages
             
-            # Make API call
-            response = self.client.chat.completions.create(
+            # Make API call, printing the reply as it arrives (Ctrl-C stops it)
+            result = stream_chat(
+                self.client,
                 model=self.model,
                 messages=messages,
                 max_tokens=1000,
@@ -58,26 +65,32 @@ class ChatGPTClone:
                 frequency_penalty=0,
                 presence_penalty=0
             )
+            self.last_reply_stats = result
             
-            # Extract the assistant's response
-            assistant_response = response.choices[0].message.content
+            assistant_response = result.text
+            if not assistant_response:
+                # Stopped before any text arrived
+                self.conversation_history.discard_last(user_message)
+                return assistant_response
             
-            # Update conversation history
-            self.conversation_history.append(user_message)
+            # Update conversation history with only what was actually produced
             self.conversation_history.append({"role": "assistant", "content": assistant_response})
             
-            # Keep conversation history manageable (last 10 exchanges)
-            if len(self.conversation_history) > 20:
-                self.conversation_history = self.conversation_history[-20:]
+            # Keep conversation history within the token budget
+            self.conversation_history.trim()
                 
             return assistant_response
             
         except Exception as e:
-            return f"❌ Error: {str(e)}"
+            # Don't keep a question that never got an answer
+            self.conversation_history.discard_last(user_message)
+            error = f"❌ Error: {str(e)}"
+            print(error)
+            return error
     
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.conversation_history.clear()
         print("🧹 Conversation history cleared!")
         
     def show_history(self):
@@ -144,9 +157,8 @@ class ChatGPTClone:
                     continue
                 
                 # Get and display AI response
-                print("🤖 Assistant: ", end="")
-                response = self.get_response(user_input)
-                print(response)
+                print("🤖 Assistant: ", end="", flush=True)
+                self.get_response(user_input)
                 print()  # Add spacing
                 
             except KeyboardInterrupt:
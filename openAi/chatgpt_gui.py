@@ -1,8 +1,10 @@
 import os
 import tkinter as tk
 from tkinter import scrolledtext, messagebox, ttk
-import threading
-from openai import OpenAI
+from openai_client import create_client
+from context_window import ContextWindow
+from gui_worker import ChatWorker, POLL_INTERVAL_MS
+from transcript_view import TranscriptView
 
 class ChatGPTGUI:
     def __init__(self):
@@ -15,8 +17,14 @@ class ChatGPTGUI:
         # Initialize OpenAI client
         self.setup_openai()
         
-        # Conversation history
-        self.conversation_history = []
+        # Conversation history, only touched on the Tk main thread
+        self.conversation_history = ContextWindow()
+        self.pending_message = None
+        self.request_id = None  # Worker id of the reply being streamed
+        self.polling = False
+        
+        # One worker thread streams every reply
+        self.worker = ChatWorker(self.client)
         
         # Setup GUI
         self.setup_gui()
@@ -36,7 +44,7 @@ class ChatGPTGUI:
             self.root.destroy()
             return
             
-        self.client = OpenAI(api_key=api_key)
+        self.client = create_client(api_key=api_key)
         self.model = "gpt-3.5-turbo"
         
     def setup_gui(self):
@@ -65,6 +73,10 @@ class ChatGPTGUI:
         )
         self.chat_display.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
         
+        # Keep the last messages on screen, older ones in an on-disk log
+        self.transcript = TranscriptView(self.chat_display, sender_font=("Arial", 10, "bold"))
+        self.chat_display.tag_configure("message", foreground="white")
+        
         # Input frame
         input_frame = tk.Frame(self.root, bg="#2b2b2b")
         input_frame.pack(padx=20, pady=10, fill=tk.X)
@@ -92,6 +104,19 @@ class ChatGPTGUI:
         )
         self.send_button.pack(side=tk.RIGHT)
         
+        # Cancel button, enabled while a reply is streaming
+        self.cancel_button = tk.Button(
+            input_frame,
+            text="Stop",
+            font=("Arial", 12),
+            bg="#6c757d",
+            fg="white",
+            cursor="hand2",
+            state=tk.DISABLED,
+            command=self.cancel_response
+        )
+        self.cancel_button.pack(side=tk.RIGHT, padx=(0, 10))
+        
         # Control buttons frame
         control_frame = tk.Frame(self.root, bg="#2b2b2b")
         control_frame.pack(padx=20, pady=5, fill=tk.X)
@@ -136,30 +161,25 @@ class ChatGPTGUI:
         # Add welcome message
         self.add_message("🤖 Assistant", "Hello! I'm your AI assistant. How can I help you today?", "#007acc")
         
-    def add_message(self, sender, message, color="#white"):
+    def add_message(self, sender, message, color="white"):
         """Add a message to the chat display"""
-        self.chat_display.configure(state=tk.NORMAL)
+        self.begin_message(sender, color)
+        self.append_text(f"{message}\n")
         
-        # Add timestamp
-        import datetime
-        timestamp = datetime.datetime.now().strftime("%H:%M")
-        
-        # Add sender and message
-        self.chat_display.insert(tk.END, f"\n[{timestamp}] {sender}:\n", "sender")
-        self.chat_display.insert(tk.END, f"{message}\n", "message")
-        
-        # Configure tags for styling
-        self.chat_display.tag_configure("sender", foreground=color, font=("Arial", 10, "bold"))
-        self.chat_display.tag_configure("message", foreground="white")
+    def begin_message(self, sender, color="white"):
+        """Add a timestamped sender line; the message text follows through append_text"""
+        self.transcript.begin_message(sender, color)
         
-        self.chat_display.configure(state=tk.DISABLED)
-        self.chat_display.see(tk.END)
+    def append_text(self, text):
+        """Append text to the message being displayed"""
+        self.transcript.append_text(text)
         
     def send_message(self, event=None):
         """Send message to ChatGPT"""
         message = self.message_entry.get().strip()
         
-        if not message:
+        # One reply at a time; <Return> still fires while the Send button is disabled
+        if not message or self.pending_message is not None:
             return
             
         # Clear input
@@ -171,65 +191,101 @@ class ChatGPTGUI:
         # Update status
         self.status_label.config(text="🤔 AI is thinking...")
         self.send_button.config(state=tk.DISABLED, text="Sending...")
+        self.cancel_button.config(state=tk.NORMAL)
         
-        # Get AI response in separate thread to prevent GUI freezing
-        threading.Thread(target=self.get_ai_response, args=(message,), daemon=True).start()
+        self.get_ai_response(message)
         
     def get_ai_response(self, user_message):
-        """Get response from OpenAI API"""
-        try:
-            # Update conversation history
-            self.conversation_history.append({"role": "user", "content": user_message})
-            
-            # Create messages for API
-            messages = [
-                {"role": "system", "content": "You are a helpful, friendly, and knowledgeable AI assistant."}
-            ] + self.conversation_history
-            
-            # Make API call
-            response = self.client.chat.completions.create(
-                model=self.model_var.get(),
-                messages=messages,
-                max_tokens=1000,
-                temperature=0.7
-            )
-            
-            # Get response content
-            ai_response = response.choices[0].message.content
-            
-            # Update conversation history
-            self.conversation_history.append({"role": "assistant", "content": ai_response})
-            
-            # Keep conversation manageable
-            if len(self.conversation_history) > 20:
-                self.conversation_history = self.conversation_history[-20:]
-            
-            # Update GUI in main thread
-            self.root.after(0, lambda: self.display_ai_response(ai_response))
+        """Start streaming a response from OpenAI API on the worker thread"""
+        # Update conversation history
+        self.pending_message = {"role": "user", "content": user_message}
+        self.conversation_history.append(self.pending_message)
+        self.conversation_history.trim()
+        
+        # Create messages for API; the worker gets its own copy
+        messages = [
+            {"role": "system", "content": "You are a helpful, friendly, and knowledgeable AI assistant."}
+        ] + list(self.conversation_history.messages)
+        
+        self.begin_message("🤖 Assistant", "#007acc")
+        self.request_id = self.worker.submit(
+            model=self.model_var.get(),
+            messages=messages,
+            max_tokens=1000,
+            temperature=0.7
+        )
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_INTERVAL_MS, self.poll_response)
+        
+    def poll_response(self):
+        """Move streamed text into the display, one insert per poll"""
+        text = []
+        finished = None
+        for event in self.worker.drain():
+            if event[1] != self.request_id:
+                continue  # Left over from a reply that was cleared away
+            if event[0] == "delta":
+                text.append(event[2])
+            else:
+                finished = event
+        
+        if text:
+            self.status_label.config(text="✍️ AI is responding...")
+            self.append_text("".join(text))
+        
+        if finished:
+            self.display_ai_response(finished)
+        
+        if self.pending_message is not None:
+            self.root.after(POLL_INTERVAL_MS, self.poll_response)
+        else:
+            self.polling = False
             
-        except Exception as e:
-            error_msg = f"Error: {str(e)}"
-            self.root.after(0, lambda: self.display_ai_response(error_msg, is_error=True))
+    def display_ai_response(self, event):
+        """Finish the streamed reply and update the conversation history"""
+        user_message, self.pending_message = self.pending_message, None
+        self.request_id = None
+        
+        if event[0] == "error":
+            self.append_text("\n")
+            self.add_message("❌ Error", f"Error: {event[2]}", "#dc3545")
+            self.conversation_history.discard_last(user_message)
+        else:
+            ai_response, cancelled = event[2], event[3]
+            self.append_text(" ⏹️ [stopped]\n" if cancelled else "\n")
             
-    def display_ai_response(self, response, is_error=False):
-        """Display AI response in the GUI"""
-        color = "#dc3545" if is_error else "#007acc"
-        sender = "❌ Error" if is_error else "🤖 Assistant"
-        
-        self.add_message(sender, response, color)
-        
-        # Reset status and button
+            # Keep only what was actually produced
+            if ai_response:
+                self.conversation_history.append({"role": "assistant", "content": ai_response})
+                self.conversation_history.trim()
+            else:
+                self.conversation_history.discard_last(user_message)
+        
+        # Reset status and buttons
         self.status_label.config(text="Ready for your next message!")
         self.send_button.config(state=tk.NORMAL, text="Send")
+        self.cancel_button.config(state=tk.DISABLED)
         self.message_entry.focus()
         
+    def cancel_response(self):
+        """Stop the reply being generated"""
+        self.worker.cancel(self.request_id)
+        self.status_label.config(text="Stopping...")
+        
     def clear_chat(self):
         """Clear the chat display and history"""
-        self.chat_display.configure(state=tk.NORMAL)
-        self.chat_display.delete(1.0, tk.END)
-        self.chat_display.configure(state=tk.DISABLED)
-        
-        self.conversation_history = []
+        if self.pending_message is not None:
+            # Drop the reply in progress along with everything else; its late events are ignored
+            self.worker.cancel(self.request_id)
+            self.pending_message = None
+            self.request_id = None
+            self.send_button.config(state=tk.NORMAL, text="Send")
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status_label.config(text="Ready for your next message!")
+        
+        self.transcript.clear()
+        self.conversation_history.clear()
         
         # Add welcome message back
         self.add_message("🤖 Assistant", "Chat cleared! How can I help you?", "#007acc")
@@ -243,6 +299,8 @@ class ChatGPTGUI:
         """Start the GUI application"""
         self.message_entry.focus()
         self.root.mainloop()
+        self.worker.close()
+        self.transcript.close()
 
 def main():
     """Main function to run the GUI ChatGPT clone"""
@@ -1,5 +1,5 @@
 import os
-from openai import OpenAI
+from openai_client import create_client
 
 def check_api_status():
     """Check if the OpenAI API is working and provide helpful error messages"""
@@ -17,7 +17,7 @@ def check_api_status():
     
     # Test the API connection
     try:
-        client = OpenAI(api_key=api_key)
+        client = create_client(api_key=api_key)
         
         # Try a minimal API call
         response = client.chat.completions.create(
@@ -1,5 +1,7 @@
 import os
-from openai import OpenAI
+from openai_client import create_client
+from context_window import ContextWindow
+from stream_renderer import stream_chat
 
 def main():
     """Simple command-line ChatGPT clone"""
@@ -16,7 +18,7 @@ def main():
     
     # Initialize client
     try:
-        client = OpenAI(api_key=api_key)
+        client = create_client(api_key=api_key)
         print("✅ Connected to OpenAI!")
     except Exception as e:
         print(f"❌ Failed to connect: {e}")
@@ -27,7 +29,7 @@ def main():
     print("Type 'quit' to exit, 'clear' to clear history")
     print("=" * 50)
     
-    conversation_history = []
+    conversation_history = ContextWindow()
     
     while True:
         try:
@@ -39,40 +41,41 @@ def main():
                 break
                 
             if user_input.lower() == 'clear':
-                conversation_history = []
+                conversation_history.clear()
                 print("🧹 History cleared!")
                 continue
                 
             if not user_input:
                 continue
             
-            # Add to history
-            conversation_history.append({"role": "user", "content": user_input})
+            # Add to history, dropping old turns that no longer fit the token budget
+            user_message = {"role": "user", "content": user_input}
+            conversation_history.append(user_message)
+            conversation_history.trim()
             
             # Create messages
             messages = [
                 {"role": "system", "content": "You are a helpful AI assistant."}
-            ] + conversation_history
+            ] + conversation_history.messages
             
-            print("🤔 AI is thinking...")
-            
-            # Make API call
-            response = client.chat.completions.create(
+            # Make API call, printing the reply as it arrives (Ctrl-C stops it)
+            print("\n🤖 Assistant: ", end="", flush=True)
+            result = stream_chat(
+                client,
                 model="gpt-4o-mini",
                 messages=messages,
                 max_tokens=1000,
                 temperature=0.7
             )
             
-            # Get response
-            ai_response = response.choices[0].message.content
-            conversation_history.append({"role": "assistant", "content": ai_response})
-            
-            # Keep history manageable
-            if len(conversation_history) > 10:
-                conversation_history = conversation_history[-10:]
+            # Keep only what was actually produced
+            if result.text:
+                conversation_history.append({"role": "assistant", "content": result.text})
+            else:
+                conversation_history.discard_last(user_message)
             
-            print(f"\n🤖 Assistant: {ai_response}")
+            # Keep history within the token budget
+            conversation_history.trim()
             
         except KeyboardInterrupt:
             print("\n\n👋 Chat interrupted. Goodbye!")
@@ -0,0 +1,144 @@
+"""
+Token-budgeted conversation history shared by all chat front ends
+Counts tokens once per message as it is appended and trims the oldest
+messages when the history exceeds its token budget.
+"""
+
+import os
+
+try:
+    import tiktoken
+except ImportError:  # Optional dependency, falls back to a character estimate
+    tiktoken = None
+
+# Tokens allowed for the prompt (system prompt + history); the reply gets MAX_TOKENS on top
+DEFAULT_PROMPT_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', 6000))
+
+# Per-message formatting overhead added by the chat format
+MESSAGE_OVERHEAD = 4
+
+# Appended to a message cut down to fit the budget
+TRUNCATION_NOTE = "\n[Message truncated to fit the context window]"
+
+_encodings = {}
+
+def _get_encoding(model):
+    """Return a cached tiktoken encoding for a model, or None if unavailable"""
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                # Unknown model name: use the current default encoding
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # Encodings are downloaded on first use; stay usable offline
+            _encodings[model] = None
+    return _encodings[model]
+
+def count_tokens(text, model="gpt-4o-mini"):
+    """Count tokens in a piece of text"""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        # Roughly four characters per token for English text
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+def truncate_tokens(text, max_tokens, model="gpt-4o-mini"):
+    """The start of text, cut to at most max_tokens tokens"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:(max_tokens - 1) * 4]
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+def count_message_tokens(message, model="gpt-4o-mini"):
+    """Count tokens for one chat message, including formatting overhead"""
+    return count_tokens(message.get("content") or "", model) + MESSAGE_OVERHEAD
+
+class ContextWindow:
+    """Conversation history trimmed to a token budget"""
+
+    def __init__(self, token_budget=DEFAULT_PROMPT_BUDGET, reserved_tokens=0, model="gpt-4o-mini",
+                 messages=None, token_counts=None):
+        self.token_budget = token_budget
+        self.reserved_tokens = reserved_tokens  # e.g. the system prompt
+        self.model = model
+        self.messages = list(messages or [])
+        if token_counts is None or len(token_counts) != len(self.messages):
+            token_counts = [count_message_tokens(m, model) for m in self.messages]
+        self.token_counts = list(token_counts)
+        self.total_tokens = sum(self.token_counts)
+
+    def append(self, message):
+        """Add a message, counting its tokens once"""
+        tokens = count_message_tokens(message, self.model)
+        self.messages.append(message)
+        self.token_counts.append(tokens)
+        self.total_tokens += tokens
+
+    def trim(self):
+        """Drop the oldest messages until the history fits the budget
+
+        The newest message is always kept, and the reply to an evicted question
+        is evicted with it. A newest message that alone exceeds the budget, such
+        as a long paste, is truncated to fit. Returns the evicted messages, oldest first.
+        """
+        evicted = 0
+        available = self.token_budget - self.reserved_tokens
+        while len(self.messages) - evicted > 1 and self.total_tokens > available:
+            self.total_tokens -= self.token_counts[evicted]
+            evicted += 1
+
+        # Don't leave the reply of an evicted question at the front
+        while evicted and len(self.messages) - evicted > 1 and self.messages[evicted]["role"] == "assistant":
+            self.total_tokens -= self.token_counts[evicted]
+            evicted += 1
+
+        removed = self.messages[:evicted]
+        del self.messages[:evicted]
+        del self.token_counts[:evicted]
+
+        if self.total_tokens > available and len(self.messages) == 1:
+            self._truncate_last(available)
+        return removed
+
+    def _truncate_last(self, available):
+        """Cut the newest message's content (in place) to fit available tokens"""
+        message = self.messages[-1]
+        limit = available - MESSAGE_OVERHEAD - count_tokens(TRUNCATION_NOTE, self.model)
+        message["content"] = truncate_tokens(message.get("content") or "", limit, self.model) + TRUNCATION_NOTE
+        tokens = count_message_tokens(message, self.model)
+        self.total_tokens += tokens - self.token_counts[-1]
+        self.token_counts[-1] = tokens
+
+    def discard_last(self, message):
+        """Remove message if it is still the newest one, e.g. a question that never got an answer"""
+        if self.messages and self.messages[-1] is message:
+            self.total_tokens -= self.token_counts.pop()
+            self.messages.pop()
+
+    def clear(self):
+        """Remove all messages"""
+        self.messages = []
+        self.token_counts = []
+        self.total_tokens = 0
+
+    def to_dict(self):
+        """Serialize messages and their token counts"""
+        return {"messages": self.messages, "token_counts": self.token_counts}
+
+    @classmethod
+    def from_dict(cls, data, **kwargs):
+        """Rebuild a window from to_dict() output without recounting tokens"""
+        data = data or {}
+        return cls(messages=data.get("messages"), token_counts=data.get("token_counts"), **kwargs)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __iter__(self):
+        return iter(self.messages)
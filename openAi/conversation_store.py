@@ -0,0 +1,147 @@
+"""
+Conversation storage for the Tara web API
+Keeps chat histories bounded in memory, or shares them between gunicorn
+workers through a Redis-protocol server.
+"""
+
+import os
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # Optional dependency, only needed for CONVERSATION_STORE=redis
+    redis = None
+
+class ConversationStore(ABC):
+    """Interface for conversation history storage"""
+
+    @abstractmethod
+    def get(self, conversation_id):
+        """Return the stored history for a conversation, or None if unknown"""
+
+    @abstractmethod
+    def save(self, conversation_id, history):
+        """Store the JSON-serializable history for a conversation"""
+
+    @abstractmethod
+    def delete(self, conversation_id):
+        """Remove a conversation"""
+
+    @abstractmethod
+    def __len__(self):
+        """Number of live conversations"""
+
+    def __contains__(self, conversation_id):
+        return self.get(conversation_id) is not None
+
+class MemoryConversationStore(ConversationStore):
+    """In-process store with least-recently-used and time-to-live eviction"""
+
+    def __init__(self, max_conversations=10000, ttl_seconds=86400):
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self._items = OrderedDict()  # conversation_id -> (expires_at, history)
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id):
+        with self._lock:
+            entry = self._items.get(conversation_id)
+            if entry is None:
+                return None
+            expires_at, history = entry
+            if expires_at < time.monotonic():
+                del self._items[conversation_id]
+                return None
+            # Sliding expiry keeps entries ordered by both last use and expiry time
+            self._items[conversation_id] = (time.monotonic() + self.ttl_seconds, history)
+            self._items.move_to_end(conversation_id)
+            return history
+
+    def save(self, conversation_id, history):
+        with self._lock:
+            self._items[conversation_id] = (time.monotonic() + self.ttl_seconds, history)
+            self._items.move_to_end(conversation_id)
+            self._evict()
+
+    def delete(self, conversation_id):
+        with self._lock:
+            self._items.pop(conversation_id, None)
+
+    def __len__(self):
+        with self._lock:
+            self._evict()
+            return len(self._items)
+
+    def _evict(self):
+        """Drop expired conversations, then the least recently used beyond the cap"""
+        now = time.monotonic()
+        # Entries are ordered by last use, so expired ones collect at the front
+        while self._items:
+            oldest_id, (expires_at, _) = next(iter(self._items.items()))
+            if expires_at >= now and len(self._items) <= self.max_conversations:
+                break
+            del self._items[oldest_id]
+
+class RedisConversationStore(ConversationStore):
+    """Networked store shared by all workers, for any Redis-protocol server
+
+    Besides one key per conversation, a sorted set (index_key) holds every
+    conversation id scored by its expiry time, so counting them never scans
+    the keyspace.
+    """
+
+    def __init__(self, url="redis://localhost:6379/0", ttl_seconds=86400, prefix="tara:conversation:",
+                 index_key="tara:conversations"):
+        if redis is None:
+            raise ImportError("The redis package is required for CONVERSATION_STORE=redis (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.index_key = index_key
+
+    def _key(self, conversation_id):
+        return f"{self.prefix}{conversation_id}"
+
+    def get(self, conversation_id):
+        data = self.client.get(self._key(conversation_id))
+        return json.loads(data) if data is not None else None
+
+    def save(self, conversation_id, history):
+        # The server expires idle conversations, so memory stays bounded
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(self._key(conversation_id), json.dumps(history), ex=self.ttl_seconds)
+        pipe.zadd(self.index_key, {conversation_id: time.time() + self.ttl_seconds})
+        pipe.execute()
+
+    def delete(self, conversation_id):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(self._key(conversation_id))
+        pipe.zrem(self.index_key, conversation_id)
+        pipe.execute()
+
+    def __len__(self):
+        # Expired conversations leave the index here, as the server expires their keys
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zremrangebyscore(self.index_key, "-inf", time.time())
+        pipe.zcard(self.index_key)
+        return pipe.execute()[1]
+
+def create_conversation_store():
+    """Create the conversation store selected by environment variables"""
+    backend = os.getenv('CONVERSATION_STORE', 'memory').lower()
+    ttl_seconds = int(os.getenv('CONVERSATION_TTL', 86400))
+
+    if backend == 'redis':
+        return RedisConversationStore(
+            url=os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+            ttl_seconds=ttl_seconds
+        )
+
+    return MemoryConversationStore(
+        max_conversations=int(os.getenv('MAX_CONVERSATIONS', 10000)),
+        ttl_seconds=ttl_seconds
+    )
@@ -0,0 +1,121 @@
+"""
+Background chat worker for the Tkinter front ends
+One long-lived thread runs the chat completions and streams the reply back
+through a queue. Tkinter widgets may only be touched from the main thread,
+so the window polls the queue with root.after and inserts whatever text
+has arrived in one batch per poll.
+"""
+
+import queue
+import itertools
+import threading
+
+# How often the window moves arrived text into the display
+POLL_INTERVAL_MS = 50
+
+class ChatWorker:
+    """Runs streamed chat completions one at a time off the Tk main thread
+
+    Events on `events`, each tagged with the id submit() returned, so a
+    window can drop events of a reply it has already let go of:
+        ("delta", request_id, text)            - more reply text
+        ("done", request_id, text, cancelled)  - the reply finished (or was cancelled) with this text
+        ("error", request_id, message)         - the request failed
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.events = queue.Queue()
+        self._requests = queue.Queue()
+        self._ids = itertools.count(1)
+        self._cancels = {}  # request id -> Event, for requests queued or running
+        self._current = None  # id of the request being run
+        self._stream_response = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="chat-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, **request):
+        """Queue a chat.completions.create request (model, messages, ...); returns its id"""
+        request_id = next(self._ids)
+        cancel = threading.Event()
+        with self._lock:
+            self._cancels[request_id] = cancel
+        self._requests.put((request_id, cancel, request))
+        return request_id
+
+    def cancel(self, request_id=None):
+        """Stop one request, or every queued and running one
+
+        A streaming reply stops at once, since its connection is closed. A
+        request still waiting for the upstream to start answering cannot be
+        interrupted; it is dropped as soon as the stream opens.
+        """
+        with self._lock:
+            ids = list(self._cancels) if request_id is None else [request_id]
+            for key in ids:
+                if key in self._cancels:
+                    self._cancels[key].set()
+            stream = self._stream_response if self._current in ids else None
+        if stream is not None:
+            stream.close()
+
+    def close(self):
+        self.cancel()
+        self._requests.put(None)
+
+    def _run(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                return
+            request_id, cancel, request = item
+            try:
+                self._stream(request_id, cancel, request)
+            finally:
+                with self._lock:
+                    self._cancels.pop(request_id, None)
+
+    def _stream(self, request_id, cancel, request):
+        parts = []
+        cancelled = cancel.is_set()
+        if cancelled:
+            self.events.put(("done", request_id, "", True))
+            return
+        with self._lock:
+            self._current = request_id
+        try:
+            stream = self.client.chat.completions.create(stream=True, **request)
+            with self._lock:
+                self._stream_response = stream
+            try:
+                for chunk in stream:
+                    if cancel.is_set():
+                        cancelled = True
+                        break
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        self.events.put(("delta", request_id, chunk.choices[0].delta.content))
+            finally:
+                with self._lock:
+                    self._stream_response = None
+                stream.close()
+        except Exception as e:
+            if not parts and not cancel.is_set():
+                self.events.put(("error", request_id, str(e)))
+                return
+            cancelled = True  # Keep what arrived before the connection closed
+        finally:
+            with self._lock:
+                self._current = None
+        self.events.put(("done", request_id, "".join(parts), cancelled))
+
+    def drain(self, max_events=500):
+        """Events received so far, without waiting"""
+        events = []
+        while len(events) < max_events:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return events
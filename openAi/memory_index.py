@@ -0,0 +1,105 @@
+"""
+Vector index over personal AI memories
+Embeds each memory with the local hashed embeddings from text_embedding.py
+and returns the memories most similar to the user's message, so the prompt
+carries what is relevant instead of whatever is most recent. Uses NumPy for
+the similarity search when it is installed.
+"""
+
+import heapq
+
+from text_embedding import embed, cosine_similarity
+
+try:
+    import numpy
+except ImportError:  # Optional dependency, a pure-Python scan is used without it
+    numpy = None
+
+class MemoryIndex:
+    """In-memory cosine-similarity index of memory texts"""
+
+    def __init__(self, dimensions=1024):
+        self.dimensions = dimensions
+        self._rows = {}  # key -> row number
+        self._entries = []  # (key, category, text)
+        self._vectors = []  # sparse unit vectors, when NumPy is unavailable
+        self._matrix = None  # dense unit vectors, one row per entry, grown by doubling
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, key, category, text):
+        """Index text under key, replacing whatever was indexed under it before"""
+        vector = embed(text, self.dimensions)
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = len(self._entries)
+            self._entries.append((key, category, text))
+        else:
+            self._entries[row] = (key, category, text)
+
+        if numpy is not None:
+            self._store_dense(row, vector)
+        elif row == len(self._vectors):
+            self._vectors.append(vector)
+        else:
+            self._vectors[row] = vector
+
+    def _store_dense(self, row, vector):
+        if self._matrix is None or row >= len(self._matrix):
+            grown = numpy.zeros((max(64, 2 * row), self.dimensions), dtype=numpy.float32)
+            if self._matrix is not None:
+                grown[:len(self._matrix)] = self._matrix
+            self._matrix = grown
+        self._matrix[row] = 0.0
+        for bucket, weight in vector.items():
+            self._matrix[row, bucket] = weight
+
+    def remove(self, key):
+        """Drop the entry indexed under key, if any, moving the last entry into its row"""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self._entries) - 1
+        if row != last:
+            moved = self._entries[last]
+            self._entries[row] = moved
+            self._rows[moved[0]] = row
+            if numpy is not None:
+                self._matrix[row] = self._matrix[last]
+            else:
+                self._vectors[row] = self._vectors[last]
+        self._entries.pop()
+        if numpy is None:
+            self._vectors.pop()
+
+    def clear(self):
+        self._rows.clear()
+        self._entries.clear()
+        self._vectors.clear()
+        self._matrix = None
+
+    def search(self, query, k=8, min_score=0.1):
+        """The k most similar entries as (score, category, text), best first"""
+        if not self._entries or k <= 0:
+            return []
+
+        query_vector = embed(query, self.dimensions)
+        if numpy is not None:
+            dense_query = numpy.zeros(self.dimensions, dtype=numpy.float32)
+            for bucket, weight in query_vector.items():
+                dense_query[bucket] = weight
+            scores = self._matrix[:len(self._entries)] @ dense_query
+            if k < len(scores):
+                candidates = numpy.argpartition(-scores, k)[:k]
+            else:
+                candidates = numpy.arange(len(scores))
+            ranked = sorted(((float(scores[row]), int(row)) for row in candidates), reverse=True)
+        else:
+            scored = [(cosine_similarity(query_vector, vector), row) for row, vector in enumerate(self._vectors)]
+            ranked = heapq.nlargest(k, scored)
+
+        return [
+            (score, self._entries[row][1], self._entries[row][2])
+            for score, row in ranked if score >= min_score
+        ]
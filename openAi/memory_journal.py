@@ -0,0 +1,211 @@
+"""
+Append-only journal storage for the personal AI memory files
+Each change (append to a list, set a key, increment a counter) is written
+as one JSON line to `<file>.journal`, so saving costs O(1) I/O however big
+memory gets. The JSON file itself is a snapshot that the journal is
+periodically compacted into; startup loads the snapshot and replays the
+(short) journal on top of it. Given a WriteBehindPersister, new lines and
+compactions are written by its background thread instead of the caller.
+"""
+
+import os
+import copy
+import json
+import heapq
+import threading
+
+from persistence import atomic_write_json
+
+# Snapshot key recording the last journal entry it includes, so a crash
+# between writing the snapshot and truncating the journal can't apply twice
+SEQ_KEY = "_journal_seq"
+
+class MemoryJournal:
+    """A JSON document stored as a snapshot plus an append-only change log"""
+
+    def __init__(self, path, default=None, compact_every=1000, persister=None):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_every = compact_every
+        self.persister = persister
+        self.lock = threading.RLock()
+        self._buffer = []  # Lines not yet written to the journal
+        self._compact_lock = threading.Lock()  # One compaction at a time, taken before lock
+        self._compacting = False
+        self.default = default or {}
+        self.seq = 0
+        self.data = self._load_snapshot()
+        self._pending = self._replay()
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _load_snapshot(self):
+        data = {}
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not load {self.path}: {e}")
+
+        self.seq = data.pop(SEQ_KEY, 0)
+        for category, value in self.default.items():
+            data.setdefault(category, copy.deepcopy(value))
+        return data
+
+    def _replay(self):
+        """Apply journal entries newer than the snapshot; returns how many there were"""
+        if not os.path.exists(self.journal_path):
+            return 0
+
+        replayed = 0
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    continue
+                if entry["seq"] <= self.seq:
+                    continue
+                self._apply(entry)
+                self.seq = entry["seq"]
+                replayed += 1
+        return replayed
+
+    def _apply(self, entry):
+        op = entry["op"]
+        if op == "reset":
+            self.data = entry["value"]
+            return
+
+        category = entry["category"]
+        if op == "append":
+            items = self.data.setdefault(category, [])
+            items.append(entry["value"])
+            limit = entry.get("limit")
+            if limit and len(items) > limit:
+                del items[:-limit]
+        elif op == "set":
+            self.data.setdefault(category, {})[entry["key"]] = entry["value"]
+        elif op == "incr":
+            counts = self.data.setdefault(category, {})
+            counts[entry["key"]] = counts.get(entry["key"], 0) + entry["value"]
+
+    def _record(self, entry):
+        with self.lock:
+            self.seq += 1
+            entry["seq"] = self.seq
+            self._apply(entry)
+            self._buffer.append(json.dumps(entry) + "\n")
+            self._pending += 1
+            if self.persister is None:
+                self.flush()
+            else:
+                self.persister.mark_dirty(self.journal_path, self.flush)
+
+    def flush(self):
+        """Write buffered entries to the journal, compacting it once it is long enough"""
+        with self.lock:
+            if self._file.closed:
+                return
+            compact = self._pending >= self.compact_every
+            if not compact:
+                self._write_buffer()
+        if compact:
+            self.compact()
+
+    def _write_buffer(self):
+        # While a compaction writes the snapshot, new lines wait for the journal to be truncated
+        if self._buffer and not self._compacting:
+            self._file.writelines(self._buffer)
+            self._file.flush()
+            self._buffer = []
+
+    def append(self, category, value, limit=None):
+        """Append value to a list category, keeping at most limit items"""
+        self._record({"op": "append", "category": category, "value": value, "limit": limit})
+
+    def set(self, category, key, value):
+        """Set key in a dict category"""
+        self._record({"op": "set", "category": category, "key": key, "value": value})
+
+    def incr(self, category, key, amount=1):
+        """Add amount to a counter in a dict category"""
+        self._record({"op": "incr", "category": category, "key": key, "value": amount})
+
+    def reset(self, data=None):
+        """Replace the whole document (defaults to the empty default document)"""
+        if data is None:
+            data = copy.deepcopy(self.default)
+        self._record({"op": "reset", "value": data})
+
+    def recent(self, category, n):
+        """The last n items of a list category, oldest first"""
+        return self.data.get(category, [])[-n:] if n > 0 else []
+
+    def recent_items(self, category, n):
+        """The last n (key, value) pairs of a dict category"""
+        return list(self.data.get(category, {}).items())[-n:] if n > 0 else []
+
+    def items(self, category):
+        """All key/value pairs of a dict category"""
+        return dict(self.data.get(category, {}))
+
+    def top(self, category, n):
+        """The n highest counters of a dict category as (key, count) pairs"""
+        return heapq.nlargest(n, self.data.get(category, {}).items(), key=lambda item: item[1])
+
+    def count(self, category):
+        """Number of items in a category"""
+        return len(self.data.get(category, ()))
+
+    def is_keyed(self, category):
+        """Whether a category is a dict rather than a list"""
+        return isinstance(self.data.get(category), dict)
+
+    def compact(self):
+        """Fold the journal into the snapshot and start a new, empty journal
+
+        Only copying the data holds the lock; changes recorded while the
+        snapshot is written stay buffered and go into the new journal.
+        """
+        with self._compact_lock:
+            self._compact()
+
+    def _compact(self):
+        with self.lock:
+            if self._file.closed:
+                return
+            snapshot = copy.deepcopy(self.data)
+            snapshot[SEQ_KEY] = self.seq
+            included = len(self._buffer)
+            self._compacting = True
+
+        try:
+            atomic_write_json(self.path, snapshot)
+        except BaseException:
+            with self.lock:
+                # Keep everything in the old journal instead
+                self._compacting = False
+                self._write_buffer()
+            raise
+
+        with self.lock:
+            # Entries older than the snapshot are skipped on replay, so a crash before this is harmless
+            self._compacting = False
+            del self._buffer[:included]
+            self._pending = len(self._buffer)
+            self._file.close()
+            self._file = open(self.journal_path, 'w', encoding='utf-8')
+            self._write_buffer()
+
+    def close(self):
+        """Compact outstanding changes (buffered ones included) and close the journal"""
+        with self._compact_lock:
+            if self._file.closed:
+                return
+            if self._pending:
+                self._compact()
+            with self.lock:
+                self._write_buffer()
+                self._file.close()
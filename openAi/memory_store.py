@@ -0,0 +1,187 @@
+"""
+Storage backends for AdvancedPersonalAI memory
+The default is the JSON journal (memory_journal.py). The SQLite backend
+keeps every memory instead of the last 50 per category, with indexes so
+"recent N" and "top N topics" stay cheap lookups as memory grows.
+"""
+
+import os
+import json
+import sqlite3
+import datetime
+import threading
+
+from memory_journal import MemoryJournal
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_category_timestamp ON entries (category, timestamp);
+
+CREATE TABLE IF NOT EXISTS keyed (
+    category TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    updated TEXT NOT NULL,
+    PRIMARY KEY (category, key)
+);
+CREATE INDEX IF NOT EXISTS keyed_category_updated ON keyed (category, updated);
+CREATE INDEX IF NOT EXISTS keyed_category_count ON keyed (category, count);
+"""
+
+class SqliteMemoryStore:
+    """Memory categories in SQLite: list categories in `entries`, dict categories in `keyed`
+
+    Offers the same operations as MemoryJournal, so AdvancedPersonalAI can
+    use either.
+    """
+
+    def __init__(self, path, default=None):
+        self.path = path
+        self.default = default or {}
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def import_document(self, data):
+        """Load a JSON memory document, e.g. the existing advanced_memory.json"""
+        with self.lock, self.conn:
+            for category, value in data.items():
+                if isinstance(value, dict):
+                    for key, item in value.items():
+                        self._set(category, key, item)
+                elif isinstance(value, list):
+                    for item in value:
+                        self._append(category, item)
+
+    def is_empty(self):
+        with self.lock:
+            return not any(
+                self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+                for table in ("entries", "keyed")
+            )
+
+    def _append(self, category, value):
+        timestamp = value.get("timestamp") if isinstance(value, dict) else None
+        self.conn.execute(
+            "INSERT INTO entries (category, timestamp, content) VALUES (?, ?, ?)",
+            (category, timestamp or datetime.datetime.now().isoformat(), json.dumps(value))
+        )
+
+    def _set(self, category, key, value):
+        self.conn.execute(
+            "INSERT INTO keyed (category, key, value, count, updated) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (category, key) DO UPDATE SET value = excluded.value, "
+            "count = excluded.count, updated = excluded.updated",
+            (category, key, json.dumps(value), value if isinstance(value, int) else 0,
+             datetime.datetime.now().isoformat())
+        )
+
+    def append(self, category, value, limit=None):
+        """Append value to a list category (limit is ignored: nothing is dropped)"""
+        with self.lock, self.conn:
+            self._append(category, value)
+
+    def set(self, category, key, value):
+        """Set key in a dict category"""
+        with self.lock, self.conn:
+            self._set(category, key, value)
+
+    def incr(self, category, key, amount=1):
+        """Add amount to a counter in a dict category"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO keyed (category, key, value, count, updated) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (category, key) DO UPDATE SET count = count + excluded.count, "
+                "value = count + excluded.count, updated = excluded.updated",
+                (category, key, json.dumps(amount), amount, datetime.datetime.now().isoformat())
+            )
+
+    def reset(self, data=None):
+        """Delete everything, then load data (defaults to the empty default document)"""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("DELETE FROM keyed")
+        if data:
+            self.import_document(data)
+
+    def recent(self, category, n):
+        """The last n items of a list category, oldest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT content FROM entries WHERE category = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (category, max(n, 0))
+            ).fetchall()
+        return [json.loads(content) for content, in reversed(rows)]
+
+    def recent_items(self, category, n):
+        """The last n (key, value) pairs of a dict category, by update time"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT key, value FROM keyed WHERE category = ? ORDER BY updated DESC LIMIT ?",
+                (category, max(n, 0))
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in reversed(rows)]
+
+    def items(self, category):
+        """All key/value pairs of a dict category"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT key, value FROM keyed WHERE category = ? ORDER BY updated", (category,)
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def top(self, category, n):
+        """The n highest counters of a dict category as (key, count) pairs"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT key, count FROM keyed WHERE category = ? ORDER BY count DESC LIMIT ?",
+                (category, max(n, 0))
+            ).fetchall()
+
+    def count(self, category):
+        """Number of items in a category"""
+        with self.lock:
+            for table in ("entries", "keyed"):
+                total = self.conn.execute(
+                    f"SELECT COUNT(*) FROM {table} WHERE category = ?", (category,)
+                ).fetchone()[0]
+                if total:
+                    return total
+        return 0
+
+    def is_keyed(self, category):
+        """Whether a category is a dict rather than a list"""
+        if category in self.default:
+            return isinstance(self.default[category], dict)
+        with self.lock:
+            return self.conn.execute(
+                "SELECT 1 FROM keyed WHERE category = ? LIMIT 1", (category,)
+            ).fetchone() is not None
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def create_memory_store(path, default, backend="journal", compact_every=1000, persister=None):
+    """Open the memory document at path (a .json file) with the selected backend
+
+    persister (a WriteBehindPersister) moves journal writes off the caller's thread.
+    """
+    if backend == "sqlite":
+        store = SqliteMemoryStore(os.path.splitext(path)[0] + ".db", default)
+        if store.is_empty() and (os.path.exists(path) or os.path.exists(path + ".journal")):
+            # First run on SQLite: bring over the existing JSON memory
+            journal = MemoryJournal(path, default, compact_every)
+            store.import_document(journal.data)
+            journal.close()
+        return store
+
+    return MemoryJournal(path, default, compact_every, persister)
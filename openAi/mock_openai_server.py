@@ -0,0 +1,273 @@
+"""
+Mock OpenAI Server - offline /v1/chat/completions for load testing and CI
+Answers with MockChatGPT's canned responses using the real wire format
+(including streaming), with configurable latency, token rate and errors.
+
+Usage:
+    python mock_openai_server.py --port 8001 --latency lognormal:0.8,0.4 --tokens-per-second 50
+
+Then point any client at it:
+    $env:OPENAI_BASE_URL = "http://127.0.0.1:8001/v1"
+    $env:OPENAI_API_KEY = "sk-mock"
+"""
+
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import threading
+from dataclasses import dataclass
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from test_without_api import MockChatGPT
+
+def parse_latency(spec):
+    """Build a latency sampler (seconds) from a spec string
+
+    fixed:0.5            always 0.5s
+    uniform:0.2,1.0      uniformly between 0.2s and 1.0s
+    normal:0.8,0.2       mean 0.8s, std dev 0.2s (never below 0)
+    lognormal:0.8,0.5    median 0.8s with a long tail (sigma 0.5)
+    """
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',')] if args else []
+
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'normal':
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == 'lognormal':
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+@dataclass
+class MockConfig:
+    """Behaviour of the mock server"""
+    latency: str = "fixed:0.0"          # time to first token
+    tokens_per_second: float = 0.0      # 0 = unlimited
+    response_tokens: int = 0            # pad replies to this many tokens, 0 = canned length
+    rate_limit_rate: float = 0.0        # fraction of requests answered with 429
+    server_error_rate: float = 0.0      # fraction answered with 500
+    timeout_rate: float = 0.0           # fraction that hang for timeout_seconds
+    timeout_seconds: float = 120.0
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """Request handler speaking the OpenAI chat completions wire format"""
+
+    protocol_version = "HTTP/1.1"
+    mock = MockChatGPT()
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self.send_json(200, {
+                "object": "list",
+                "data": [{"id": "gpt-4o-mini", "object": "model", "owned_by": "mock"}]
+            })
+        else:
+            self.send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self.send_json(400, {"error": {"message": "Invalid JSON", "type": "invalid_request_error"}})
+            return
+
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+
+        if self.inject_error():
+            return
+
+        model = body.get('model', 'gpt-4o-mini')
+        prompt_tokens = sum(len(str(m.get('content', '')).split()) + 4 for m in body.get('messages', []))
+        tokens = self.reply_tokens(body.get('max_tokens'))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens)
+        }
+
+        time.sleep(self.server.sample_latency())
+
+        if body.get('stream'):
+            include_usage = (body.get('stream_options') or {}).get('include_usage', False)
+            self.send_stream(model, tokens, usage if include_usage else None)
+        else:
+            if self.config.tokens_per_second:
+                time.sleep(len(tokens) / self.config.tokens_per_second)
+            self.send_json(200, {
+                "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+    def inject_error(self):
+        """Answer with a configured error instead of a completion; True if one was sent"""
+        roll = random.random()
+        if roll < self.config.rate_limit_rate:
+            self.send_json(429, {"error": {
+                "message": "Rate limit reached (mock)", "type": "rate_limit_exceeded", "code": "rate_limit_exceeded"
+            }}, headers={"Retry-After": "1"})
+            return True
+        roll -= self.config.rate_limit_rate
+        if roll < self.config.server_error_rate:
+            self.send_json(500, {"error": {"message": "Internal server error (mock)", "type": "server_error"}})
+            return True
+        roll -= self.config.server_error_rate
+        if roll < self.config.timeout_rate:
+            # Hang, then drop the connection without answering
+            time.sleep(self.config.timeout_seconds)
+            self.close_connection = True
+            return True
+        return False
+
+    def reply_tokens(self, max_tokens):
+        """Pick a canned reply split into word tokens"""
+        words = random.choice(self.mock.responses).split(' ')
+        target = self.config.response_tokens or len(words)
+        if max_tokens:
+            target = min(target, max_tokens)
+        while len(words) < target:
+            words += random.choice(self.mock.responses).split(' ')
+        words = words[:target]
+        return [w if i == 0 else ' ' + w for i, w in enumerate(words)]
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, model, tokens, usage):
+        """Send tokens as chat.completion.chunk server-sent events"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        def chunk(delta, finish_reason=None, chunk_usage=None, choices=True):
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if choices else [],
+            }
+            if chunk_usage:
+                payload["usage"] = chunk_usage
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+            self.wfile.flush()
+
+        try:
+            chunk({"role": "assistant", "content": ""})
+            delay = 1 / self.config.tokens_per_second if self.config.tokens_per_second else 0
+            for token in tokens:
+                if delay:
+                    time.sleep(delay)
+                chunk({"content": token})
+            chunk({}, finish_reason="stop")
+            if usage:
+                chunk(None, chunk_usage=usage, choices=False)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client cancelled the stream
+            pass
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the mock configuration"""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=8001, config=None):
+        super().__init__((host, port), MockOpenAIHandler)
+        self.config = config or MockConfig()
+        self.sample_latency = parse_latency(self.config.latency)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """Serve in a background thread (for benchmarks and CI)"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline mock of the OpenAI chat completions API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', default='fixed:0.0',
+                        help="Time to first token: fixed:S, uniform:A,B, normal:MEAN,STD or lognormal:MEDIAN,SIGMA")
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help="Generation speed, 0 = instant")
+    parser.add_argument('--response-tokens', type=int, default=0, help="Pad replies to this many tokens")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument('--server-error-rate', type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument('--timeout-seconds', type=float, default=120.0)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds
+    )
+    server = MockOpenAIServer(args.host, args.port, config)
+
+    print("🤖 Mock OpenAI Server - DEMO MODE")
+    print("=" * 50)
+    print(f"📡 Base URL: {server.base_url}")
+    print(f"⏱️  Latency: {args.latency}, {args.tokens_per_second or 'unlimited'} tokens/s")
+    print(f"💥 Errors: 429 {args.rate_limit_rate:.0%}, 500 {args.server_error_rate:.0%}, timeout {args.timeout_rate:.0%}")
+    print("=" * 50)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Mock server stopped!")
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Model routing for the Tara web API
+Classifies each request with cheap local checks (message length, code,
+reasoning keywords, and conversation depth as a weaker signal). Simple
+requests go to a fast model and hard ones to a stronger model. Each route
+keeps a count and latency figures, so the split can be checked against
+cost and response times.
+"""
+
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+
+from context_window import count_tokens
+from pattern_matcher import PatternMatcher
+
+# Phrases that usually ask for more reasoning than the fast model does well
+COMPLEX_KEYWORDS = [
+    "step by step", "explain why", "prove that", "analyze", "analyse", "compare", "trade-off", "tradeoff",
+    "design a", "architecture", "optimize", "optimise", "refactor", "debug", "algorithm", "complexity",
+    "in detail", "pros and cons", "write a program", "write code", "implement"
+]
+
+# Fenced code, a stack trace, or a line with the shape of a definition or statement
+CODE_PATTERN = re.compile(
+    r"```|Traceback \(most recent call last\)"
+    r"|^\s*(def|class)\s+\w+\s*[(:]"
+    r"|^\s*(import\s+[\w.]+(\s+as\s+\w+)?|from\s+[\w.]+\s+import\s+[\w*, ]+)\s*$"
+    r"|^\s*(function\s+\w+\s*\(|(const|let|var)\s+\w+\s*=)"
+    r"|^\s*((public|private|protected)\s+)?(static\s+)?\w+(<[\w, ]+>)?\s+\w+\s*\([^)]*\)\s*\{"
+    r"|^\s*#include\s*[<\"]"
+    r"|^\s*(SELECT\s.+\sFROM|INSERT\s+INTO|UPDATE\s+\w+\s+SET)\s",
+    re.MULTILINE
+)
+
+# Lines ending in ; { or }: code when there are several, not a sentence ending in a semicolon
+CODE_LINE_ENDING = re.compile(r"[;{}]\s*$", re.MULTILINE)
+
+@dataclass
+class RouteDecision:
+    model: str
+    route: str  # "simple", "complex" or "explicit"
+    reasons: list = field(default_factory=list)
+
+class _RouteStats:
+    def __init__(self, window=1000):
+        self.requests = 0
+        self.latencies = deque(maxlen=window)  # Recent upstream latencies in seconds
+
+class ModelRouter:
+    """Picks the cheapest model that should handle a request well"""
+
+    def __init__(self, fast_model, strong_model, enabled=True, max_simple_tokens=300, max_simple_history=12,
+                 keywords=COMPLEX_KEYWORDS):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.enabled = enabled
+        self.max_simple_tokens = max_simple_tokens
+        self.max_simple_history = max_simple_history
+        self.matcher = PatternMatcher({"complex": keywords})
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def classify(self, message, history=()):
+        """Return the reasons a request is complex; empty means simple"""
+        reasons = []
+        if CODE_PATTERN.search(message) or len(CODE_LINE_ENDING.findall(message)) >= 3:
+            reasons.append("code")
+        tokens = count_tokens(message)
+        if tokens > self.max_simple_tokens:
+            reasons.append("long_message")
+        # A deep conversation alone is weak evidence: short follow-ups ("thanks!") stay on the fast model
+        if len(history) > self.max_simple_history and tokens > self.max_simple_tokens // 4:
+            reasons.append("deep_history")
+        if self.matcher.first_matches(message):
+            reasons.append("reasoning_keywords")
+        return reasons
+
+    def choose(self, message, history=(), requested_model=None):
+        """Decide which model answers message, given the conversation so far"""
+        if requested_model:
+            return RouteDecision(requested_model, "explicit")
+        if not self.enabled:
+            return RouteDecision(self.fast_model, "simple")
+
+        reasons = self.classify(message, history)
+        if reasons:
+            return RouteDecision(self.strong_model, "complex", reasons)
+        return RouteDecision(self.fast_model, "simple")
+
+    def observe(self, decision, seconds=None):
+        """Count a routed request and its upstream latency (None for cache hits)"""
+        with self._lock:
+            stats = self._stats.setdefault(decision.route, _RouteStats())
+            stats.requests += 1
+            if seconds is not None:
+                stats.latencies.append(seconds)
+
+    def stats(self):
+        """Requests and recent upstream latency per route"""
+        with self._lock:
+            result = {
+                "enabled": self.enabled,
+                "fast_model": self.fast_model,
+                "strong_model": self.strong_model,
+                "routes": {}
+            }
+            for route, stats in self._stats.items():
+                latencies = sorted(stats.latencies)
+                result["routes"][route] = {
+                    "requests": stats.requests,
+                    "latency_p50": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                    "latency_p95": round(latencies[int(len(latencies) * 0.95)], 3) if latencies else None
+                }
+            return result
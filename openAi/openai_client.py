@@ -0,0 +1,64 @@
+"""
+Shared OpenAI client factory
+Every entry point gets its client here, so connections (and their TLS
+handshakes) are pooled and reused, stuck upstream calls time out, and
+failed calls are retried a bounded number of times.
+"""
+
+import os
+import threading
+import importlib.util
+import httpx
+from openai import OpenAI, DefaultHttpxClient
+
+# Timeouts in seconds: connecting should be quick, generation can take a while
+CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.getenv('OPENAI_READ_TIMEOUT', 60))
+
+# The SDK retries connection errors, 408/409/429 and 5xx with jittered exponential backoff
+MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', 2))
+
+# Connection pool
+MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', 100))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 20))
+KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 60))
+
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+USE_HTTP2 = os.getenv('OPENAI_HTTP2', 'auto').lower()
+
+_clients = {}
+_lock = threading.Lock()
+
+def http2_enabled():
+    """Whether to negotiate HTTP/2 with the upstream"""
+    if USE_HTTP2 in ('auto', ''):
+        return importlib.util.find_spec('h2') is not None
+    return USE_HTTP2 == 'true'
+
+def client_settings():
+    """Timeout and connection-pool settings for the shared clients"""
+    timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY
+    )
+    return timeout, limits
+
+def create_client(api_key=None, base_url=None):
+    """Return a pooled OpenAI client, shared by all callers with the same key and URL"""
+    api_key = api_key or os.getenv('OPENAI_API_KEY')
+    base_url = base_url or os.getenv('OPENAI_BASE_URL')
+
+    with _lock:
+        key = (api_key, base_url)
+        if key not in _clients:
+            timeout, limits = client_settings()
+            _clients[key] = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=timeout,
+                max_retries=MAX_RETRIES,
+                http_client=DefaultHttpxClient(timeout=timeout, limits=limits, http2=http2_enabled())
+            )
+        return _clients[key]
@@ -0,0 +1,117 @@
+"""
+Multi-pattern keyword matching for the personal AI learning rules
+An Aho-Corasick automaton finds every occurrence of every rule pattern in
+one pass over the message, instead of one substring search per pattern.
+The pyahocorasick C extension runs the scan when it is installed.
+"""
+
+from collections import deque, namedtuple
+
+try:
+    import ahocorasick
+except ImportError:  # Optional dependency, the pure-Python automaton is used without it
+    ahocorasick = None
+
+# start/end index into the lowercased text (end is exclusive)
+Match = namedtuple("Match", ["start", "end", "label", "pattern"])
+
+class PatternMatcher:
+    """Case-insensitive matcher for labelled keyword rules
+
+    rules maps a label to its patterns, in priority order, e.g.
+    {"goal": ["i want to", "my goal"], "project": ["building", "working on"]}
+    """
+
+    def __init__(self, rules):
+        self.rules = {label: [pattern.lower() for pattern in patterns] for label, patterns in rules.items()}
+
+        labels_by_pattern = {}
+        for label, patterns in self.rules.items():
+            for pattern in patterns:
+                if pattern:
+                    labels_by_pattern.setdefault(pattern, []).append(label)
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for pattern, labels in labels_by_pattern.items():
+                self._automaton.add_word(pattern, (pattern, labels))
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            self._build(labels_by_pattern)
+
+    def _build(self, labels_by_pattern):
+        """Build the trie with failure links; outputs are (pattern, labels) pairs"""
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for pattern, labels in labels_by_pattern.items():
+            node = 0
+            for char in pattern:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = child
+            self._output[node].append((pattern, labels))
+
+        # Breadth-first, so every failure target is finished before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+        # Resolve failure links ahead of time: one dict lookup per character when scanning
+        self._delta = [None] * len(self._goto)
+        self._delta[0] = dict(self._goto[0])
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            self._delta[node] = {**self._delta[self._fail[node]], **self._goto[node]}
+            queue.extend(self._goto[node].values())
+
+    def _scan(self, text):
+        """Yield (end index, (pattern, labels)) for every occurrence, in order of end"""
+        if self._automaton is not None:
+            yield from self._automaton.iter(text)
+            return
+
+        delta, output = self._delta, self._output
+        node = 0
+        for index, char in enumerate(text):
+            node = delta[node].get(char, 0)
+            if output[node]:
+                for found in output[node]:
+                    yield index, found
+
+    def find_all(self, text):
+        """Every occurrence of every pattern as a Match, in order of where it ends"""
+        matches = []
+        for index, (pattern, labels) in self._scan(text.lower()):
+            for label in labels:
+                matches.append(Match(index + 1 - len(pattern), index + 1, label, pattern))
+        return matches
+
+    def first_matches(self, text):
+        """{label: {pattern: first start}} for the patterns present, in rule priority order"""
+        first = {}
+        for index, (pattern, labels) in self._scan(text.lower()):
+            if pattern not in first:
+                first[pattern] = (index + 1 - len(pattern), labels)
+
+        found = {}
+        for label, patterns in self.rules.items():
+            for pattern in patterns:
+                if pattern in first and label in first[pattern][1]:
+                    found.setdefault(label, {})[pattern] = first[pattern][0]
+        return found
@@ -0,0 +1,79 @@
+"""
+Crash-safe, write-behind persistence for the personal AI data files
+Callers mark a file dirty instead of writing it on every turn; a background
+thread coalesces the changes and writes each file at most once per interval
+(and once more at shutdown), using atomic replace for whole-file writes.
+"""
+
+import os
+import json
+import atexit
+import tempfile
+import threading
+
+def atomic_write_text(path, text):
+    """Write text to a temp file and rename it over path, so readers never see a partial file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def atomic_write_json(path, data, indent=2):
+    """Write data as JSON with atomic_write_text"""
+    atomic_write_text(path, json.dumps(data, indent=indent))
+
+class WriteBehindPersister:
+    """Runs pending writes from a background thread, once per interval per file
+
+    Owners keep the state to save under their own lock and pass a function
+    that writes it; marking the same path again before a flush coalesces.
+    """
+
+    def __init__(self, flush_interval=2.0):
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self._dirty = {}  # path -> function that writes it
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def mark_dirty(self, path, write):
+        """Schedule write() to run on the next flush"""
+        with self.lock:
+            self._dirty[path] = write
+
+    def flush(self):
+        """Run every pending write now"""
+        with self.lock:
+            dirty, self._dirty = self._dirty, {}
+
+        for path, write in dirty.items():
+            try:
+                write()
+            except Exception as e:
+                print(f"Warning: Could not save {path}: {e}")
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background thread and flush outstanding changes"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
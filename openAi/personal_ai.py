@@ -1,7 +1,19 @@
 import os
 import json
 import datetime
-from openai import OpenAI
+from openai_client import create_client
+from context_window import ContextWindow, count_tokens
+from memory_journal import MemoryJournal
+from persistence import WriteBehindPersister
+from pattern_matcher import PatternMatcher
+from stream_renderer import stream_chat
+
+# Keyword rules for auto_learn
+LEARNING_RULES = {
+    "preferences": ["i like", "i love"],
+    "goals": ["i want to", "my goal", "i plan to"],
+    "project_history": ["project", "building", "working on", "coding"]
+}
 
 class PersonalAI:
     def __init__(self):
@@ -13,21 +25,25 @@ class PersonalAI:
             print("🔑 Enter your OpenAI API key:")
             self.api_key = input("API Key: ").strip()
         
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = create_client(api_key=self.api_key)
         
         # Personal AI Configuration
         self.ai_name = "ARIA"  # Your AI's name (Aman's Responsive Intelligence Assistant)
         self.owner_name = "Aman"
         
-        # Load or create personal memory
+        # Load or create personal memory, saved as an append-only journal written in the background
         self.memory_file = "personal_memory.json"
-        self.memory = self.load_memory()
+        self.persister = WriteBehindPersister()
+        self.memory_journal = MemoryJournal(self.memory_file, self.default_memory(), persister=self.persister)
+        
+        self.learning_matcher = PatternMatcher(LEARNING_RULES)
         
         # Personal system prompt
         self.system_prompt = self.create_personal_system_prompt()
         
-        # Conversation history
-        self.conversation_history = []
+        # Conversation history, leaving room in the budget for the memory-heavy system prompt
+        self.conversation_history = ContextWindow(reserved_tokens=count_tokens(self.system_prompt))
+        self.last_reply_stats = None
         
     def create_personal_system_prompt(self):
         """Create a personalized system prompt for your AI"""
@@ -58,14 +74,12 @@ MEMORY: You remember everything from previous conversations and can reference:
 
 Be personal, helpful, and act like you truly know and care about {self.owner_name}'s goals."""
 
-    def load_memory(self):
-        """Load personal memory from file"""
-        try:
-            if os.path.exists(self.memory_file):
-                with open(self.memory_file, 'r') as f:
-                    return json.load(f)
-        except:
-            pass
+    @property
+    def memory(self):
+        return self.memory_journal.data
+    
+    def default_memory(self):
+        """Empty personal memory"""
         return {
             "preferences": {},
             "personal_facts": [],
@@ -74,42 +88,37 @@ Be personal, helpful, and act like you truly know and care about {self.owner_nam
             "important_dates": {}
         }
     
-    def save_memory(self):
-        """Save personal memory to file"""
-        try:
-            with open(self.memory_file, 'w') as f:
-                json.dump(self.memory, f, indent=2)
-        except Exception as e:
-            print(f"Warning: Could not save memory: {e}")
+    def close(self):
+        """Compact the memory journal into the memory file"""
+        self.memory_journal.close()
+        self.persister.close()
     
     def add_to_memory(self, category, item):
         """Add information to personal memory"""
-        if category not in self.memory:
-            self.memory[category] = []
-        
-        if isinstance(self.memory[category], list):
-            self.memory[category].append({
+        if isinstance(self.memory.get(category, []), list):
+            self.memory_journal.append(category, {
                 "date": datetime.datetime.now().isoformat(),
                 "content": item
             })
         else:
-            self.memory[category][str(datetime.datetime.now().date())] = item
-        
-        self.save_memory()
+            self.memory_journal.set(category, str(datetime.datetime.now().date()), item)
     
     def get_response(self, user_input):
-        """Get personalized response from AI"""
+        """Stream a personalized response to the terminal and return it"""
+        user_message = {"role": "user", "content": user_input}
         try:
-            # Add user message to history
-            user_message = {"role": "user", "content": user_input}
+            # Add user message to history, dropping old turns that no longer fit
+            self.conversation_history.append(user_message)
+            self.conversation_history.trim()
             
             # Create messages with personal system prompt
             messages = [
                 {"role": "system", "content": self.system_prompt}
-            ] + self.conversation_history + [user_message]
+            ] + self.conversation_history.messages
             
-            # Make API call
-            response = self.client.chat.completions.create(
+            # Make API call, printing the reply as it arrives (Ctrl-C stops it)
+            result = stream_chat(
+                self.client,
                 model="gpt-4o-mini",
                 messages=messages,
                 max_tokens=1500,
@@ -117,16 +126,19 @@ Be personal, helpful, and act like you truly know and care about {self.owner_nam
                 presence_penalty=0.1,  # Encourage diverse responses
                 frequency_penalty=0.1
             )
+            self.last_reply_stats = result
             
-            ai_response = response.choices[0].message.content
+            ai_response = result.text
+            if not ai_response:
+                # Stopped before any text arrived
+                self.conversation_history.discard_last(user_message)
+                return ai_response
             
-            # Update conversation history
-            self.conversation_history.append(user_message)
+            # Update conversation history with only what was actually produced
             self.conversation_history.append({"role": "assistant", "content": ai_response})
             
-            # Keep conversation manageable
-            if len(self.conversation_history) > 20:
-                self.conversation_history = self.conversation_history[-20:]
+            # Keep conversation within the token budget
+            self.conversation_history.trim()
             
             # Auto-save important information (basic implementation)
             self.auto_learn(user_input, ai_response)
@@ -134,23 +146,19 @@ Be personal, helpful, and act like you truly know and care about {self.owner_nam
             return ai_response
             
         except Exception as e:
-            return f"❌ Error: {str(e)}"
+            # Don't keep a question that never got an answer
+            self.conversation_history.discard_last(user_message)
+            error = f"❌ Error: {str(e)}"
+            print(error)
+            return error
     
     def auto_learn(self, user_input, ai_response):
         """Automatically learn and store important information"""
-        user_lower = user_input.lower()
-        
-        # Detect preferences
-        if "i like" in user_lower or "i love" in user_lower:
-            self.add_to_memory("preferences", user_input)
-        
-        # Detect goals
-        if "i want to" in user_lower or "my goal" in user_lower or "i plan to" in user_lower:
-            self.add_to_memory("goals", user_input)
-        
-        # Detect project mentions
-        if any(word in user_lower for word in ["project", "building", "working on", "coding"]):
-            self.add_to_memory("project_history", user_input)
+        # Preferences, goals and project mentions, found in one pass; the rule labels are memory categories
+        matches = self.learning_matcher.first_matches(user_input)
+        for category in LEARNING_RULES:
+            if category in matches:
+                self.add_to_memory(category, user_input)
     
     def show_memory(self):
         """Display current personal memory"""
@@ -196,16 +204,15 @@ Be personal, helpful, and act like you truly know and care about {self.owner_nam
                     continue
                 
                 elif user_input.lower() == 'clear':
-                    self.conversation_history = []
+                    self.conversation_history.clear()
                     print(f"\n{self.ai_name}: Conversation cleared, but I still remember everything about you!")
                     continue
                 
                 if not user_input:
                     continue
                 
-                print(f"\n{self.ai_name}: ", end="")
-                response = self.get_response(user_input)
-                print(response)
+                print(f"\n{self.ai_name}: ", end="", flush=True)
+                self.get_response(user_input)
                 
             except KeyboardInterrupt:
                 print(f"\n\n{self.ai_name}: Until next time, {self.owner_name}! 👋")
@@ -217,7 +224,10 @@ def main():
     """Main function to run Personal AI"""
     try:
         personal_ai = PersonalAI()
-        personal_ai.chat()
+        try:
+            personal_ai.chat()
+        finally:
+            personal_ai.close()
     except Exception as e:
         print(f"Error starting Personal AI: {e}")
 
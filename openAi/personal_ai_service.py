@@ -0,0 +1,199 @@
+"""
+Multi-tenant hosting for AdvancedPersonalAI
+Every user gets their own assistant with its own memory directory. Assistants
+are loaded on first use and kept in a least-recently-used cache. When a user
+goes idle or is pushed out by newer ones, their assistant is closed in the
+background, which saves its memory to disk. A process therefore only holds
+the users who are active, however many have memory files.
+
+Memory files are not shared between processes: run one worker process (with
+threads), or route each user to the same worker.
+"""
+
+import io
+import os
+import re
+import time
+import threading
+from contextlib import nullcontext
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from advanced_personal_ai import AdvancedPersonalAI
+from persistence import WriteBehindPersister
+
+# User ids become directory names, so only allow characters that are safe there
+USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+class _Tenant:
+    """A cache slot for one user; lock serializes loading, replies and closing"""
+
+    def __init__(self, user_id, previous=None):
+        self.user_id = user_id
+        self.lock = threading.Lock()
+        self.assistant = None
+        self.closed = False
+        self.saved = threading.Event()  # Set once closing has written the slot's memory
+        self.previous = previous  # Earlier slot for this user that is still being closed
+        self.last_used = time.monotonic()
+
+class PersonalAIService:
+    """Per-user AdvancedPersonalAI instances behind a bounded LRU"""
+
+    def __init__(self, root_dir, client, config, max_active=256, idle_seconds=900,
+                 summary_workers=2, upstream_limiter=None, usage_hook=None):
+        self.root_dir = root_dir
+        self.client = client
+        self.config = config
+        self.max_active = max(1, max_active)
+        self.idle_seconds = idle_seconds
+        self.upstream_limiter = upstream_limiter
+        # usage_hook(model, prompt_tokens, completion_tokens, conversation_id) for background summaries
+        self.usage_hook = usage_hook
+        self._tenants = OrderedDict()  # user_id -> _Tenant, least recently used first
+        self._closing = {}  # user_id -> _Tenant being closed
+        self._lock = threading.Lock()
+        # One summarizer pool for everyone instead of a thread per assistant
+        self._summary_executor = ThreadPoolExecutor(max_workers=summary_workers,
+                                                    thread_name_prefix="personal-ai-summarizer")
+        self._closer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="personal-ai-closer")
+        # And one write-behind thread for every user's memory files
+        self._persister = WriteBehindPersister(config.get("advanced_features", {}).get("save_interval_seconds", 2.0))
+        self.loads = 0
+        self.evictions = 0
+
+    @staticmethod
+    def valid_user_id(user_id):
+        return isinstance(user_id, str) and USER_ID_PATTERN.match(user_id) is not None
+
+    def user_dir(self, user_id):
+        return os.path.join(self.root_dir, user_id)
+
+    def chat(self, user_id, message):
+        """Reply to message as user_id's assistant; returns (reply, StreamResult)"""
+        def respond(assistant):
+            with self.upstream_limiter or nullcontext():
+                reply = assistant.generate_response(message, out=io.StringIO())
+            return reply, assistant.last_reply_stats
+        return self._with_assistant(user_id, respond)
+
+    def clear_conversation(self, user_id):
+        """Forget the current conversation; the user's memory is kept"""
+        self._with_assistant(user_id, lambda assistant: assistant.conversation_history.clear())
+
+    def _with_assistant(self, user_id, fn):
+        """Run fn(assistant) while holding the user's slot, loading it if needed"""
+        if not self.valid_user_id(user_id):
+            raise ValueError("user_id must be 1-64 letters, digits, '-' or '_'")
+
+        while True:
+            tenant = self._checkout(user_id)
+            with tenant.lock:
+                if tenant.closed:
+                    continue  # Evicted between checkout and lock; load a fresh slot
+                if tenant.assistant is None:
+                    self._load(tenant)
+                return fn(tenant.assistant)
+
+    def _checkout(self, user_id):
+        """Find or create the user's slot and mark it most recently used"""
+        now = time.monotonic()
+        with self._lock:
+            tenant = self._tenants.pop(user_id, None)
+            if tenant is None:
+                tenant = _Tenant(user_id, self._closing.get(user_id))
+            tenant.last_used = now
+            self._tenants[user_id] = tenant
+            victims = self._evict(now)
+
+        for victim in victims:
+            self._closer.submit(self._close, victim)
+        return tenant
+
+    def _evict(self, now):
+        """Take idle slots and those beyond max_active out of the cache"""
+        victims = []
+        # Slots are ordered by last use, so idle ones collect at the front
+        while self._tenants:
+            user_id, oldest = next(iter(self._tenants.items()))
+            if len(self._tenants) <= self.max_active and oldest.last_used >= now - self.idle_seconds:
+                break
+            del self._tenants[user_id]
+            self._closing[user_id] = oldest
+            victims.append(oldest)
+        return victims
+
+    def _wait_for_previous(self, tenant):
+        """Wait until the previous copy of this user's memory is on disk
+
+        Its close may still be queued on the closer, so its lock being free says nothing.
+        """
+        if tenant.previous is not None:
+            tenant.previous.saved.wait()
+            tenant.previous = None
+
+    def _load(self, tenant):
+        self._wait_for_previous(tenant)
+
+        directory = self.user_dir(tenant.user_id)
+        os.makedirs(directory, exist_ok=True)
+        tenant.assistant = AdvancedPersonalAI(
+            data_dir=directory,
+            client=self.client,
+            config=self.config,
+            summary_executor=self._summary_executor,
+            persister=self._persister,
+            upstream_limiter=self.upstream_limiter,
+            usage_hook=self._usage_hook(tenant.user_id)
+        )
+        with self._lock:
+            self.loads += 1
+
+    def _usage_hook(self, user_id):
+        """Report an assistant's summary usage against the user, like their chat replies"""
+        if self.usage_hook is None:
+            return None
+        return lambda model, prompt_tokens, completion_tokens: self.usage_hook(
+            model, prompt_tokens, completion_tokens, f"user:{user_id}")
+
+    def _close(self, tenant):
+        """Save a slot's memory and release it (waits for a reply in progress)"""
+        with tenant.lock:
+            try:
+                # A slot evicted before loading is only saved once the copy before it is
+                self._wait_for_previous(tenant)
+                if tenant.assistant is not None:
+                    tenant.assistant.close()
+            except Exception as e:
+                print(f"Warning: Could not save memory for {tenant.user_id}: {e}")
+            finally:
+                tenant.assistant = None
+                tenant.closed = True
+                tenant.saved.set()
+
+        with self._lock:
+            if self._closing.get(tenant.user_id) is tenant:
+                del self._closing[tenant.user_id]
+            self.evictions += 1
+
+    def close(self):
+        """Save every loaded assistant and stop the worker threads"""
+        with self._lock:
+            tenants = list(self._tenants.values())
+            self._tenants.clear()
+        self._closer.shutdown(wait=True)
+        for tenant in tenants:
+            self._close(tenant)
+        self._summary_executor.shutdown(wait=True)
+        self._persister.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": len(self._tenants),
+                "closing": len(self._closing),
+                "max_active": self.max_active,
+                "idle_seconds": self.idle_seconds,
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,157 @@
+"""
+Rate limiting for the Tara web API
+Token buckets per key (client IP, conversation) cap how fast any one caller
+can send messages, and a global limiter bounds how many upstream calls run
+at once, so one busy client cannot use up the OpenAI quota for everyone.
+"""
+
+import math
+import time
+import threading
+from collections import OrderedDict
+
+class RateLimited(Exception):
+    """A request was refused; retry_after is the suggested wait in seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self):
+        return str(max(1, math.ceil(self.retry_after)))
+
+class TokenBucketLimiter:
+    """One token bucket per key, refilled at rate_per_minute up to burst"""
+
+    def __init__(self, rate_per_minute=30, burst=10, max_keys=100000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.rate > 0 and self.burst > 0
+
+    def acquire(self, key, cost=1):
+        """Take cost tokens from key's bucket; returns 0 or the seconds until they are available"""
+        if not self.enabled:
+            return 0.0
+
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / self.rate
+
+            # Most recently used last; keys idle long enough are full again and safe to drop
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def refund(self, key, cost=1):
+        """Give back tokens taken for a request that was refused anyway"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated_at = self._buckets[key]
+                self._buckets[key] = (min(self.burst, tokens + cost), updated_at)
+
+    def check(self, key, what="requests"):
+        """Take one token or raise RateLimited"""
+        wait = self.acquire(key)
+        if wait:
+            raise RateLimited(f"Too many {what}, please slow down", wait)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buckets)
+
+def check_limits(*limits):
+    """Take one token from every (limiter, key, what), or from none of them
+
+    A request refused by a later limiter does not use up the earlier ones,
+    e.g. a conversation's limit does not spend the client address's budget.
+    """
+    taken = []
+    try:
+        for limiter, key, what in limits:
+            limiter.check(key, what)
+            taken.append((limiter, key))
+    except RateLimited:
+        for limiter, key in taken:
+            limiter.refund(key)
+        raise
+
+class ConcurrencyLimiter:
+    """Bounds concurrent upstream calls; callers wait up to queue_timeout for a slot"""
+
+    def __init__(self, max_concurrent=32, queue_timeout=10.0):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent > 0 else None
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def acquire(self):
+        """Take a slot or raise RateLimited after queue_timeout seconds"""
+        if self._slots is None:
+            return
+        with self._lock:
+            self.waiting += 1
+        acquired = False
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+                if acquired:
+                    self.active += 1
+                else:
+                    self.rejected += 1
+        if not acquired:
+            raise RateLimited("The AI service is busy, please try again shortly", self.queue_timeout)
+
+    def try_acquire(self):
+        """Take a slot if one is free right now; returns whether it did"""
+        if self._slots is None:
+            return True
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self.active += 1
+        return True
+
+    def release(self):
+        if self._slots is None:
+            return
+        with self._lock:
+            self.active -= 1
+        self._slots.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "active": self.active,
+                "waiting": self.waiting,
+                "rejected": self.rejected
+            }
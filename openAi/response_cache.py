@@ -0,0 +1,122 @@
+"""
+Response cache in front of chat completions
+Answers repeated questions ("who is your founder?") without an upstream
+call: an exact tier keyed on the normalized prompt and model, plus an
+optional similarity tier using local hashed embeddings.
+"""
+
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+from text_embedding import embed, cosine_similarity
+
+# Characters outside ordinary prose punctuation, such as + * # =; the
+# embeddings ignore them, so similar prompts must use exactly the same ones
+SYMBOL_PATTERN = re.compile(r"[^\w\s'\",.?!:;]")
+
+def normalize_prompt(text):
+    """Normalize case, whitespace and closing punctuation so trivial variants share a key
+
+    Other punctuation is kept: "2+2" and "2*2" are different questions.
+    """
+    return " ".join(text.lower().split()).rstrip("?!. ")
+
+class ResponseCache:
+    """Size-bounded, time-limited cache of model responses"""
+
+    def __init__(self, max_entries=1000, ttl_seconds=3600, similarity_threshold=0.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold  # 0 disables the similarity tier
+        self._entries = OrderedDict()  # (model, normalized prompt) -> (expires_at, response, embedding)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, prompt, model):
+        """Return a cached response for prompt, or None"""
+        if not self.enabled:
+            return None
+
+        key = (model, normalize_prompt(prompt))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] >= now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if self.similarity_threshold:
+                response = self._find_similar(key, now)
+                if response is not None:
+                    self.similar_hits += 1
+                    return response
+
+            self.misses += 1
+            return None
+
+    def _find_similar(self, key, now):
+        """Scan unexpired entries of the same model for the closest prompt"""
+        query = embed(key[1])
+        symbols = SYMBOL_PATTERN.findall(key[1])
+        best_score, best_key = self.similarity_threshold, None
+        for entry_key, (expires_at, _, vector) in self._entries.items():
+            if entry_key[0] != key[0] or expires_at < now:
+                continue
+            if SYMBOL_PATTERN.findall(entry_key[1]) != symbols:
+                continue
+            score = cosine_similarity(query, vector)
+            if score >= best_score:
+                best_score, best_key = score, entry_key
+
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key][1]
+
+    def set(self, prompt, model, response):
+        """Cache a response"""
+        if not self.enabled:
+            return
+
+        key = (model, normalize_prompt(prompt))
+        vector = embed(key[1]) if self.similarity_threshold else None
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, response, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit and miss counts for /api/status"""
+        with self._lock:
+            lookups = self.hits + self.similar_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.similar_hits) / lookups, 3) if lookups else 0.0
+            }
+
+def create_response_cache():
+    """Create the response cache configured by environment variables"""
+    return ResponseCache(
+        max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', 1000)),
+        ttl_seconds=int(os.getenv('RESPONSE_CACHE_TTL', 3600)),
+        similarity_threshold=float(os.getenv('RESPONSE_CACHE_SIMILARITY', 0))
+    )
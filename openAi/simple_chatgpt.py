@@ -1,8 +1,10 @@
 import os
 import tkinter as tk
 from tkinter import scrolledtext, messagebox, simpledialog
-import threading
-from openai import OpenAI
+from openai_client import create_client
+from context_window import ContextWindow
+from gui_worker import ChatWorker, POLL_INTERVAL_MS
+from transcript_view import TranscriptView
 
 class SimpleChatGPT:
     def __init__(self):
@@ -19,8 +21,16 @@ class SimpleChatGPT:
             return
             
         # Initialize OpenAI client
-        self.client = OpenAI(api_key=self.api_key)
-        self.conversation_history = []
+        self.client = create_client(api_key=self.api_key)
+        
+        # Conversation history, only touched on the Tk main thread
+        self.conversation_history = ContextWindow()
+        self.pending_message = None
+        self.request_id = None  # Worker id of the reply being streamed
+        self.polling = False
+        
+        # One worker thread streams every reply
+        self.worker = ChatWorker(self.client)
         
         # Setup GUI
         self.setup_gui()
@@ -69,6 +79,9 @@ class SimpleChatGPT:
         )
         self.chat_display.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
         
+        # Keep the last messages on screen, older ones in an on-disk log
+        self.transcript = TranscriptView(self.chat_display, show_time=False)
+        
         # Input frame
         input_frame = tk.Frame(self.root, bg="#f0f0f0")
         input_frame.pack(padx=20, pady=10, fill=tk.X)
@@ -92,6 +105,16 @@ class SimpleChatGPT:
         )
         self.send_button.pack(side=tk.RIGHT)
         
+        # Stop button, enabled while a reply is streaming
+        self.cancel_button = tk.Button(
+            input_frame,
+            text="Stop",
+            font=("Arial", 12),
+            state=tk.DISABLED,
+            command=self.cancel_response
+        )
+        self.cancel_button.pack(side=tk.RIGHT, padx=(0, 10))
+        
         # Clear button
         clear_button = tk.Button(
             self.root,
@@ -108,16 +131,19 @@ class SimpleChatGPT:
         
     def add_message(self, sender, message):
         """Add a message to the chat display"""
-        self.chat_display.configure(state=tk.NORMAL)
-        self.chat_display.insert(tk.END, f"\n{sender}:\n{message}\n")
-        self.chat_display.configure(state=tk.DISABLED)
-        self.chat_display.see(tk.END)
+        self.transcript.begin_message(sender)
+        self.append_text(f"{message}\n")
+        
+    def append_text(self, text):
+        """Append text to the message being displayed"""
+        self.transcript.append_text(text)
         
     def send_message(self, event=None):
         """Send message to ChatGPT"""
         message = self.message_entry.get().strip()
         
-        if not message:
+        # One reply at a time; <Return> still fires while the Send button is disabled
+        if not message or self.pending_message is not None:
             return
             
         # Clear input
@@ -128,61 +154,97 @@ class SimpleChatGPT:
         
         # Disable send button
         self.send_button.config(state=tk.DISABLED, text="Sending...")
+        self.cancel_button.config(state=tk.NORMAL)
         
-        # Get AI response in background
-        threading.Thread(target=self.get_ai_response, args=(message,), daemon=True).start()
+        self.get_ai_response(message)
         
     def get_ai_response(self, user_message):
-        """Get response from OpenAI API"""
-        try:
-            # Add to conversation history
-            self.conversation_history.append({"role": "user", "content": user_message})
-            
-            # Create messages for API
-            messages = [
-                {"role": "system", "content": "You are a helpful AI assistant."}
-            ] + self.conversation_history
-            
-            # Make API call
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=1000,
-                temperature=0.7
-            )
-            
-            # Get response
-            ai_response = response.choices[0].message.content
-            
-            # Add to history
-            self.conversation_history.append({"role": "assistant", "content": ai_response})
-            
-            # Keep history manageable
-            if len(self.conversation_history) > 10:
-                self.conversation_history = self.conversation_history[-10:]
-            
-            # Update GUI
-            self.root.after(0, lambda: self.display_ai_response(ai_response))
+        """Start streaming a response from OpenAI API on the worker thread"""
+        # Add to conversation history
+        self.pending_message = {"role": "user", "content": user_message}
+        self.conversation_history.append(self.pending_message)
+        self.conversation_history.trim()
+        
+        # Create messages for API; the worker gets its own copy
+        messages = [
+            {"role": "system", "content": "You are a helpful AI assistant."}
+        ] + list(self.conversation_history.messages)
+        
+        self.transcript.begin_message("🤖 Assistant")
+        self.request_id = self.worker.submit(
+            model="gpt-4o-mini",
+            messages=messages,
+            max_tokens=1000,
+            temperature=0.7
+        )
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_INTERVAL_MS, self.poll_response)
+        
+    def poll_response(self):
+        """Move streamed text into the display, one insert per poll"""
+        text = []
+        finished = None
+        for event in self.worker.drain():
+            if event[1] != self.request_id:
+                continue  # Left over from a reply that was cleared away
+            if event[0] == "delta":
+                text.append(event[2])
+            else:
+                finished = event
+        
+        if text:
+            self.append_text("".join(text))
+        
+        if finished:
+            self.display_ai_response(finished)
+        
+        if self.pending_message is not None:
+            self.root.after(POLL_INTERVAL_MS, self.poll_response)
+        else:
+            self.polling = False
             
-        except Exception as e:
-            error_msg = f"Error: {str(e)}"
-            self.root.after(0, lambda: self.display_ai_response(error_msg, is_error=True))
+    def display_ai_response(self, event):
+        """Finish the streamed reply and update the conversation history"""
+        user_message, self.pending_message = self.pending_message, None
+        self.request_id = None
+        
+        if event[0] == "error":
+            self.append_text("\n")
+            self.add_message("❌ Error", f"Error: {event[2]}")
+            self.conversation_history.discard_last(user_message)
+        else:
+            ai_response, cancelled = event[2], event[3]
+            self.append_text(" ⏹️ [stopped]\n" if cancelled else "\n")
             
-    def display_ai_response(self, response, is_error=False):
-        """Display AI response in GUI"""
-        sender = "❌ Error" if is_error else "🤖 Assistant"
-        self.add_message(sender, response)
+            # Keep only what was actually produced
+            if ai_response:
+                self.conversation_history.append({"role": "assistant", "content": ai_response})
+                self.conversation_history.trim()
+            else:
+                self.conversation_history.discard_last(user_message)
         
         # Re-enable send button
         self.send_button.config(state=tk.NORMAL, text="Send")
+        self.cancel_button.config(state=tk.DISABLED)
         self.message_entry.focus()
         
+    def cancel_response(self):
+        """Stop the reply being generated"""
+        self.worker.cancel(self.request_id)
+        
     def clear_chat(self):
         """Clear the chat"""
-        self.chat_display.configure(state=tk.NORMAL)
-        self.chat_display.delete(1.0, tk.END)
-        self.chat_display.configure(state=tk.DISABLED)
-        self.conversation_history = []
+        if self.pending_message is not None:
+            # Drop the reply in progress along with everything else; its late events are ignored
+            self.worker.cancel(self.request_id)
+            self.pending_message = None
+            self.request_id = None
+            self.send_button.config(state=tk.NORMAL, text="Send")
+            self.cancel_button.config(state=tk.DISABLED)
+        
+        self.transcript.clear()
+        self.conversation_history.clear()
         self.add_message("🤖 Assistant", "Chat cleared! How can I help you?")
         
     def run(self):
@@ -190,6 +252,8 @@ class SimpleChatGPT:
         if hasattr(self, 'client'):  # Only run if we have a valid client
             self.message_entry.focus()
             self.root.mainloop()
+            self.worker.close()
+            self.transcript.close()
 
 def main():
     """Main function"""
@@ -0,0 +1,58 @@
+"""
+Request coalescing for identical in-flight upstream calls
+When several threads ask for the same key at once, only the first one
+runs the call; the others wait for it and receive the same result.
+"""
+
+import threading
+
+class _Call:
+    """An in-flight call and its outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Share one call among concurrent callers with the same key"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Run fn once per key at a time; returns (result, shared)
+
+        shared is True for callers that received another caller's result.
+        Errors are raised in every waiting caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def in_flight(self):
+        """Number of calls currently running"""
+        with self._lock:
+            return len(self._calls)
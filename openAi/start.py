@@ -1,9 +1,9 @@
 import os
-from openai import OpenAI
+from openai_client import create_client
 
 # Initialize the OpenAI client
 # You'll need to set your API key as an environment variable or replace with your actual key
-client = OpenAI(
+client = create_client(
     api_key=os.getenv("OPENAI_API_KEY")  # Make sure to set this environment variable
 )
 
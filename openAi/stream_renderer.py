@@ -0,0 +1,77 @@
+"""
+Streaming replies for the command-line front ends
+Prints a chat completion to the terminal as its tokens arrive. Ctrl-C
+stops the generation (the upstream request is closed) without ending the
+chat session, and each reply records its time to first token and
+tokens per second.
+"""
+
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from context_window import count_tokens
+
+@dataclass
+class StreamResult:
+    """The text a streamed reply produced, and how fast it arrived"""
+    text: str = ""
+    cancelled: bool = False
+    time_to_first_token: Optional[float] = None  # seconds from request to first text
+    duration: float = 0.0  # seconds from request to end of stream
+    completion_tokens: int = 0
+    prompt_tokens: int = 0  # from the usage chunk; 0 when the stream was cancelled
+
+    @property
+    def tokens_per_second(self):
+        generating = self.duration - (self.time_to_first_token or 0.0)
+        return self.completion_tokens / generating if generating > 0 else 0.0
+
+    def stats(self):
+        return (f"first token {self.time_to_first_token:.2f}s · {self.completion_tokens} tokens · "
+                f"{self.tokens_per_second:.1f} tokens/s")
+
+def stream_chat(client, out=None, show_stats=True, **request):
+    """Stream a chat completion to out (stdout by default) and return a StreamResult
+
+    request holds the chat.completions.create arguments (model, messages, ...).
+    """
+    out = out or sys.stdout
+    result = StreamResult()
+    parts = []
+    stream = None
+    started = time.perf_counter()
+
+    try:
+        stream = client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **request)
+        for chunk in stream:
+            if chunk.usage:
+                result.completion_tokens = chunk.usage.completion_tokens
+                result.prompt_tokens = chunk.usage.prompt_tokens
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if result.time_to_first_token is None:
+                    result.time_to_first_token = time.perf_counter() - started
+                parts.append(delta)
+                out.write(delta)
+                out.flush()
+    except KeyboardInterrupt:
+        result.cancelled = True
+        if stream is not None:
+            stream.close()  # Stop paying for tokens nobody will read
+        out.write(" ⏹️  [stopped]")
+
+    result.duration = time.perf_counter() - started
+    result.text = "".join(parts)
+    if result.text and not result.completion_tokens:
+        # Cancelled streams never reach the usage chunk
+        result.completion_tokens = count_tokens(result.text)
+
+    out.write("\n")
+    if show_stats and result.time_to_first_token is not None:
+        out.write(f"   ⏱️  {result.stats()}\n")
+    out.flush()
+    return result
@@ -0,0 +1,102 @@
+"""
+Conversation summarization off the response path
+Evicted conversation turns are handed to a worker pool; finished summaries
+are collected by the caller on its own thread, so the reply never waits on
+summarization. Includes a local extractive summarizer for when no model
+is available.
+"""
+
+import re
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from text_embedding import tokenize
+
+STOPWORDS = {
+    "about", "after", "again", "also", "because", "been", "before", "being", "could", "does",
+    "doing", "from", "have", "here", "into", "just", "like", "more", "most", "much", "only",
+    "other", "really", "should", "some", "such", "than", "that", "their", "them", "then",
+    "there", "these", "they", "this", "those", "very", "want", "what", "when", "where",
+    "which", "while", "will", "with", "would", "your", "you're", "i'm", "it's"
+}
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def extractive_summary(messages, max_sentences=3, max_sentence_chars=200):
+    """Pick the sentences whose words recur most across the conversation"""
+    sentences = []
+    for message in messages:
+        for sentence in SENTENCE_SPLIT.split(message["content"]):
+            sentence = sentence.strip()
+            if sentence:
+                sentences.append((message["role"], sentence))
+
+    def keywords(text):
+        return [word for word in tokenize(text) if len(word) > 3 and word not in STOPWORDS]
+
+    frequency = Counter(word for _, sentence in sentences for word in keywords(sentence))
+
+    def score(item):
+        words = set(keywords(item[1][1]))
+        # Favor what the user said; the assistant mostly elaborates
+        weight = 1.5 if item[1][0] == "user" else 1.0
+        return weight * sum(frequency[word] for word in words) / (len(words) ** 0.5 if words else 1)
+
+    best = sorted(sorted(enumerate(sentences), key=score, reverse=True)[:max_sentences])
+    return " ".join(sentence[:max_sentence_chars] for _, (_, sentence) in best)
+
+class BackgroundSummarizer:
+    """Runs summarize(messages) on a worker pool and queues the results
+
+    Pass executor to share one pool between many summarizers; it is then
+    left running on close.
+    """
+
+    def __init__(self, summarize, max_workers=1, executor=None):
+        self.summarize = summarize
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarizer")
+        self._results = queue.Queue()
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+
+    def submit(self, messages):
+        """Summarize messages in the background"""
+        future = self._executor.submit(self._run, list(messages))
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._finished)
+
+    def _finished(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    def _run(self, messages):
+        try:
+            summary = self.summarize(messages)
+        except Exception as e:
+            print(f"\nWarning: Could not summarize conversation: {e}")
+            return
+        if summary:
+            self._results.put(summary)
+
+    def drain(self):
+        """Summaries finished so far, without waiting"""
+        summaries = []
+        while True:
+            try:
+                summaries.append(self._results.get_nowait())
+            except queue.Empty:
+                return summaries
+
+    def close(self):
+        """Wait for queued work and return the remaining summaries"""
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+        else:
+            with self._pending_lock:
+                pending = list(self._pending)
+            wait(pending)
+        return self.drain()
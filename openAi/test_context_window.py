@@ -0,0 +1,52 @@
+"""
+Tests for token trimming in context_window.py
+Run with: python -m pytest test_context_window.py
+"""
+
+from context_window import ContextWindow, TRUNCATION_NOTE
+
+def message(role, words):
+    return {"role": role, "content": " ".join(["word"] * words)}
+
+def test_trim_evicts_oldest_with_its_reply():
+    window = ContextWindow(token_budget=120)
+    for _ in range(3):
+        window.append(message("user", 20))
+        window.append(message("assistant", 20))
+    window.append(message("user", 20))
+    removed = window.trim()
+
+    assert window.total_tokens <= 120
+    assert window.messages[0]["role"] == "user"
+    assert len(removed) + len(window) == 7
+    assert window.total_tokens == sum(window.token_counts)
+
+def test_reserved_tokens_count_against_budget():
+    window = ContextWindow(token_budget=120, reserved_tokens=60)
+    for _ in range(3):
+        window.append(message("user", 20))
+    window.trim()
+    assert window.total_tokens <= 60
+
+def test_oversized_newest_message_is_truncated():
+    window = ContextWindow(token_budget=100, reserved_tokens=20)
+    window.append(message("user", 20))
+    paste = message("user", 5000)
+    window.append(paste)
+    window.trim()
+
+    assert window.messages == [paste]
+    assert paste["content"].endswith(TRUNCATION_NOTE)
+    assert window.total_tokens <= 80
+    assert window.total_tokens == sum(window.token_counts)
+
+def test_discard_last_and_round_trip():
+    window = ContextWindow(token_budget=1000)
+    question = message("user", 5)
+    window.append(message("user", 3))
+    window.append(question)
+    window.discard_last(question)
+    assert len(window) == 1
+
+    copy = ContextWindow.from_dict(window.to_dict(), token_budget=1000)
+    assert copy.messages == window.messages and copy.total_tokens == window.total_tokens
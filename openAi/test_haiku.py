@@ -1,5 +1,6 @@
 import os
-from openai import OpenAI
+from openai_client import create_client
+from usage_ledger import estimate_cost
 
 def test_haiku():
     """Test the exact same request as your curl command"""
@@ -18,7 +19,7 @@ def test_haiku():
     print("=" * 50)
     
     try:
-        client = OpenAI(api_key=api_key)
+        client = create_client(api_key=api_key)
         
         response = client.chat.completions.create(
             model="gpt-4o-mini",
@@ -42,9 +43,7 @@ def test_haiku():
         print(f"Total tokens: {usage.total_tokens}")
         
         # Estimate cost (rough)
-        input_cost = (usage.prompt_tokens / 1_000_000) * 0.15
-        output_cost = (usage.completion_tokens / 1_000_000) * 0.60
-        total_cost = input_cost + output_cost
+        total_cost = estimate_cost("gpt-4o-mini", usage.prompt_tokens, usage.completion_tokens)
         print(f"Estimated cost: ${total_cost:.6f}")
         
     except Exception as e:
@@ -0,0 +1,94 @@
+"""
+Tests for journal replay and compaction in memory_journal.py
+Run with: python -m pytest test_memory_journal.py
+"""
+
+import json
+import threading
+
+import memory_journal
+from memory_journal import MemoryJournal, SEQ_KEY
+from persistence import WriteBehindPersister
+
+DEFAULT = {"facts": [], "topics": {}}
+
+def test_replay_restores_every_operation(tmp_path):
+    path = str(tmp_path / "memory.json")
+    journal = MemoryJournal(path, DEFAULT)
+    for i in range(5):
+        journal.append("facts", i, limit=3)
+    journal.set("topics", "python", 1)
+    journal.incr("topics", "python", 2)
+    journal._file.close()  # Crash: no compaction on close
+
+    reopened = MemoryJournal(path, DEFAULT)
+    assert reopened.data["facts"] == [2, 3, 4]
+    assert reopened.data["topics"] == {"python": 3}
+    reopened.close()
+
+def test_torn_last_line_is_skipped(tmp_path):
+    path = str(tmp_path / "memory.json")
+    journal = MemoryJournal(path, DEFAULT)
+    journal.append("facts", "kept")
+    journal._file.close()
+    with open(path + ".journal", "a") as f:
+        f.write('{"op": "append", "cat')
+
+    assert MemoryJournal(path, DEFAULT).data["facts"] == ["kept"]
+
+def test_compaction_writes_snapshot_and_empties_journal(tmp_path):
+    path = str(tmp_path / "memory.json")
+    journal = MemoryJournal(path, DEFAULT, compact_every=3)
+    for i in range(4):
+        journal.append("facts", i)
+
+    with open(path) as f:
+        snapshot = json.load(f)
+    assert snapshot["facts"] == [0, 1, 2] and snapshot[SEQ_KEY] == 3
+    with open(path + ".journal") as f:
+        assert [json.loads(line)["value"] for line in f] == [3]
+    journal._file.close()
+
+    # Entries already in the snapshot are not applied twice
+    with open(path + ".journal", "w") as f:
+        f.write(json.dumps({"op": "append", "category": "facts", "value": 2, "seq": 3}) + "\n")
+        f.write(json.dumps({"op": "append", "category": "facts", "value": 3, "seq": 4}) + "\n")
+    assert MemoryJournal(path, DEFAULT).data["facts"] == [0, 1, 2, 3]
+
+def test_reset_and_close_round_trip(tmp_path):
+    path = str(tmp_path / "memory.json")
+    journal = MemoryJournal(path, DEFAULT)
+    journal.append("facts", "old")
+    journal.reset()
+    journal.append("facts", "new")
+    journal.close()
+    assert MemoryJournal(path, DEFAULT).data == {"facts": ["new"], "topics": {}}
+
+def test_records_are_not_blocked_by_snapshot_write(tmp_path, monkeypatch):
+    path = str(tmp_path / "memory.json")
+    writing, finish = threading.Event(), threading.Event()
+    real_write = memory_journal.atomic_write_json
+
+    def slow_write(*args, **kwargs):
+        writing.set()
+        finish.wait(5)
+        real_write(*args, **kwargs)
+
+    monkeypatch.setattr(memory_journal, "atomic_write_json", slow_write)
+    persister = WriteBehindPersister(flush_interval=3600)
+    journal = MemoryJournal(path, DEFAULT, persister=persister)
+    journal.append("facts", "before")
+    compaction = threading.Thread(target=journal.compact)
+    compaction.start()
+    assert writing.wait(5)
+
+    recorded = threading.Thread(target=journal.append, args=("facts", "during"))
+    recorded.start()
+    recorded.join(timeout=1)
+    assert not recorded.is_alive(), "recording waited for the snapshot write"
+
+    finish.set()
+    compaction.join()
+    journal.close()
+    persister.close()
+    assert MemoryJournal(path, DEFAULT).data["facts"] == ["before", "during"]
@@ -0,0 +1,56 @@
+"""
+Tests for tenant eviction and reload in personal_ai_service.py
+Run with: python -m pytest test_personal_ai_service.py
+"""
+
+import copy
+import json
+import os
+import threading
+
+from personal_ai_service import PersonalAIService
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ai_config.json")
+
+def make_service(root_dir, **kwargs):
+    with open(CONFIG_FILE) as f:
+        config = json.load(f)
+    config = copy.deepcopy(config)
+    # Keep memory changes buffered, so only closing writes them
+    config["advanced_features"]["save_interval_seconds"] = 3600
+    return PersonalAIService(str(root_dir), client=object(), config=config, **kwargs)
+
+def facts(assistant):
+    return [item["content"] for item in assistant.memory_store.recent("personal_facts", 10)]
+
+def test_evicted_user_reloads_with_saved_memory(tmp_path):
+    service = make_service(tmp_path, max_active=1)
+    service._with_assistant("alice", lambda ai: ai.add_to_memory("personal_facts", "likes tea"))
+    service._with_assistant("bob", lambda ai: None)  # Evicts alice
+    assert service._with_assistant("alice", facts) == ["likes tea"]
+    service.close()
+
+def test_reload_waits_for_queued_close(tmp_path):
+    service = make_service(tmp_path, max_active=1)
+    release = threading.Event()
+    service._closer.submit(release.wait)  # Hold up the closer so alice's close stays queued
+
+    service._with_assistant("alice", lambda ai: ai.add_to_memory("personal_facts", "likes tea"))
+    service._with_assistant("bob", lambda ai: None)  # Queues alice's close behind the blocker
+
+    result = []
+    reload = threading.Thread(target=lambda: result.append(service._with_assistant("alice", facts)))
+    try:
+        reload.start()
+        reload.join(timeout=0.3)
+        assert reload.is_alive(), "alice was reloaded before her previous copy was saved"
+    finally:
+        release.set()
+    reload.join(timeout=10)
+    assert result == [["likes tea"]]
+
+    service._with_assistant("alice", lambda ai: ai.add_to_memory("personal_facts", "likes chess"))
+    service.close()
+    reopened = make_service(tmp_path)
+    assert reopened._with_assistant("alice", facts) == ["likes tea", "likes chess"]
+    reopened.close()
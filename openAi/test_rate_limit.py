@@ -0,0 +1,30 @@
+"""
+Tests for the token buckets in rate_limit.py
+Run with: python -m pytest test_rate_limit.py
+"""
+
+import pytest
+
+from rate_limit import RateLimited, TokenBucketLimiter, check_limits
+
+def test_bucket_allows_burst_then_refuses():
+    limiter = TokenBucketLimiter(rate_per_minute=1, burst=2)
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(RateLimited) as refused:
+        limiter.check("a")
+    assert refused.value.retry_after > 0
+    limiter.check("b")  # Other keys have their own bucket
+
+def test_refusal_by_conversation_does_not_spend_address_budget():
+    ip_limiter = TokenBucketLimiter(rate_per_minute=1, burst=2)
+    conversation_limiter = TokenBucketLimiter(rate_per_minute=1, burst=1)
+    limits = [(ip_limiter, "1.2.3.4", "messages"), (conversation_limiter, "c1", "messages")]
+
+    check_limits(*limits)
+    for _ in range(3):
+        with pytest.raises(RateLimited):
+            check_limits(*limits)
+
+    # The address still has the token the refused requests took and gave back
+    check_limits((ip_limiter, "1.2.3.4", "messages"), (conversation_limiter, "c2", "messages"))
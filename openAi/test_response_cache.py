@@ -0,0 +1,40 @@
+"""
+Tests for the exact and similarity tiers in response_cache.py
+Run with: python -m pytest test_response_cache.py
+"""
+
+import pytest
+
+from response_cache import ResponseCache, normalize_prompt
+
+def test_normalize_keeps_operators():
+    assert normalize_prompt("  What IS   your name?? ") == "what is your name"
+    assert normalize_prompt("What is 2+2?") != normalize_prompt("What is 2*2?")
+    assert normalize_prompt("what is c++") != normalize_prompt("what is c#")
+
+@pytest.mark.parametrize("similarity_threshold", [0.0, 0.8])
+def test_operator_only_differences_miss(similarity_threshold):
+    cache = ResponseCache(similarity_threshold=similarity_threshold)
+    cache.set("What is 2+2?", "gpt-4o-mini", "4")
+    cache.set("what is c++", "gpt-4o-mini", "A programming language")
+    assert cache.get("What is 2*2?", "gpt-4o-mini") is None
+    assert cache.get("what is c#", "gpt-4o-mini") is None
+    assert cache.get("what is 2+2", "gpt-4o-mini") == "4"
+
+def test_similar_prompt_hits_similarity_tier():
+    cache = ResponseCache(similarity_threshold=0.7)
+    cache.set("Who is your founder?", "gpt-4o-mini", "Aman Verma")
+    assert cache.get("who is your founder please", "gpt-4o-mini") == "Aman Verma"
+    assert cache.get("who is your founder please", "gpt-4o") is None
+    assert cache.stats()["similar_hits"] == 1
+
+def test_expired_and_evicted_entries_miss():
+    cache = ResponseCache(max_entries=1, ttl_seconds=-1)
+    cache.set("hello", "gpt-4o-mini", "hi")
+    assert cache.get("hello", "gpt-4o-mini") is None
+
+    cache = ResponseCache(max_entries=1)
+    cache.set("hello", "gpt-4o-mini", "hi")
+    cache.set("bye", "gpt-4o-mini", "see you")
+    assert cache.get("hello", "gpt-4o-mini") is None
+    assert cache.get("bye", "gpt-4o-mini") == "see you"
@@ -0,0 +1,112 @@
+"""
+Tests for the circuit breaker and fallback chain in upstream.py
+Run with: python -m pytest test_upstream.py
+"""
+
+import time
+import threading
+
+import httpx
+import openai
+import pytest
+
+from rate_limit import ConcurrencyLimiter
+from upstream import ResilientUpstream, UpstreamUnavailable
+
+def status_error(cls, code):
+    request = httpx.Request("POST", "http://upstream.test/v1/chat/completions")
+    return cls(f"Error code: {code}", response=httpx.Response(code, request=request), body=None)
+
+class FakeClient:
+    """Stands in for an OpenAI client; each call pops the next outcome"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, **request):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+def test_breaker_opens_and_fails_fast():
+    client = FakeClient([status_error(openai.InternalServerError, 500)] * 2)
+    upstream = ResilientUpstream(hedge=False, failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        with pytest.raises(UpstreamUnavailable):
+            upstream.call(client, "gpt-4o-mini", messages=[])
+    with pytest.raises(UpstreamUnavailable):
+        upstream.call(client, "gpt-4o-mini", messages=[])
+    assert client.calls == 2
+    assert upstream.breaker("gpt-4o-mini").state == "open"
+
+def test_bad_request_on_half_open_trial_closes_breaker():
+    client = FakeClient([status_error(openai.InternalServerError, 500),
+                         status_error(openai.BadRequestError, 400)])
+    upstream = ResilientUpstream(hedge=False, failure_threshold=1, reset_timeout=0.05)
+    with pytest.raises(UpstreamUnavailable):
+        upstream.call(client, "gpt-4o-mini", messages=[])
+    time.sleep(0.06)
+    assert upstream.breaker("gpt-4o-mini").state == "half_open"
+
+    # The trial call gets a 400: the request was bad, the upstream is fine
+    with pytest.raises(openai.BadRequestError):
+        upstream.call(client, "gpt-4o-mini", messages=[])
+    assert upstream.breaker("gpt-4o-mini").state == "closed"
+    assert upstream.call(client, "gpt-4o-mini", messages=[]) == ("ok", "gpt-4o-mini")
+
+def test_fallback_answers_while_primary_is_open():
+    primary = FakeClient([status_error(openai.InternalServerError, 500)])
+    errors = []
+    upstream = ResilientUpstream(fallbacks=[("gpt-3.5-turbo", None, "gpt-3.5-turbo")], hedge=False,
+                                 failure_threshold=1, reset_timeout=60, on_error=errors.append)
+    assert upstream.call(primary, "gpt-4o-mini", messages=[]) == ("ok", "gpt-3.5-turbo")
+    assert upstream.call(primary, "gpt-4o-mini", messages=[]) == ("ok", "gpt-3.5-turbo")
+    assert len(errors) == 1
+    assert upstream.stats()["fallbacks_used"] == 2
+
+class SlowClient(FakeClient):
+    """Answers after the next of delays, recording how many calls overlap"""
+
+    def __init__(self, *delays):
+        super().__init__([])
+        self.delays = list(delays)
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def create(self, **request):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            delay = self.delays.pop(0) if self.delays else 0
+        try:
+            time.sleep(delay)
+            return super().create(**request)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+def test_hedge_skipped_without_a_free_slot():
+    client = SlowClient(0.2)
+    limiter = ConcurrencyLimiter(max_concurrent=1, queue_timeout=1)
+    upstream = ResilientUpstream(hedge_delay=0.05, hedge_max_ratio=1.0, limiter=limiter)
+    assert upstream.call(client, "gpt-4o-mini", messages=[]) == ("ok", "gpt-4o-mini")
+    assert client.calls == 1
+    assert upstream.stats()["hedges_skipped"] == 1
+    assert limiter.stats()["active"] == 0
+
+def test_losing_attempt_keeps_its_slot_until_it_finishes():
+    # The first attempt is slow, so the hedge wins and the first keeps running
+    client = SlowClient(0.4, 0.05)
+    limiter = ConcurrencyLimiter(max_concurrent=2, queue_timeout=1)
+    upstream = ResilientUpstream(hedge_delay=0.05, hedge_max_ratio=1.0, limiter=limiter)
+    assert upstream.call(client, "gpt-4o-mini", messages=[]) == ("ok", "gpt-4o-mini")
+    assert upstream.stats()["hedges_won"] == 1
+    assert limiter.stats()["active"] == 1
+    time.sleep(0.5)
+    assert limiter.stats()["active"] == 0
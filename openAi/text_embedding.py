@@ -0,0 +1,37 @@
+"""
+Local text embeddings without a model download
+Hashes words and word pairs into a fixed number of buckets, giving sparse
+L2-normalized vectors that are cheap to compare with cosine similarity.
+"""
+
+import re
+import math
+import zlib
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+def tokenize(text):
+    """Lowercase word tokens"""
+    return WORD_PATTERN.findall(text.lower())
+
+def embed(text, dimensions=1024):
+    """Embed text as a sparse {bucket: weight} vector with unit length"""
+    words = tokenize(text)
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    vector = {}
+    for feature in features:
+        bucket = zlib.crc32(feature.encode()) % dimensions
+        vector[bucket] = vector.get(bucket, 0.0) + 1.0
+
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    if norm:
+        for bucket in vector:
+            vector[bucket] /= norm
+    return vector
+
+def cosine_similarity(a, b):
+    """Cosine similarity of two unit-length sparse vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
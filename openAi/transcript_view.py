@@ -0,0 +1,205 @@
+"""
+Bounded transcript for the Tkinter chat displays
+Only the last max_messages messages stay in the Text widget. Older ones are
+appended to an on-disk log and read back a page at a time when the user
+clicks the banner at the top, so inserting a message costs the same however
+long the session runs.
+"""
+
+import os
+import json
+import tempfile
+import datetime
+from collections import deque
+
+import tkinter as tk
+
+# Messages kept in the widget
+MAX_MESSAGES = int(os.getenv("TRANSCRIPT_MAX_MESSAGES", "200"))
+
+# Archived messages loaded per click on the banner
+PAGE_SIZE = 50
+
+class TranscriptView:
+    """Owns the contents of a Text widget as a list of messages
+
+    Each message starts at a mark named msg<N>. The banner about archived
+    messages sits before the left-gravity mark "transcript_start", so
+    text inserted there lands after the banner and ahead of the messages.
+    """
+
+    def __init__(self, text, max_messages=MAX_MESSAGES, archive_path=None,
+                 sender_font=None, show_time=True):
+        self.text = text
+        self.max_messages = max(1, max_messages)
+        self.sender_font = sender_font
+        self.show_time = show_time
+
+        # Archive log: one JSON message per line, offsets kept in memory for seeking
+        if archive_path is None:
+            fd, archive_path = tempfile.mkstemp(prefix="chat-transcript-", suffix=".jsonl")
+            os.close(fd)
+            self._remove_archive = True
+        else:
+            self._remove_archive = False
+        self.archive_path = archive_path
+        self._archive = open(archive_path, "a+b")
+        self._archive.truncate(0)
+        self._offsets = []
+        self._first_loaded = 0  # Archive index of the oldest message on screen
+
+        # Messages on screen: [mark, record, archive index or None]
+        self._messages = deque()
+        self._next_id = 0
+
+        # Tags are configured once, not on every insert
+        self._sender_tags = {}
+        self.text.tag_configure("archive_notice", foreground="#888888", justify=tk.CENTER, underline=True)
+        self.text.tag_bind("archive_notice", "<Button-1>", lambda event: self.load_earlier())
+        self.text.tag_bind("archive_notice", "<Enter>", lambda event: self.text.config(cursor="hand2"))
+        self.text.tag_bind("archive_notice", "<Leave>", lambda event: self.text.config(cursor=""))
+        self.text.mark_set("transcript_start", "1.0")
+        self.text.mark_gravity("transcript_start", tk.LEFT)
+
+    def __len__(self):
+        return len(self._messages)
+
+    @property
+    def archived(self):
+        """Messages written to the archive log"""
+        return len(self._offsets)
+
+    def sender_tag(self, color):
+        tag = self._sender_tags.get(color)
+        if tag is None:
+            tag = self._sender_tags[color] = f"sender_{len(self._sender_tags)}"
+            options = {"foreground": color}
+            if self.sender_font:
+                options["font"] = self.sender_font
+            self.text.tag_configure(tag, **options)
+        return tag
+
+    def header(self, record):
+        if self.show_time:
+            return f"\n[{record['time']}] {record['sender']}:\n"
+        return f"\n{record['sender']}:\n"
+
+    def begin_message(self, sender, color=None):
+        """Start a message; its text follows through append_text"""
+        record = {
+            "sender": sender,
+            "color": color,
+            "time": datetime.datetime.now().strftime("%H:%M"),
+            "parts": []
+        }
+        mark = f"msg{self._next_id}"
+        self._next_id += 1
+
+        self.text.configure(state=tk.NORMAL)
+        start = self.text.index("end-1c")
+        self.text.insert(tk.END, self.header(record), self.sender_tag(color) if color else ())
+        self.text.mark_set(mark, start)
+        self._messages.append([mark, record, None])
+        self._evict()
+        self.text.configure(state=tk.DISABLED)
+        self.text.see(tk.END)
+
+    def append_text(self, text):
+        """Append text to the newest message"""
+        self._messages[-1][1]["parts"].append(text)
+        self.text.configure(state=tk.NORMAL)
+        self.text.insert(tk.END, text, "message")
+        self.text.configure(state=tk.DISABLED)
+        self.text.see(tk.END)
+
+    def add_message(self, sender, message, color=None):
+        self.begin_message(sender, color)
+        self.append_text(message)
+
+    def _evict(self):
+        """Drop the oldest messages beyond max_messages, archiving new ones"""
+        evicted = False
+        while len(self._messages) > self.max_messages:
+            mark, record, index = self._messages.popleft()
+            if index is None:
+                index = self._write_archive(record)
+            self._first_loaded = index + 1
+            self.text.delete("transcript_start", self._messages[0][0])
+            self.text.mark_unset(mark)
+            evicted = True
+        if evicted:
+            self._update_notice()
+
+    def _write_archive(self, record):
+        self._archive.seek(0, os.SEEK_END)
+        self._offsets.append(self._archive.tell())
+        line = json.dumps({
+            "sender": record["sender"],
+            "color": record["color"],
+            "time": record["time"],
+            "text": "".join(record["parts"])
+        }, ensure_ascii=False)
+        self._archive.write(line.encode("utf-8") + b"\n")
+        return len(self._offsets) - 1
+
+    def _read_archive(self, index):
+        self._archive.flush()
+        self._archive.seek(self._offsets[index])
+        record = json.loads(self._archive.readline())
+        record["parts"] = [record.pop("text")]
+        return record
+
+    def load_earlier(self, count=PAGE_SIZE):
+        """Read the previous page of archived messages back into the widget
+
+        The widget holds more than max_messages until the next message
+        pushes them out again.
+        """
+        start = max(0, self._first_loaded - count)
+        if start == self._first_loaded:
+            return 0
+
+        self.text.configure(state=tk.NORMAL)
+        # Newest first, each inserted just after the banner
+        for index in range(self._first_loaded - 1, start - 1, -1):
+            record = self._read_archive(index)
+            mark = f"msg{self._next_id}"
+            self._next_id += 1
+            self.text.insert("transcript_start", "".join(record["parts"]), "message")
+            self.text.insert("transcript_start", self.header(record),
+                             self.sender_tag(record["color"]) if record["color"] else ())
+            self.text.mark_set(mark, "transcript_start")
+            self._messages.appendleft([mark, record, index])
+        loaded = self._first_loaded - start
+        self._first_loaded = start
+        self._update_notice()
+        self.text.configure(state=tk.DISABLED)
+        return loaded
+
+    def _update_notice(self):
+        self.text.delete("1.0", "transcript_start")
+        if self._first_loaded:
+            # Insert before the mark rather than after it
+            self.text.mark_gravity("transcript_start", tk.RIGHT)
+            self.text.insert("1.0", f"⬆ {self._first_loaded} earlier messages - click to load\n", "archive_notice")
+            self.text.mark_gravity("transcript_start", tk.LEFT)
+
+    def clear(self):
+        """Remove every message, on screen and archived"""
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.configure(state=tk.DISABLED)
+        for mark, _, _ in self._messages:
+            self.text.mark_unset(mark)
+        self._messages.clear()
+        self._archive.truncate(0)
+        self._offsets = []
+        self._first_loaded = 0
+
+    def close(self):
+        self._archive.close()
+        if self._remove_archive:
+            try:
+                os.remove(self.archive_path)
+            except OSError:
+                pass
@@ -0,0 +1,373 @@
+"""
+Tail-latency protection for upstream chat completions
+A request that takes longer than recent calls usually do (their p95) gets
+a second, hedged attempt, and whichever finishes first wins. Each upstream
+target (a model, optionally on another endpoint) has a circuit breaker.
+While a target keeps failing, requests skip it and go down the fallback
+chain instead of waiting out its timeout.
+"""
+
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import openai
+
+from openai_client import create_client
+
+class UpstreamUnavailable(Exception):
+    """No upstream target could answer"""
+
+def retryable(error):
+    """Whether another attempt or target might succeed where this one failed"""
+    if isinstance(error, openai.APIStatusError):
+        # Bad requests fail everywhere; rate limits, timeouts and server errors may not
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return True
+
+class CircuitBreaker:
+    """Opens after failure_threshold failures in a row; one trial call is let through after reset_timeout"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self.opened_at is None:
+            return "closed"
+        if now - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """Whether a call may go to this target now"""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                # Open, or stay open for another reset_timeout after a failed trial
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+class LatencyTracker:
+    """Recent successful call durations, for the hedging delay"""
+
+    def __init__(self, window=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction=0.95):
+        """The given percentile, or None until min_samples calls have been seen"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+@dataclass
+class Target:
+    model: str
+    client: object
+    name: str
+
+def parse_fallbacks(spec, api_key=None):
+    """Targets from "model, model@base_url, ..." (endpoints share the API key)"""
+    targets = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, base_url = entry.partition("@")
+        client = create_client(api_key=api_key, base_url=base_url) if base_url else None
+        targets.append((model, client, entry))
+    return targets
+
+class _Slot:
+    """A caller's limiter slot, released once the call and its attempts have all finished"""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.users = 1
+        self._lock = threading.Lock()
+        if limiter is not None:
+            limiter.acquire()
+
+    def hold(self):
+        with self._lock:
+            self.users += 1
+
+    def release(self, *_):
+        with self._lock:
+            self.users -= 1
+            done = self.users == 0
+        if done and self.limiter is not None:
+            self.limiter.release()
+
+class ResilientUpstream:
+    """Calls chat completions with hedging, circuit breakers and a fallback chain
+
+    fallbacks holds (model, client or None for the primary client, name) tuples.
+    hedge_delay of None hedges at the primary target's recent p95.
+    limiter (a ConcurrencyLimiter) bounds calls in flight: call() holds a slot
+    until its last attempt finishes, even one that lost or outlived the
+    deadline, and a hedge is only sent if it can take a slot of its own.
+    on_error is called with every attempt that failed with a retryable error,
+    including the last one of a request that failed outright.
+    """
+
+    def __init__(self, fallbacks=(), hedge=True, hedge_delay=None, hedge_min_delay=0.5, hedge_max_ratio=0.05,
+                 deadline=60.0, failure_threshold=5, reset_timeout=30.0, max_workers=32, limiter=None,
+                 on_error=None):
+        self.fallbacks = list(fallbacks)
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_ratio = hedge_max_ratio
+        self.deadline = deadline
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.limiter = limiter
+        self.on_error = on_error
+        self._breakers = {}
+        self._latency = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upstream")
+        self.requests = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.hedges_skipped = 0
+        self.fallbacks_used = 0
+        self.rejected = 0
+
+    def breaker(self, name):
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def latency(self, name):
+        with self._lock:
+            tracker = self._latency.get(name)
+            if tracker is None:
+                tracker = self._latency[name] = LatencyTracker()
+            return tracker
+
+    def targets(self, client, model):
+        """The primary target followed by the fallbacks, without repeats"""
+        targets = [Target(model, client, model)]
+        for fallback_model, fallback_client, name in self.fallbacks:
+            if fallback_client is None and fallback_model == model:
+                continue
+            targets.append(Target(fallback_model, fallback_client or client, name))
+        return targets
+
+    def call(self, client, model, on_discarded=None, **request):
+        """Create a chat completion; returns (response, model that answered)
+
+        on_discarded(response, model) receives replies that lost a hedge race
+        or came in after the deadline, so their tokens can still be counted.
+        Raises RateLimited if no limiter slot frees up in time.
+        """
+        slot = _Slot(self.limiter)
+        try:
+            deadline = time.monotonic() + self.deadline
+            return self._run(client, model, deadline,
+                             lambda target: self._hedged(target, request, deadline, slot, on_discarded))
+        finally:
+            slot.release()
+
+    def open_stream(self, client, model, **request):
+        """Start a streamed chat completion; returns (stream, model)
+
+        Only opening the stream fails over; a stream that breaks midway is
+        not restarted, since its text has already been sent. The caller holds
+        the limiter slot for as long as it reads the stream.
+        """
+        deadline = time.monotonic() + self.deadline
+        return self._run(client, model, deadline,
+                         lambda target: self._attempt(target, dict(request, stream=True)))
+
+    def _run(self, client, model, deadline, attempt):
+        with self._lock:
+            self.requests += 1
+        error = None
+        for index, target in enumerate(self.targets(client, model)):
+            if time.monotonic() >= deadline:
+                break
+            if not self.breaker(target.name).allow():
+                continue
+            try:
+                result = attempt(target)
+            except Exception as e:
+                if not retryable(e):
+                    raise
+                error = e
+                continue
+            if index:
+                with self._lock:
+                    self.fallbacks_used += 1
+            return result, target.model
+
+        with self._lock:
+            self.rejected += 1
+        if error is not None:
+            raise UpstreamUnavailable(f"All upstream targets failed, last error: {error}") from error
+        raise UpstreamUnavailable("The AI service is temporarily unavailable, please try again shortly")
+
+    def _attempt(self, target, request):
+        """One upstream call, feeding the target's breaker and latency tracker"""
+        started = time.monotonic()
+        healthy = False
+        try:
+            response = target.client.chat.completions.create(model=target.model, **request)
+            healthy = True
+        except Exception as e:
+            # A bad request was still answered, so it says nothing against the target
+            healthy = not retryable(e)
+            if not healthy and self.on_error:
+                self.on_error(e)
+            raise
+        finally:
+            # Always settle the call, or a half-open breaker would wait forever for its trial
+            if healthy:
+                self.breaker(target.name).record_success()
+            else:
+                self.breaker(target.name).record_failure()
+        if not request.get("stream"):
+            self.latency(target.name).add(time.monotonic() - started)
+        return response
+
+    def _hedge_delay(self, target):
+        if not self.hedge:
+            return None
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        p95 = self.latency(target.name).percentile(0.95)
+        return max(p95, self.hedge_min_delay) if p95 is not None else None
+
+    def _may_hedge(self):
+        """Keep hedges to a small share of requests, so a slow upstream is not hit twice as hard"""
+        with self._lock:
+            if self.hedges_sent + 1 > self.hedge_max_ratio * self.requests + 1:
+                return False
+            self.hedges_sent += 1
+            return True
+
+    def _hedged(self, target, request, deadline, slot, on_discarded=None):
+        """Call target, adding a second attempt if the first is slower than the hedge delay"""
+        started = time.monotonic()
+        delay = self._hedge_delay(target)
+        # The attempt keeps the caller's slot taken until it finishes, even after the caller gives up on it
+        slot.hold()
+        first = self._executor.submit(self._attempt, target, request)
+        first.add_done_callback(slot.release)
+        pending = {first}
+        try:
+            return self._race(target, request, deadline, started, delay, first, pending)
+        finally:
+            # Calls cannot be cancelled once sent; let the losers finish in the background
+            if on_discarded:
+                for future in pending:
+                    future.add_done_callback(
+                        lambda f: f.exception() is None and on_discarded(f.result(), target.model))
+
+    def _race(self, target, request, deadline, started, delay, first, pending):
+        """Wait for the first successful attempt; pending is updated in place"""
+        hedged = False
+        error = None
+
+        while pending:
+            now = time.monotonic()
+            timeout = deadline - now
+            if not hedged and delay is not None:
+                timeout = min(timeout, started + delay - now)
+            done, _ = wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+            pending.difference_update(done)
+
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    if not retryable(e):
+                        raise
+                    error = e
+                    continue
+                if future is not first:
+                    with self._lock:
+                        self.hedges_won += 1
+                return response
+
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"No reply from {target.name} within {self.deadline:.0f}s")
+            if pending and not hedged and delay is not None and time.monotonic() - started >= delay:
+                hedged = True
+                hedge = self._send_hedge(target, request) if self.breaker(target.name).allow() else None
+                if hedge is not None:
+                    pending.add(hedge)
+
+        raise error
+
+    def _send_hedge(self, target, request):
+        """Submit a hedge holding a limiter slot of its own; None if over the hedge ratio or no slot is free"""
+        if self.limiter is not None and not self.limiter.try_acquire():
+            with self._lock:
+                self.hedges_skipped += 1
+            return None
+        if not self._may_hedge():
+            if self.limiter is not None:
+                self.limiter.release()
+            return None
+        future = self._executor.submit(self._attempt, target, request)
+        if self.limiter is not None:
+            future.add_done_callback(lambda _: self.limiter.release())
+        return future
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+            trackers = dict(self._latency)
+            stats = {
+                "requests": self.requests,
+                "hedges_sent": self.hedges_sent,
+                "hedges_won": self.hedges_won,
+                "hedges_skipped": self.hedges_skipped,
+                "fallbacks_used": self.fallbacks_used,
+                "rejected": self.rejected
+            }
+        stats["targets"] = {}
+        for name, breaker in breakers.items():
+            p95 = trackers[name].percentile(0.95) if name in trackers else None
+            stats["targets"][name] = {
+                "state": breaker.state,
+                "latency_p95": round(p95, 3) if p95 is not None else None
+            }
+        return stats
@@ -0,0 +1,265 @@
+"""
+Token and cost accounting for the Tara web API
+Every upstream call is added to running totals per conversation, client
+address and model, and optionally appended to a ledger file, one compact
+JSON array per line. The totals are rebuilt from the file on startup and
+used to enforce budgets before a request goes upstream. Once the file grows
+past compact_lines entries it is rewritten as a single snapshot of the totals.
+"""
+
+import os
+import json
+import time
+import datetime
+import threading
+from dataclasses import dataclass, asdict, astuple
+from collections import OrderedDict
+
+from persistence import atomic_write_text
+
+# USD per million (prompt, completion) tokens; MODEL_PRICES='{"model": [in, out]}' adds or overrides
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50)
+}
+try:
+    MODEL_PRICES.update({model: tuple(prices) for model, prices in json.loads(os.getenv("MODEL_PRICES") or "{}").items()})
+except (ValueError, TypeError, AttributeError) as e:
+    print(f"Ignoring invalid MODEL_PRICES ({e}); expected {{\"model\": [prompt_usd, completion_usd]}}")
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Cost in USD, priced as gpt-4o-mini when the model is unknown"""
+    prompt_price, completion_price = MODEL_PRICES.get(model, MODEL_PRICES["gpt-4o-mini"])
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+class BudgetExceeded(Exception):
+    """A budget would be exceeded; retry_after is None when waiting will not help"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+@dataclass
+class Usage:
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, prompt_tokens, completion_tokens, cost):
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost += cost
+
+    def to_dict(self):
+        data = asdict(self)
+        data["cost"] = round(self.cost, 6)
+        data["total_tokens"] = self.total_tokens
+        return data
+
+def _utc_day(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).date()
+
+def _seconds_until_utc_midnight(now):
+    tomorrow = datetime.datetime.combine(_utc_day(now) + datetime.timedelta(days=1),
+                                         datetime.time(), datetime.timezone.utc)
+    return tomorrow.timestamp() - now
+
+class UsageLedger:
+    """Append-only usage log with in-memory totals and budgets (0 disables a budget)
+
+    path of None keeps the totals in memory only, as does a path that cannot be opened.
+    """
+
+    def __init__(self, path=None, conversation_token_budget=0, conversation_cost_budget=0.0,
+                 ip_daily_cost_budget=0.0, max_keys=100000, compact_lines=100000):
+        self.path = path
+        self.compact_lines = compact_lines
+        self.conversation_token_budget = conversation_token_budget
+        self.conversation_cost_budget = conversation_cost_budget
+        self.ip_daily_cost_budget = ip_daily_cost_budget
+        self.max_keys = max_keys
+        self.by_model = {}
+        self.by_conversation = OrderedDict()  # Least recently used first
+        self.by_ip = OrderedDict()  # ip -> (UTC day, Usage for that day)
+        self.total = Usage()
+        self._lines = 0  # Call lines in the file since its snapshot
+        self._file = None
+        self._lock = threading.Lock()
+
+        if path:
+            try:
+                self._replay()
+                self._file = open(path, "a", encoding="utf-8")
+            except OSError as e:
+                # A read-only filesystem (such as a serverless deploy) should not take the app down
+                print(f"Usage ledger {path} unavailable ({e}); keeping usage in memory only")
+                self.path = None
+            else:
+                if self._lines >= self.compact_lines:
+                    self._compact()
+
+    def _replay(self):
+        """Rebuild the totals from an existing ledger file"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        if isinstance(entry, dict):
+                            self._load_snapshot(entry)
+                            continue
+                        timestamp, model, prompt_tokens, completion_tokens, cost, conversation_id, ip = entry
+                    except (ValueError, TypeError, KeyError):
+                        continue  # Torn last line after a crash
+                    self._add(timestamp, model, prompt_tokens, completion_tokens, cost, conversation_id, ip)
+                    self._lines += 1
+        except FileNotFoundError:
+            pass
+
+    def _load_snapshot(self, snapshot):
+        """Start over from totals written by _compact"""
+        self.total = Usage(*snapshot["total"])
+        self.by_model = {model: Usage(*usage) for model, usage in snapshot["models"].items()}
+        self.by_conversation = OrderedDict((key, Usage(*usage)) for key, usage in snapshot["conversations"])
+        self.by_ip = OrderedDict((ip, (datetime.date.fromordinal(day), Usage(*usage)))
+                                 for ip, day, usage in snapshot["ips"])
+        self._lines = 0
+
+    def _compact(self):
+        """Rewrite the file as one snapshot line of the current totals; call with the lock held"""
+        today = _utc_day(time.time())
+        snapshot = {
+            "snapshot": int(time.time()),
+            "total": astuple(self.total),
+            "models": {model: astuple(usage) for model, usage in self.by_model.items()},
+            "conversations": [[key, astuple(usage)] for key, usage in self.by_conversation.items()],
+            # Earlier days no longer count against a daily budget
+            "ips": [[ip, day.toordinal(), astuple(usage)] for ip, (day, usage) in self.by_ip.items() if day == today]
+        }
+        try:
+            if self._file:
+                self._file.close()
+            atomic_write_text(self.path, json.dumps(snapshot, separators=(",", ":")) + "\n")
+            self._lines = 0
+        except OSError as e:
+            print(f"Could not compact usage ledger {self.path}: {e}")
+        try:
+            self._file = open(self.path, "a", encoding="utf-8")
+        except OSError as e:
+            print(f"Usage ledger {self.path} unavailable ({e}); keeping usage in memory only")
+            self._file = None
+
+    def _lru_get(self, table, key, default):
+        value = table.pop(key, None)
+        if value is None:
+            value = default()
+        table[key] = value
+        while len(table) > self.max_keys:
+            table.popitem(last=False)
+        return value
+
+    def _ip_usage(self, ip, timestamp):
+        day = _utc_day(timestamp)
+        entry = self._lru_get(self.by_ip, ip, lambda: (day, Usage()))
+        if entry[0] != day:
+            entry = self.by_ip[ip] = (day, Usage())
+        return entry[1]
+
+    def _add(self, timestamp, model, prompt_tokens, completion_tokens, cost, conversation_id, ip):
+        self.total.add(prompt_tokens, completion_tokens, cost)
+        self.by_model.setdefault(model, Usage()).add(prompt_tokens, completion_tokens, cost)
+        if conversation_id:
+            self._lru_get(self.by_conversation, conversation_id, Usage).add(prompt_tokens, completion_tokens, cost)
+        if ip:
+            self._ip_usage(ip, timestamp).add(prompt_tokens, completion_tokens, cost)
+
+    def record(self, model, prompt_tokens, completion_tokens, conversation_id=None, ip=None):
+        """Log one upstream call and return its cost"""
+        prompt_tokens = prompt_tokens or 0
+        completion_tokens = completion_tokens or 0
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        timestamp = int(time.time())
+        line = json.dumps([timestamp, model, prompt_tokens, completion_tokens, round(cost, 8), conversation_id, ip],
+                          separators=(",", ":"))
+        with self._lock:
+            self._add(timestamp, model, prompt_tokens, completion_tokens, cost, conversation_id, ip)
+            if self._file:
+                self._file.write(line + "\n")
+                self._file.flush()
+                self._lines += 1
+                if self._lines >= self.compact_lines:
+                    self._compact()
+        return cost
+
+    def check(self, conversation_id=None, ip=None):
+        """Raise BudgetExceeded if the conversation or address has used up its budget"""
+        with self._lock:
+            if conversation_id and (self.conversation_token_budget or self.conversation_cost_budget):
+                usage = self.by_conversation.get(conversation_id)
+                if usage and ((self.conversation_token_budget and usage.total_tokens >= self.conversation_token_budget)
+                              or (self.conversation_cost_budget and usage.cost >= self.conversation_cost_budget)):
+                    raise BudgetExceeded("This conversation has reached its usage limit. Please start a new one.")
+
+            if ip and self.ip_daily_cost_budget:
+                now = time.time()
+                entry = self.by_ip.get(ip)
+                if entry and entry[0] == _utc_day(now) and entry[1].cost >= self.ip_daily_cost_budget:
+                    raise BudgetExceeded("Daily usage limit reached for this address.",
+                                         retry_after=_seconds_until_utc_midnight(now))
+
+    def conversation_usage(self, conversation_id):
+        with self._lock:
+            usage = self.by_conversation.get(conversation_id)
+            return usage.to_dict() if usage else Usage().to_dict()
+
+    def ip_usage(self, ip):
+        """Usage by an address today (UTC)"""
+        with self._lock:
+            entry = self.by_ip.get(ip)
+            if entry and entry[0] == _utc_day(time.time()):
+                return entry[1].to_dict()
+            return Usage().to_dict()
+
+    def summary(self, top=10):
+        """Totals, per-model usage and the costliest conversations and addresses"""
+        today = _utc_day(time.time())
+        with self._lock:
+            conversations = sorted(self.by_conversation.items(), key=lambda item: item[1].cost, reverse=True)[:top]
+            addresses = sorted(((ip, usage) for ip, (day, usage) in self.by_ip.items() if day == today),
+                               key=lambda item: item[1].cost, reverse=True)[:top]
+            return {
+                "total": self.total.to_dict(),
+                "models": {model: usage.to_dict() for model, usage in self.by_model.items()},
+                "top_conversations": [dict(usage.to_dict(), conversation_id=key) for key, usage in conversations],
+                "top_addresses_today": [dict(usage.to_dict(), ip=key) for key, usage in addresses],
+                "budgets": {
+                    "conversation_tokens": self.conversation_token_budget,
+                    "conversation_cost": self.conversation_cost_budget,
+                    "ip_daily_cost": self.ip_daily_cost_budget
+                }
+            }
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+def create_usage_ledger():
+    """Create the usage ledger configured by environment variables"""
+    return UsageLedger(
+        path=os.getenv('USAGE_LEDGER_PATH') or None,
+        conversation_token_budget=int(os.getenv('BUDGET_CONVERSATION_TOKENS', 0)),
+        conversation_cost_budget=float(os.getenv('BUDGET_CONVERSATION_USD', 0)),
+        ip_daily_cost_budget=float(os.getenv('BUDGET_IP_DAILY_USD', 0)),
+        compact_lines=int(os.getenv('USAGE_LEDGER_COMPACT_LINES', 100000))
+    )